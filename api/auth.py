@@ -8,6 +8,7 @@ import jwt
 from typing import Optional
 import datetime
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
@@ -30,7 +31,10 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     if db is None:
         raise HTTPException(status_code=500, detail="Database connection not initialized")
         
-    user_doc = await db.users.find_one({"username": username})
+    user_doc = await db.users.find_one(
+        {"username": username},
+        {"username": 1, "email": 1, "hashed_password": 1, "created_at": 1},
+    )
     if user_doc is None:
         raise credentials_exception
         
@@ -45,7 +49,7 @@ async def register(user: UserCreate):
         
     existing_user = await db.users.find_one({
         "$or": [{"username": user.username}, {"email": user.email}]
-    })
+    }, {"_id": 1})
     
     if existing_user:
         raise HTTPException(
@@ -61,7 +65,14 @@ async def register(user: UserCreate):
         "created_at": datetime.datetime.utcnow()
     }
     
-    result = await db.users.insert_one(user_dict)
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        # Inscription concurrente : les index uniques tranchent
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username or email already registered"
+        )
     
     access_token = create_access_token(data={"sub": user.username})
     return {"access_token": access_token, "token_type": "bearer"}
@@ -73,7 +84,7 @@ async def login(user_data: UserLogin):
     if db is None:
         raise HTTPException(status_code=500, detail="Database connection not initialized")
         
-    user = await db.users.find_one({"username": user_data.username})
+    user = await db.users.find_one({"username": user_data.username}, {"username": 1, "hashed_password": 1})
     
     if not user or not verify_password(user_data.password, user["hashed_password"]):
         raise HTTPException(
@@ -0,0 +1,92 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket
+
+from core.database import get_db
+from core.logger import get_logger
+from models.schemas import JobRequest
+from models.user import UserInDB
+from api.auth import get_current_user
+from api.routes import LOG_PAGE_LIMIT, normalize_domain
+from api.websockets import serve_logs, ws_username
+from services.jobs import scheduler
+from services.parser import stats_for_json
+
+logger = get_logger("api.jobs")
+router = APIRouter()
+
+
+def _job_for(job_id: str, user: UserInDB):
+    """Job de l'utilisateur, 404 sinon (les jobs des autres ne sont pas visibles)."""
+    job = scheduler.get(job_id)
+    if job is None or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Job introuvable")
+    return job
+
+
+@router.post("/api/jobs", status_code=202)
+async def submit_job(req: JobRequest, current_user: UserInDB = Depends(get_current_user)):
+    """Soumet un scan : démarré tout de suite si des slots sont libres, sinon mis en file."""
+    domain = normalize_domain(req.domain)
+    job = scheduler.submit(current_user.id, req, domain, req.priority)
+    logger.info(f"Job {job.id} soumis par {current_user.username} pour {domain}")
+    return job.summary(scheduler.queue_position(job))
+
+
+@router.get("/api/jobs")
+async def list_jobs(current_user: UserInDB = Depends(get_current_user)):
+    jobs = scheduler.jobs_for(current_user.id)
+    return {
+        "jobs": [job.summary(scheduler.queue_position(job)) for job in jobs],
+        "scheduler": scheduler.metrics(),
+    }
+
+
+@router.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, current_user: UserInDB = Depends(get_current_user)):
+    job = _job_for(job_id, current_user)
+    summary = job.summary(scheduler.queue_position(job))
+    summary["discovered_urls"] = job.state["discovered_urls"]
+    return summary
+
+
+@router.get("/api/jobs/{job_id}/stats")
+async def get_job_stats(job_id: str, current_user: UserInDB = Depends(get_current_user)):
+    job = _job_for(job_id, current_user)
+    if job.state["stats"]:
+        return stats_for_json(job.state["stats"])
+    return {"error": "Aucune donnée disponible", "status": job.state["status"]}
+
+
+@router.get("/api/jobs/{job_id}/logs")
+async def get_job_logs(
+    job_id: str,
+    since: int = Query(0, ge=0),
+    limit: int = Query(LOG_PAGE_LIMIT, ge=1, le=LOG_PAGE_LIMIT),
+    current_user: UserInDB = Depends(get_current_user),
+):
+    job = _job_for(job_id, current_user)
+    return job.state["logs"].page(since, limit)
+
+
+@router.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str, current_user: UserInDB = Depends(get_current_user)):
+    job = _job_for(job_id, current_user)
+    if not await scheduler.cancel(job):
+        return {"error": f"Job déjà terminé ({job.state['status']})"}
+    logger.info(f"Job {job.id} annulé par {current_user.username}")
+    return {"ok": True}
+
+
+@router.websocket("/ws/jobs/{job_id}/logs")
+async def websocket_job_logs(ws: WebSocket, job_id: str, token: str = Query(...),
+                             since: int = Query(0, ge=0)):
+    username = ws_username(token)
+    db = get_db()
+    user = await db.users.find_one({"username": username}, {"_id": 1}) if username and db is not None else None
+    job = scheduler.get(job_id)
+    if user is None or job is None or job.user_id != str(user["_id"]):
+        await ws.close(code=1008)
+        return
+
+    await ws.accept()
+    logger.info(f"[ws_connect] Client {username} sur le job {job_id} (reprise après la ligne {since})")
+    await serve_logs(ws, job.state, job.subscribers, since)
@@ -1,31 +1,60 @@
 import asyncio
 import io
 import threading
-from fastapi import APIRouter, HTTPException, Depends
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from fastapi.responses import StreamingResponse
 from datetime import datetime
 
+from core.cache import response_cache
 from core.database import get_db
-from core.config import CSV_DIR
+from core.config import CSV_DIR, settings
 from core.state import state
 from models.schemas import ScanRequest
 from models.user import UserInDB
 from api.auth import get_current_user
-from services.parser import parse_csv_stats
+from services.parser import parse_csv_stats, stats_for_json
+from services.histogram import LatencyHistograms
+from services.scalability import fit_stages
+from services.result_store import delete_results, load_results
 from services.locust_runner import run_locust_thread
-from services.reporter import build_pdf
-from services.scan_service import get_user_global_stats, get_scan_details
+from services.async_runner import run_locust_async
+from services.pdf_renderer import pdf_renderer, scan_version
+from services.scan_service import (
+    SUMMARY_SCAN_FIELDS, get_user_global_stats, get_scan_details, list_user_scans, update_user_summary,
+)
 from core.logger import get_logger
 from bson import ObjectId
 
 logger = get_logger("api.routes")
 router = APIRouter()
 
+# Lignes max renvoyées par GET /logs
+LOG_PAGE_LIMIT = 5000
+# Scans par page de GET /scans (pagination par curseur, en-tête X-Next-Cursor)
+SCANS_PAGE_LIMIT = 100
+# Percentiles renvoyés par GET /percentiles sans paramètre q
+DEFAULT_PERCENTILES = [50, 90, 95, 99, 99.9, 99.99]
+
+
+def normalize_domain(domain: str) -> str:
+    """Domaine saisi -> URL de base (https:// par défaut, sans slash final)."""
+    domain = domain.strip().rstrip("/")
+    if not domain.startswith(("http://", "https://")):
+        domain = "https://" + domain
+    return domain
+
 
 @router.get("/status")
 async def get_status():
     logger.debug(f"/status appelé. Statut actuel: {state['status']}")
-    return {"status": state["status"], "domain": state["domain"]}
+    forwarder = state["log_forwarder"]
+    return {
+        "status": state["status"],
+        "domain": state["domain"],
+        "live": state["live"],
+        "log_forwarding": forwarder.metrics() if forwarder else None,
+    }
 
 
 @router.post("/scan")
@@ -33,28 +62,29 @@ async def start_scan(req: ScanRequest, current_user: UserInDB = Depends(get_curr
     """Lance le test de charge Locust en subprocess headless."""
     logger.info(f"========== POST /api/scan APPELÉ par {current_user.username} ==========")
     logger.info(f"[DIAG] Domaine demandé: {req.domain}")
+    logger.info(f"[DIAG] Forme de charge: {req.load_shape.type if req.load_shape else 'paliers par défaut'}")
     logger.info(f"[DIAG] État AVANT scan: status={state['status']}, domain={state['domain']}, logs_count={len(state['logs'])}, stats={'oui' if state['stats'] else 'non'}, process={state['process']}")
 
     if state["status"] in ("crawling", "running"):
         logger.warning(f"[DIAG] REJET: un test est déjà en cours ({state['status']})")
         raise HTTPException(status_code=409, detail="Un test est déjà en cours")
 
-    domain = req.domain.strip().rstrip("/")
-    if not domain.startswith(("http://", "https://")):
-        domain = "https://" + domain
+    domain = normalize_domain(req.domain)
     logger.info(f"[DIAG] Domaine final après formatage: {domain}")
 
-    logger.info(f"[DIAG] Reset de state: logs=[], stats=None, status='idle'")
+    logger.info(f"[DIAG] Reset de state: logs vidés, stats=None, status='idle'")
     state["status"] = "idle"
     state["domain"] = domain
-    state["logs"] = []
+    state["logs"].clear()  # la numérotation continue : les clients reprennent sans doublon
     state["stats"] = None
+    response_cache.invalidate(namespace="stats")
     state["discovered_urls"] = []
+    state["live"] = None
 
-    # Supprimer les anciens CSV
+    # Supprimer les anciens CSV (et le résultat de capacité du scan précédent)
     logger.info("[DIAG] Nettoyage des anciens fichiers CSV de rapport...")
     csv_count = 0
-    for csv_file in CSV_DIR.glob("rapport_*.csv"):
+    for csv_file in [*CSV_DIR.glob("rapport_*.csv"), *CSV_DIR.glob("rapport_*.json")]:
         try:
             csv_file.unlink(missing_ok=True)
             csv_count += 1
@@ -63,12 +93,17 @@ async def start_scan(req: ScanRequest, current_user: UserInDB = Depends(get_curr
             logger.error(f"[DIAG] ERREUR suppression {csv_file.name}: {e}")
     logger.info(f"[DIAG] {csv_count} fichier(s) CSV nettoyé(s)")
 
+    if settings.scan_runner == "asyncio":
+        logger.info(f"[DIAG] Lancement du runner asyncio pour {domain}")
+        state["scan_task"] = asyncio.create_task(run_locust_async(domain, current_user.id, req))
+        return {"ok": True, "domain": domain}
+
     loop = asyncio.get_running_loop()
     logger.info(f"[DIAG] Event loop obtenu: {loop}, running={loop.is_running()}, closed={loop.is_closed()}")
     logger.info(f"[DIAG] Lancement du thread Locust MAINTENANT pour {domain}")
     t = threading.Thread(
         target=run_locust_thread,
-        args=(domain, loop, current_user.id),
+        args=(domain, loop, current_user.id, req),
         daemon=True
     )
     t.start()
@@ -83,6 +118,12 @@ async def stop_scan(current_user: UserInDB = Depends(get_current_user)):
     logger.info(f"========== POST /api/stop APPELÉ par {current_user.username}==========")
     proc = state.get("process")
     logger.info(f"[DIAG] État actuel: status={state['status']}, process={proc}, returncode={proc.returncode if proc else 'N/A'}")
+    task = state.get("scan_task")
+    if task and not task.done():
+        # Runner asyncio : l'annulation arrête Locust et repasse le statut à "idle"
+        logger.info("[DIAG] Annulation de la tâche de scan asyncio")
+        task.cancel()
+        return {"ok": True}
     if proc and proc.returncode is None:
         logger.info(f"[DIAG] Terminaison du processus Locust (PID: {proc.pid})")
         proc.terminate()
@@ -95,13 +136,17 @@ async def stop_scan(current_user: UserInDB = Depends(get_current_user)):
 
 
 @router.get("/stats")
-async def get_stats(current_user: UserInDB = Depends(get_current_user)):
+async def get_stats(request: Request, current_user: UserInDB = Depends(get_current_user)):
     logger.info(f"========== GET /api/stats APPELÉ ==========")
+    return await response_cache.serve(request, ("stats", None), _load_stats)
+
+
+async def _load_stats():
     logger.info(f"[DIAG] stats en mémoire: {'oui' if state['stats'] else 'non'}")
     if state["stats"]:
         g = state["stats"].get("global", {})
         logger.info(f"[DIAG] Stats en cache: requests={g.get('num_requests')}, rps={g.get('rps')}, p95={g.get('p95_response')}")
-        return state["stats"]
+        return stats_for_json(state["stats"])
 
     # Essayer de parser si les CSV existent
     logger.info("[DIAG] Stats absentes en mémoire, tentative de parsing CSV...")
@@ -109,75 +154,203 @@ async def get_stats(current_user: UserInDB = Depends(get_current_user)):
     if stats:
         logger.info(f"[DIAG] Parsing CSV réussi: {stats.get('global', {})}")
         state["stats"] = stats
-        return stats
+        return stats_for_json(stats)
 
     logger.warning("[DIAG] AUCUNE statistique trouvée (ni en mémoire ni dans les CSV).")
     return {"error": "Aucune donnée disponible"}
 
 
 @router.get("/logs")
-async def get_logs(current_user: UserInDB = Depends(get_current_user)):
-    """Retourne tous les logs accumulés (pour reconnexion)."""
-    logger.debug("/logs appelé.")
-    return {"logs": state["logs"]}
+async def get_logs(
+    since: int = Query(0, ge=0),
+    limit: int = Query(LOG_PAGE_LIMIT, ge=1, le=LOG_PAGE_LIMIT),
+    current_user: UserInDB = Depends(get_current_user),
+):
+    """Logs de numéro > since (pour reconnexion), au plus `limit` lignes (cf. LogRing.page)."""
+    logger.debug(f"/logs appelé (since={since}).")
+    return state["logs"].page(since, limit)
 
 
 @router.get("/scans")
-async def get_scans(current_user: UserInDB = Depends(get_current_user)):
+async def get_scans(
+    request: Request,
+    limit: int = Query(SCANS_PAGE_LIMIT, ge=1, le=SCANS_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: UserInDB = Depends(get_current_user),
+):
+    """
+    Historique des scans, du plus récent au plus ancien. S'il reste des
+    scans, l'en-tête X-Next-Cursor donne le `cursor` de la page suivante.
+    """
     db = get_db()
     if db is None:
         raise HTTPException(status_code=500, detail="Database connection not initialized")
 
-    cursor = db.scans.find({"user_id": current_user.id}).sort("created_at", -1)
-    scans = await cursor.to_list(length=100)
+    return await response_cache.serve(
+        request, ("scans", current_user.id, limit, cursor),
+        lambda: _load_scans(current_user.id, limit, cursor), with_headers=True,
+    )
 
-    for scan in scans:
-        scan["id"] = str(scan["_id"])
-        del scan["_id"]
-        # Do not send raw global stats dump in the list for performance reasons
-        if "global_stats" in scan:
-            del scan["global_stats"]
 
-    return scans
+async def _load_scans(user_id: str, limit: int, cursor: Optional[str]):
+    try:
+        scans, next_cursor = await list_user_scans(user_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+    return scans, {"X-Next-Cursor": next_cursor} if next_cursor else None
 
 
 @router.get("/scans/summary")
-async def get_scans_summary(current_user: UserInDB = Depends(get_current_user)):
+async def get_scans_summary(request: Request, current_user: UserInDB = Depends(get_current_user)):
     """Retourne les statistiques globales de l'utilisateur pour le Dashboard Home."""
-    stats = await get_user_global_stats(current_user.id)
-    return stats
+    return await response_cache.serve(
+        request, ("summary", current_user.id), lambda: get_user_global_stats(current_user.id)
+    )
 
 
 @router.get("/scans/{scan_id}/details")
-async def get_scan_details_route(scan_id: str, current_user: UserInDB = Depends(get_current_user)):
+async def get_scan_details_route(scan_id: str, request: Request, current_user: UserInDB = Depends(get_current_user)):
     """Retourne les statistiques complètes d'un scan spécifique."""
     # FIX: Check "current" BEFORE any DB lookup to avoid bson.InvalidId crash
     if scan_id == "current":
         if state["stats"]:
-            return state["stats"]
+            return await response_cache.serve(request, ("stats", None, "current"), _load_current_details)
         raise HTTPException(status_code=404, detail="No active scan stats available")
 
-    scan = await get_scan_details(scan_id, current_user.id)
+    return await response_cache.serve(
+        request, ("details", current_user.id, scan_id), lambda: _load_scan_details(scan_id, current_user.id)
+    )
+
+
+async def _load_current_details():
+    return stats_for_json(state["stats"])
+
+
+async def _load_scan_details(scan_id: str, user_id: str):
+    scan = await get_scan_details(scan_id, user_id)
     if not scan:
         raise HTTPException(status_code=404, detail="Scan not found or unauthorized")
 
     if "global_stats" not in scan:
         raise HTTPException(status_code=404, detail="No detailed stats found for this scan")
 
-    return {"global": scan["global_stats"], "_id": scan["id"]}
+    results = await load_results(get_db(), scan) or {}
+    return {
+        "global": scan["global_stats"],
+        "endpoints": results.get("endpoints", []),
+        "history": results.get("history", []),
+        "stages": scan.get("stages"),
+        "saturation": scan.get("saturation"),
+        "scalability": scan.get("scalability"),
+        "_id": scan["id"],
+    }
+
+
+@router.get("/percentiles")
+async def get_percentiles(
+    scan_id: Optional[List[str]] = Query(None),
+    q: Optional[List[float]] = Query(None),
+    endpoint: Optional[str] = None,
+    stage: Optional[List[int]] = Query(None),
+    current_user: UserInDB = Depends(get_current_user),
+):
+    """
+    Percentiles de latence arbitraires depuis les histogrammes HDR du scan
+    courant (sans scan_id) ou de scans enregistrés : plusieurs scan_id et
+    plusieurs stage sont fusionnés ; endpoint restreint à une route.
+    """
+    qs = q or DEFAULT_PERCENTILES
+    if any(not 0 <= value <= 100 for value in qs):
+        raise HTTPException(status_code=422, detail="Les percentiles doivent être compris entre 0 et 100")
+
+    sources = []
+    if not scan_id or scan_id == ["current"]:
+        stats = state["stats"] or {}
+        sources.append(stats.get("histograms"))
+    else:
+        for sid in scan_id:
+            scan = await get_scan_details(sid, current_user.id)
+            if not scan:
+                raise HTTPException(status_code=404, detail=f"Scan {sid} not found or unauthorized")
+            results = await load_results(get_db(), scan) or {}
+            sources.append(results.get("histograms"))
+    if not all(sources):
+        raise HTTPException(status_code=404, detail="Aucun histogramme de latence pour ce scan")
+
+    histograms = LatencyHistograms()
+    for entries in sources:
+        histograms.merge(LatencyHistograms.from_entries(entries))
+
+    stages = stage or histograms.stages()
+    return {
+        **histograms.select(stage, endpoint).summary(qs),
+        "endpoint": endpoint,
+        "stages": stage,
+        "by_stage": {
+            str(index): histograms.select([index], endpoint).summary(qs) for index in stages
+        },
+        "available": {"stages": histograms.stages(), "endpoints": histograms.endpoints()},
+    }
+
+
+@router.get("/scalability")
+async def get_scalability(
+    scan_id: Optional[str] = None,
+    users: Optional[List[int]] = Query(None),
+    current_user: UserInDB = Depends(get_current_user),
+):
+    """
+    Modèle USL ajusté sur les paliers du scan courant (ou de scan_id) :
+    débit max prévu, charge correspondante, R², et débit prévu pour chaque
+    valeur de `users` (ex. ?users=2000).
+    """
+    if not scan_id or scan_id == "current":
+        stages = (state["stats"] or {}).get("stages")
+    else:
+        scan = await get_scan_details(scan_id, current_user.id)
+        if not scan:
+            raise HTTPException(status_code=404, detail="Scan not found or unauthorized")
+        stages = scan.get("stages")
+    if not stages:
+        raise HTTPException(status_code=404, detail="Aucune statistique par palier pour ce scan")
+
+    model = fit_stages(stages, users)
+    if model is None:
+        raise HTTPException(status_code=422, detail="Au moins 3 paliers de charges différentes sont nécessaires")
+    return model
 
 
 @router.get("/report/pdf")
 async def generate_pdf(scan_id: str = None, current_user: UserInDB = Depends(get_current_user)):
-    """Génère et retourne le rapport PDF."""
+    """Génère et retourne le rapport PDF (rendu hors de la boucle, cf. services/pdf_renderer)."""
     logger.info("Demande de génération de rapport PDF reçue.")
 
     # Fetch from memory OR from historical DB
     stats = None
+    version = None
+    domain = state.get("domain") or "N/A"
     if scan_id:
-        scan = await get_scan_details(scan_id, current_user.id)
+        # Sans le bloc de résultats : un PDF déjà rendu est servi sans
+        # téléchargement GridFS ni décodage
+        scan = await get_scan_details(scan_id, current_user.id, {"results.data": 0})
         if scan and "global_stats" in scan:
-            stats = {"global": scan["global_stats"]}
+            version = scan_version(scan)
+            pdf = pdf_renderer.cached(scan_id, version)
+            if pdf is not None:
+                return _pdf_response(pdf)
+            scan = await get_scan_details(scan_id, current_user.id)
+            if scan is None:
+                raise HTTPException(status_code=404, detail="Scan not found or unauthorized")
+            results = await load_results(get_db(), scan) or {}
+            domain = scan.get("domain") or "N/A"
+            stats = {
+                "global": scan["global_stats"],
+                "endpoints": results.get("endpoints", []),
+                "history": results.get("history", []),
+                "stages": scan.get("stages"),
+                "saturation": scan.get("saturation"),
+                "scalability": scan.get("scalability"),
+            }
     else:
         stats = state.get("stats") or parse_csv_stats()
 
@@ -187,29 +360,47 @@ async def generate_pdf(scan_id: str = None, current_user: UserInDB = Depends(get
 
     logger.info("Construction du PDF en cours...")
     try:
-        buffer = io.BytesIO()
-        build_pdf(buffer, stats)
-        buffer.seek(0)
+        pdf = await pdf_renderer.render(scan_id or "current", stats, domain, version)
         logger.info("PDF généré avec succès.")
-
-        return StreamingResponse(
-            buffer,
-            media_type="application/pdf",
-            headers={"Content-Disposition": 'attachment; filename="rapport_load_test.pdf"'},
-        )
+        return _pdf_response(pdf)
     except Exception as e:
         logger.exception(f"Erreur inattendue pendant la génération du PDF: {e}")
         raise HTTPException(status_code=500, detail="Erreur interne lors de la création du PDF")
 
 
+def _pdf_response(pdf: bytes) -> StreamingResponse:
+    return StreamingResponse(
+        io.BytesIO(pdf),
+        media_type="application/pdf",
+        headers={"Content-Disposition": 'attachment; filename="rapport_load_test.pdf"'},
+    )
+
+
+@router.get("/report/metrics")
+async def get_report_metrics(current_user: UserInDB = Depends(get_current_user)):
+    """Rendus PDF : nombre, cache, attente et durée, rendus en cours."""
+    return pdf_renderer.metrics()
+
+
 @router.delete("/scans/{scan_id}")
 async def delete_scan(scan_id: str, current_user: UserInDB = Depends(get_current_user)):
     db = get_db()
     if db is None:
         raise HTTPException(status_code=500, detail="Database connection not initialized")
 
-    result = await db.scans.delete_one({"_id": ObjectId(scan_id), "user_id": current_user.id})
-    if result.deleted_count == 0:
+    scan = await db.scans.find_one_and_delete(
+        {"_id": ObjectId(scan_id), "user_id": current_user.id}, {"results": 1, **SUMMARY_SCAN_FIELDS}
+    )
+    if scan is None:
         raise HTTPException(status_code=404, detail="Scan not found or not authorized to delete")
+    await delete_results(db, scan)
+    await update_user_summary(db, scan, sign=-1)
+    response_cache.invalidate(user_id=current_user.id)
 
     return {"ok": True, "deleted_id": scan_id}
+
+
+@router.get("/cache/metrics")
+async def get_cache_metrics(current_user: UserInDB = Depends(get_current_user)):
+    """Compteurs du cache de réponses (succès, échecs, 304, évictions...)."""
+    return response_cache.metrics()
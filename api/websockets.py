@@ -1,3 +1,4 @@
+import asyncio
 import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 import jwt
@@ -8,14 +9,19 @@ from core.logger import get_logger
 logger = get_logger("api.websockets")
 router = APIRouter()
 
+# Délai max d'envoi d'un lot de logs à un client ; au-delà il est déconnecté
+WS_SEND_TIMEOUT = 2.0
+# Lignes par trame lors du rejeu de l'historique à la connexion
+REPLAY_CHUNK_LINES = 500
+
 async def broadcast_log(line: str):
     """Envoie une ligne de log à tous les WebSocket connectés."""
-    state["logs"].append(line)
+    seq = state["logs"].append(line)
     logger.info(f"[DIAG][broadcast_log] Envoi à {len(log_subscribers)} client(s): {line[:80]}")
     dead = []
     for ws in log_subscribers:
         try:
-            await ws.send_text(json.dumps({"type": "log", "data": line}))
+            await ws.send_text(json.dumps({"type": "log", "data": line, "seq": seq}))
         except Exception as e:
             logger.warning(f"[DIAG][broadcast_log] ERREUR envoi WS: {e}")
             dead.append(ws)
@@ -25,13 +31,57 @@ async def broadcast_log(line: str):
         log_subscribers.remove(ws)
 
 
-async def broadcast_status(new_status: str):
-    old_status = state["status"]
-    state["status"] = new_status
+async def broadcast_logs(lines: list, scan_state: dict = state, subscribers: list = log_subscribers):
+    """
+    Envoie un lot de lignes (services/log_forwarder) en une seule trame
+    {"type": "logs", "data": [...], "seq": n}, n étant le numéro de la
+    dernière ligne (à repasser en ?since= pour reprendre après coupure).
+    Les clients sont servis en parallèle ; un client trop lent est
+    déconnecté au lieu de retarder les autres.
+    """
+    seq = scan_state["logs"].extend(lines)
+    message = json.dumps({"type": "logs", "data": lines, "seq": seq})
+
+    async def _send(ws):
+        try:
+            await asyncio.wait_for(ws.send_text(message), WS_SEND_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"[DIAG][broadcast_logs] Client WS retiré: {type(e).__name__}: {e}")
+            return ws
+        return None
+
+    results = await asyncio.gather(*(_send(ws) for ws in list(subscribers)))
+    for ws in results:
+        if ws is not None and ws in subscribers:
+            subscribers.remove(ws)
+
+
+async def broadcast_event(event: dict, subscribers: list = log_subscribers):
+    """
+    Relaie un événement structuré de main.py (services/stats_channel) :
+    le message WS a pour type celui de l'événement ("stats", "stage"...).
+    """
+    message = json.dumps({"type": event["type"], "data": event})
+    dead = []
+    for ws in subscribers:
+        try:
+            await ws.send_text(message)
+        except Exception as e:
+            logger.warning(f"[DIAG][broadcast_event] ERREUR envoi WS: {e}")
+            dead.append(ws)
+
+    for ws in dead:
+        if ws in subscribers:
+            subscribers.remove(ws)
+
+
+async def broadcast_status(new_status: str, scan_state: dict = state, subscribers: list = log_subscribers):
+    old_status = scan_state["status"]
+    scan_state["status"] = new_status
     logger.info(f"[DIAG][broadcast_status] ===== TRANSITION: '{old_status}' → '{new_status}' =====")
-    logger.info(f"[DIAG][broadcast_status] Envoi à {len(log_subscribers)} client(s) WS")
+    logger.info(f"[DIAG][broadcast_status] Envoi à {len(subscribers)} client(s) WS")
     dead = []
-    for ws in log_subscribers:
+    for ws in subscribers:
         try:
             await ws.send_text(json.dumps({"type": "status", "data": new_status}))
             logger.info(f"[DIAG][broadcast_status] Status '{new_status}' envoyé avec succès à un client")
@@ -40,41 +90,59 @@ async def broadcast_status(new_status: str):
             dead.append(ws)
 
     for ws in dead:
-        logger.info(f"[DIAG][broadcast_status] Nettoyage client WS mort. Restants: {len(log_subscribers) - 1}")
-        log_subscribers.remove(ws)
+        logger.info(f"[DIAG][broadcast_status] Nettoyage client WS mort. Restants: {len(subscribers) - 1}")
+        subscribers.remove(ws)
 
 
-@router.websocket("/ws/logs")
-async def websocket_logs(ws: WebSocket, token: str = Query(...)):
-    # FIX: Validate JWT token before accepting the WebSocket connection
+def ws_username(token: str):
+    """Utilisateur du JWT passé en query (?token=), None si invalide."""
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        username = payload.get("sub")
-        if not username:
-            await ws.close(code=1008)
-            return
     except jwt.PyJWTError:
         logger.warning("[DIAG][ws_connect] Token WS invalide — connexion refusée")
-        await ws.close(code=1008)
-        return
+        return None
+    return payload.get("sub") or None
 
-    await ws.accept()
-    log_subscribers.append(ws)
-    logger.info(f"[DIAG][ws_connect] ===== NOUVEAU CLIENT WSocket ({username}) =====")
-    logger.info(f"[DIAG][ws_connect] Total connectés: {len(log_subscribers)}")
-    logger.info(f"[DIAG][ws_connect] Status actuel envoyé au client: '{state['status']}'")
-    logger.info(f"[DIAG][ws_connect] Logs existants à envoyer: {len(state['logs'])} lignes")
 
-    # Envoyer l'état actuel et les logs existants dès la connexion
-    await ws.send_text(json.dumps({"type": "status", "data": state["status"]}))
-    for log_line in state["logs"]:
-        await ws.send_text(json.dumps({"type": "log", "data": log_line}))
-    logger.info(f"[DIAG][ws_connect] Historique envoyé. En attente de nouveaux messages...")
+async def serve_logs(ws: WebSocket, scan_state: dict, subscribers: list, since: int = 0):
+    """
+    Client déjà accepté : envoie le statut puis les logs manquants par lots,
+    avant de l'abonner — les lots en direct arrivent ainsi après le rejeu,
+    sans doublon — et garde la connexion ouverte jusqu'à la déconnexion.
+    """
+    await ws.send_text(json.dumps({"type": "status", "data": scan_state["status"]}))
+    ring = scan_state["logs"]
+    if ring.missed(since):
+        await ws.send_text(json.dumps({"type": "logs_missed", "data": ring.first_seq - since - 1}))
+    cursor = since
+    while True:
+        chunk = ring.since(cursor, REPLAY_CHUNK_LINES)
+        if not chunk:
+            break
+        cursor = chunk[-1][0]
+        await ws.send_text(json.dumps({"type": "logs", "data": [line for _, line in chunk], "seq": cursor}))
+    subscribers.append(ws)
+    logger.info(f"[DIAG][ws_connect] Historique envoyé. Total connectés: {len(subscribers)}")
 
     try:
         while True:
             await ws.receive_text()   # Garder la connexion ouverte
     except WebSocketDisconnect:
-        logger.info(f"[DIAG][ws_disconnect] Client WebSocket déconnecté. Restants: {len(log_subscribers) - 1}")
-        if ws in log_subscribers:
-            log_subscribers.remove(ws)
+        logger.info(f"[DIAG][ws_disconnect] Client WebSocket déconnecté. Restants: {len(subscribers) - 1}")
+        if ws in subscribers:
+            subscribers.remove(ws)
+
+
+@router.websocket("/ws/logs")
+async def websocket_logs(ws: WebSocket, token: str = Query(...), since: int = Query(0, ge=0)):
+    # FIX: Validate JWT token before accepting the WebSocket connection
+    username = ws_username(token)
+    if not username:
+        await ws.close(code=1008)
+        return
+
+    await ws.accept()
+    logger.info(f"[DIAG][ws_connect] ===== NOUVEAU CLIENT WSocket ({username}) =====")
+    logger.info(f"[DIAG][ws_connect] Status actuel envoyé au client: '{state['status']}'")
+    logger.info(f"[DIAG][ws_connect] Reprise après la ligne {since} ({state['logs'].last_seq} lignes émises)")
+    await serve_logs(ws, state, log_subscribers, since)
@@ -12,9 +12,11 @@ from fastapi.responses import HTMLResponse
 from api.routes import router as api_router
 from api.websockets import router as ws_router
 from api.auth import router as auth_router
+from api.jobs import router as jobs_router
 from core.logger import get_logger
 from core.database import connect_to_mongo, close_mongo_connection
 from core.config import settings
+from services.pdf_renderer import pdf_renderer
 
 logger = get_logger("app")
 
@@ -26,6 +28,7 @@ async def lifespan(app: FastAPI):
     logger.info("Démarrage du Backend LoadTest API")
     await connect_to_mongo()
     yield
+    pdf_renderer.close()
     close_mongo_connection()
     logger.info("Arrêt du Backend LoadTest API")
 
@@ -38,12 +41,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Inclusion des routeurs
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
 app.include_router(api_router, prefix="/api")
 app.include_router(ws_router)
+app.include_router(jobs_router, tags=["jobs"])
 
 
 @app.get("/test", response_class=HTMLResponse)
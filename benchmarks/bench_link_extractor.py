@@ -0,0 +1,112 @@
+"""
+Benchmark : extraction des liens internes — BeautifulSoup vs extracteur streaming.
+
+Compare, sur des pages HTML synthétiques de plusieurs tailles :
+- l'ancienne implémentation du crawler (arbre BeautifulSoup "html.parser"
+  construit depuis response.text, puis find_all("a")) ;
+- services.link_extractor (HTMLParser incrémental alimenté par morceaux).
+
+Usage : python benchmarks/bench_link_extractor.py [--sizes 0.5 2 8] [--repeat 3]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from urllib.parse import urljoin, urldefrag, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from services.link_extractor import CHUNK_SIZE, extract_links  # noqa: E402
+
+PAGE_URL = "https://bench.test/"
+DOMAIN = "bench.test"
+LEGACY_IGNORED_EXT = (
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp",
+    ".pdf", ".zip", ".mp4", ".mp3", ".css", ".js",
+    ".ico", ".woff", ".woff2", ".ttf", ".xml", ".json"
+)
+
+
+def make_page(size_mb: float) -> bytes:
+    """Page réaliste : beaucoup de texte et de balises, un lien tous les ~400 octets."""
+    block = (
+        '<div class="card"><h3>Produit {i}</h3><p>{text}</p>'
+        '<a href="/produit/{i}">Voir</a> <a href="https://cdn.test/img{i}.png">img</a>'
+        '<img src="/static/{i}.jpg" alt="x"></div>\n'
+    )
+    text = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+    target = int(size_mb * 1024 * 1024)
+    parts, total, i = ["<html><body>"], 0, 0
+    while total < target:
+        part = block.format(i=i, text=text)
+        parts.append(part)
+        total += len(part)
+        i += 1
+    parts.append("</body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def legacy_extract(body: bytes) -> list:
+    """Reproduction de l'ancien BlackBoxCrawler._extraire_liens_internes."""
+    soup = BeautifulSoup(body.decode("utf-8"), "html.parser")
+    liens = []
+    for tag in soup.find_all("a", href=True):
+        href = tag["href"].strip()
+        if not href or href.startswith(("#", "mailto:", "tel:", "javascript:")):
+            continue
+        full_url, _ = urldefrag(urljoin(PAGE_URL, href))
+        parsed = urlparse(full_url)
+        if parsed.netloc != DOMAIN:
+            continue
+        if any(parsed.path.lower().endswith(ext) for ext in LEGACY_IGNORED_EXT):
+            continue
+        liens.append(full_url)
+    return liens
+
+
+def streaming_extract(body: bytes) -> list:
+    chunks = (body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE))
+    return extract_links(chunks, PAGE_URL, DOMAIN, max_bytes=len(body))
+
+
+def measure(fn, body: bytes, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(body)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[0.5, 2, 8], help="Tailles de page (Mo)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'Taille':>8} | {'Impl.':<10} | {'Temps (ms)':>10} | {'Pic mém. (Mo)':>13} | {'Liens':>6}")
+    print("-" * 60)
+    for size in args.sizes:
+        body = make_page(size)
+        rows = [
+            ("bs4", *measure(legacy_extract, body, args.repeat)),
+            ("streaming", *measure(streaming_extract, body, args.repeat)),
+        ]
+        for name, seconds, peak, count in rows:
+            print(f"{size:>6.1f}Mo | {name:<10} | {seconds * 1000:>10.1f} | {peak / 1e6:>13.1f} | {count:>6}")
+        speedup = rows[0][1] / rows[1][1] if rows[1][1] else float("inf")
+        print(f"{'':>8}   -> accélération x{speedup:.1f}, mémoire /{rows[0][2] / max(rows[1][2], 1):.0f}")
+        print("-" * 60)
+
+
+if __name__ == "__main__":
+    main()
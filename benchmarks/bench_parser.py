@@ -0,0 +1,113 @@
+"""
+Benchmark : parsing de rapport_stats_history.csv — DictReader vs colonnes typées.
+
+Compare, sur des historiques synthétiques (une ligne par endpoint et par
+seconde, plus la ligne "Aggregated") :
+- l'ancienne implémentation de parse_csv_stats (csv.DictReader sur toutes
+  les lignes, liste de dicts) ;
+- services.parser.load_history (préfiltre "Aggregated", index de colonnes
+  résolus une fois, array typés).
+
+Usage : python benchmarks/bench_parser.py [--hours 1 4] [--endpoints 50 200] [--repeat 3]
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("dburl", "mongodb://localhost:27017")
+
+from services.parser import _safe_float, _safe_int, load_history  # noqa: E402
+
+HEADER = [
+    "Timestamp", "User Count", "Type", "Name", "Requests/s", "Failures/s",
+    "50%", "66%", "75%", "80%", "90%", "95%", "98%", "99%", "99.9%", "99.99%", "100%",
+    "Total Request Count", "Total Failure Count", "Total Median Response Time",
+    "Total Average Response Time", "Total Min Response Time", "Total Max Response Time",
+    "Total Average Content Size",
+]
+
+
+def make_history(path: Path, hours: float, endpoints: int):
+    """Fichier au format Locust --csv-full-history."""
+    names = [f"/api/resource/{i}/{{id}}" for i in range(endpoints)]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for second in range(int(hours * 3600)):
+            ts = 1_700_000_000 + second
+            users = 10 + second // 60
+            for i, name in enumerate(names):
+                writer.writerow([ts, users, "GET", name, 1.5, 0.0, 40 + i % 7, 50, 60, 70, 80,
+                                 120, 150, 180, 250, 300, 300, second, 0, 40, 45.2, 3, 300, 2048])
+            writer.writerow([ts, users, "", "Aggregated", 1.5 * endpoints, 0.0, 45, 55, 65, 75, 85,
+                             130, 160, 190, 260, 310, 310, second * endpoints, 0, 45, 47.1, 3, 310, 2048])
+
+
+def legacy_parse(path: Path) -> list:
+    """Reproduction de l'ancienne boucle de parse_csv_stats sur l'historique."""
+    history = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("Name") == "Aggregated":
+                history.append({
+                    "timestamp": _safe_int(row.get("Timestamp")),
+                    "users": _safe_int(row.get("User Count")),
+                    "rps": _safe_float(row.get("Requests/s")),
+                    "failures_s": _safe_float(row.get("Failures/s")),
+                    "median": _safe_float(row.get("50%")),
+                    "p95": _safe_float(row.get("95%")),
+                    "p99": _safe_float(row.get("99%")),
+                })
+    return history
+
+
+def measure(fn, path: Path, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(path)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 4], help="Durées de run simulées (h)")
+    parser.add_argument("--endpoints", type=int, nargs="+", default=[50, 200], help="Endpoints par seconde")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'Run':>14} | {'Fichier':>9} | {'Impl.':<10} | {'Temps (s)':>9} | {'Pic mém. (Mo)':>13} | {'Points':>6}")
+    print("-" * 77)
+    with tempfile.TemporaryDirectory() as tmp:
+        for hours in args.hours:
+            for endpoints in args.endpoints:
+                path = Path(tmp) / "rapport_stats_history.csv"
+                make_history(path, hours, endpoints)
+                label = f"{hours:g}h x {endpoints}"
+                size = f"{path.stat().st_size / 1e6:.0f}Mo"
+                rows = [
+                    ("dictreader", *measure(legacy_parse, path, args.repeat)),
+                    ("colonnes", *measure(load_history, path, args.repeat)),
+                ]
+                for name, seconds, peak, count in rows:
+                    print(f"{label:>14} | {size:>9} | {name:<10} | {seconds:>9.2f} | {peak / 1e6:>13.2f} | {count:>6}")
+                speedup = rows[0][1] / rows[1][1] if rows[1][1] else float("inf")
+                print(f"{'':>14}   -> accélération x{speedup:.1f}, mémoire /{rows[0][2] / max(rows[1][2], 1):.1f}")
+                print("-" * 77)
+
+
+if __name__ == "__main__":
+    main()
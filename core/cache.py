@@ -0,0 +1,183 @@
+"""
+Cache en lecture (read-through) des réponses JSON des routes de consultation
+(/api/scans, /api/scans/summary, /api/scans/{id}/details, /api/stats).
+
+Ces données ne changent qu'à la fin d'un scan ou à sa suppression, alors que
+le dashboard les redemande à chaque rafraîchissement :
+- clés (espace, user_id, paramètres...) : une entrée par utilisateur ;
+- éviction LRU bornée en nombre d'entrées et en octets, plus un TTL ;
+- invalidation explicite par utilisateur (scan enregistré / supprimé) ou par
+  espace (stats du scan en cours) ; elle incrémente aussi un numéro de
+  génération de l'utilisateur / de l'espace : une réponse chargée avant
+  l'invalidation et terminée après n'est pas mise en cache ;
+- corps JSON sérialisé une seule fois, ETag fort = empreinte du corps :
+  un client qui renvoie If-None-Match reçoit un 304 sans corps.
+
+Le TTL borne aussi la durée de vie d'une entrée modifiée hors de l'API
+(ex. scripts/rebuild_summaries.py, autre processus).
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from core.config import settings
+
+# Les navigateurs gardent la réponse mais la revalident à chaque requête (ETag)
+CACHE_CONTROL = "private, no-cache"
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "headers", "expires")
+
+    def __init__(self, body: bytes, headers: Optional[Dict[str, str]], expires: float):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.headers = headers or {}
+        self.expires = expires
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        # Générations par utilisateur et par espace, incrémentées par invalidate()
+        self._user_generations: Dict[str, int] = {}
+        self._namespace_generations: Dict[str, int] = {}
+        # Les runners thread invalident depuis leur propre thread
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ("hits", "misses", "not_modified", "evictions", "expirations", "invalidations", "stale"), 0
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: tuple):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= self._clock():
+                self._drop(key)
+                self._counters["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry
+
+    def _generation(self, key: tuple) -> tuple:
+        return (self._namespace_generations.get(key[0], 0),
+                self._user_generations.get(key[1], 0) if len(key) > 1 else 0)
+
+    def generation(self, key: tuple) -> tuple:
+        """Générations (espace, utilisateur) de `key`, à relever avant de charger la réponse."""
+        with self._lock:
+            return self._generation(key)
+
+    def put(self, key: tuple, content, headers: Optional[Dict[str, str]] = None,
+            generation: Optional[tuple] = None) -> CachedResponse:
+        """
+        Met en cache la réponse de `key`. `generation` : valeur de generation(key)
+        relevée avant le chargement ; si une invalidation a eu lieu depuis, la
+        réponse est servie mais pas gardée.
+        """
+        body = json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        entry = CachedResponse(body, headers, self._clock() + self.ttl)
+        if len(body) > self.max_bytes:
+            # Trop gros pour être gardé : servi tel quel
+            return entry
+        with self._lock:
+            if generation is not None and generation != self._generation(key):
+                self._counters["stale"] += 1
+                return entry
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+        return entry
+
+    def invalidate(self, user_id: Optional[str] = None, namespace: Optional[str] = None) -> int:
+        """Supprime les entrées d'un utilisateur et/ou d'un espace ; renvoie leur nombre."""
+        with self._lock:
+            if user_id is not None:
+                self._user_generations[user_id] = self._user_generations.get(user_id, 0) + 1
+            if namespace is not None:
+                self._namespace_generations[namespace] = self._namespace_generations.get(namespace, 0) + 1
+            keys = [
+                key for key in self._entries
+                if (user_id is None or key[1] == user_id) and (namespace is None or key[0] == namespace)
+            ]
+            for key in keys:
+                self._drop(key)
+            self._counters["invalidations"] += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def respond(self, request: Request, entry: CachedResponse) -> Response:
+        headers = {"ETag": entry.etag, "Cache-Control": CACHE_CONTROL, **entry.headers}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            with self._lock:
+                self._counters["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+    async def serve(self, request: Request, key: tuple, loader, with_headers: bool = False) -> Response:
+        """
+        Réponse en cache pour `key`, sinon résultat de `await loader()` mis en
+        cache. with_headers : loader renvoie (contenu, en-têtes de la réponse).
+        """
+        entry = self.get(key)
+        if entry is None:
+            generation = self.generation(key)
+            content, headers = await loader() if with_headers else (await loader(), None)
+            entry = self.put(key, content, headers, generation)
+        return self.respond(request, entry)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_ratio": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
+
+
+response_cache = ResponseCache(settings.response_cache_entries, settings.response_cache_bytes,
+                               settings.response_cache_ttl)
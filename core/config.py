@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 # backend/ directory (works both locally and on Railway)
@@ -13,6 +14,18 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int = 60 * 24 * 7  # 7 days
     # Comma-separated origins, e.g.: http://localhost:5173,https://myapp.com
     allowed_origins: str = "http://localhost:5173,http://127.0.0.1:5173"
+    # Scan runner: "thread" (thread + Popen) or "asyncio" (services/async_runner.py)
+    scan_runner: Literal["thread", "asyncio"] = "thread"
+    # Read-through cache of the scan read endpoints (core/cache.py)
+    response_cache_entries: int = 1024
+    response_cache_bytes: int = 64 * 1024 * 1024
+    response_cache_ttl: float = 300.0
+    # PDF reports (services/pdf_renderer.py): render processes, renders
+    # running or queued at once, rendered PDFs kept in memory (count and bytes)
+    pdf_render_workers: int = 2
+    pdf_max_concurrent_renders: int = 4
+    pdf_cache_entries: int = 32
+    pdf_cache_bytes: int = 64 * 1024 * 1024
 
     model_config = SettingsConfigDict(
         env_file=str(BACKEND_DIR / ".env"),
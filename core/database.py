@@ -1,5 +1,6 @@
 import logging
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from core.config import settings
 
 logger = logging.getLogger("core.database")
@@ -20,6 +21,31 @@ async def connect_to_mongo():
         logger.info("Connected to MongoDB -> locust_dashboard_db [ping OK]")
     except Exception as e:
         logger.error(f"MongoDB ping FAILED: {e}. L'application démarre mais la base de données est inaccessible.")
+        return
+    await ensure_indexes(db_ctx.db)
+
+# Index requis par les requêtes de l'API (create_indexes est idempotent)
+INDEXES = {
+    # /api/scans : filtre par utilisateur, pagination par curseur sur (created_at, _id)
+    "scans": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="user_created"),
+    ],
+    # get_current_user / login / register
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+}
+
+async def ensure_indexes(db):
+    for collection, indexes in INDEXES.items():
+        try:
+            names = await db[collection].create_indexes(indexes)
+            logger.info(f"Indexes ready on {collection}: {', '.join(names)}")
+        except Exception as e:
+            # ex. des doublons existants empêchent un index unique : l'application démarre quand même
+            logger.error(f"Index creation FAILED on {collection}: {e}")
 
 def close_mongo_connection():
     if db_ctx.client:
@@ -0,0 +1,79 @@
+from collections import deque
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+
+# Lignes de log conservées pour le scan en cours (les plus anciennes sont évincées)
+DEFAULT_CAPACITY = 10_000
+
+
+class LogRing:
+    """
+    Tampon circulaire de lignes de log à numéros de séquence croissants.
+
+    La première ligne porte le numéro 1 ; les numéros ne repartent jamais à
+    zéro (même après clear()), si bien qu'un client qui se reconnecte avec
+    le dernier numéro reçu (`since`) ne récupère que les lignes manquantes.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("La capacité doit être positive")
+        self.capacity = capacity
+        self._lines = deque(maxlen=capacity)
+        self._next_seq = 1
+
+    @property
+    def last_seq(self) -> int:
+        """Numéro de la dernière ligne ajoutée (0 si aucune)."""
+        return self._next_seq - 1
+
+    @property
+    def first_seq(self) -> int:
+        """Numéro de la plus ancienne ligne encore conservée."""
+        return self._next_seq - len(self._lines)
+
+    def append(self, line: str) -> int:
+        self._lines.append(line)
+        self._next_seq += 1
+        return self.last_seq
+
+    def extend(self, lines) -> int:
+        for line in lines:
+            self._lines.append(line)
+            self._next_seq += 1
+        return self.last_seq
+
+    def clear(self):
+        """Vide le tampon sans réinitialiser la numérotation."""
+        self._lines.clear()
+
+    def since(self, seq: int = 0, limit: Optional[int] = None) -> List[Tuple[int, str]]:
+        """Lignes (numéro, texte) de numéro strictement supérieur à `seq`, au plus `limit`."""
+        start = max(0, seq + 1 - self.first_seq)
+        stop = None if limit is None else start + limit
+        first = self.first_seq
+        return [(first + i, line) for i, line in enumerate(islice(self._lines, start, stop), start)]
+
+    def page(self, since: int = 0, limit: Optional[int] = None) -> dict:
+        """
+        Réponse de GET /logs : lignes de numéro > since ; last_seq est la
+        valeur de `since` à repasser pour la suite, missed indique que des
+        lignes demandées ont déjà été évincées.
+        """
+        entries = self.since(since, limit)
+        return {
+            "logs": [line for _, line in entries],
+            "first_seq": entries[0][0] if entries else None,
+            "last_seq": entries[-1][0] if entries else max(since, self.last_seq),
+            "missed": self.missed(since),
+        }
+
+    def missed(self, seq: int) -> bool:
+        """Vrai si des lignes postérieures à `seq` ont déjà été évincées."""
+        return seq + 1 < self.first_seq
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._lines)
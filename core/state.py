@@ -1,12 +1,17 @@
 from fastapi import WebSocket
 
+from core.log_ring import LogRing
+
 state = {
     "status": "idle",  # idle | crawling | running | done | error
     "domain": "",
-    "logs": [],
+    "logs": LogRing(),  # lignes numérotées, capacité bornée (core/log_ring.py)
     "process": None,
     "stats": None,
     "discovered_urls": [],
+    "live": None,  # dernier événement "stats" publié par main.py (chaque seconde)
+    "log_forwarder": None,  # services.log_forwarder.LogForwarder du scan en cours
+    "scan_task": None,  # asyncio.Task du scan (runner asyncio uniquement)
 }
 
 log_subscribers: list[WebSocket] = []
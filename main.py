@@ -8,7 +8,7 @@
 ║  puis les utilise comme cibles de test.                       ║
 ╠══════════════════════════════════════════════════════════════╣
 ║  INSTALLATION :                                               ║
-║    pip install locust requests beautifulsoup4                 ║
+║    pip install locust requests                                ║
 ║                                                               ║
 ║  LANCEMENT (interface web) :                                  ║
 ║    locust -f loadtest.py --host=https://votresite.com         ║
@@ -17,23 +17,53 @@
 ║  LANCEMENT AUTOMATIQUE (headless + rapport CSV) :             ║
 ║    locust -f loadtest.py --host=https://votresite.com \       ║
 ║           --headless --csv=rapport                            ║
+║                                                               ║
+║  MULTI-COEURS (1 master + N workers sur la meme machine) :    ║
+║    ajouter --processes N (ou -1 pour un worker par coeur)     ║
 ╚══════════════════════════════════════════════════════════════╝
 """
 
+import json
 import random
 import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import gevent
 import requests
-from urllib.parse import urlparse, urljoin, urldefrag
-from bs4 import BeautifulSoup
+import requests.adapters
+from urllib.parse import urlparse, urljoin
+from pathlib import Path
 
-from locust import HttpUser, task, between, events
+from locust import FastHttpUser, HttpUser, User, task, between, events
+from locust.runners import MasterRunner, WorkerRunner
 from locust.shape import LoadTestShape
 
+# Les modules services/ importes ici tournent dans le subprocess Locust, qui
+# n'a pas la configuration de l'API : ni eux ni leurs imports ne doivent
+# charger core.config (Settings exige dburl)
+from services.crawl_cache import CrawlCache
+from services.link_extractor import CHUNK_SIZE, extract_links
+from services.sitemap import discover_sitemap_urls, fetch_robots, is_allowed
+from services.url_clustering import cluster_routes, dedupe_urls
+from services.journeys import JourneyModel, build_link_graph
+from services.load_shapes import loads_stages, total_duration
+from services.capacity import (
+    RESULT_SUFFIX, CapacitySearch, max_search_duration, stage_metrics, stats_snapshot,
+)
+from services.stats_channel import EventPublisher
+from services.histogram import RESULT_SUFFIX as HISTOGRAMS_SUFFIX, LatencyHistograms
+from services.stage_stats import RESULT_SUFFIX as STAGES_SUFFIX
+
 
 # ─────────────────────────────────────────────
 # ⚙️  CONFIGURATION
 # ─────────────────────────────────────────────
 
+# Paliers par defaut ; une autre forme (rampe, pic, endurance...) peut etre
+# passee par l'API via --load-shape (voir services/load_shapes.py)
 PALIERS = [
     # (nb_users, spawn_rate, duree_secondes, label)
     (1,    1,   30, "Palier 1  ->   1 utilisateur"),
@@ -56,49 +86,169 @@ MAX_URLS = 30
 # Timeout pour le crawl (secondes)
 CRAWL_TIMEOUT = 10
 
+# Octets lus au plus par page HTML pour en extraire les liens
+CRAWL_MAX_PAGE_BYTES = 2 * 1024 * 1024
+
+# Nombre max de pages telechargees en parallele pendant le crawl
+# (1 = parcours sequentiel historique). Surchargeable via --crawl-concurrency.
+CRAWL_CONCURRENCY = 8
+
+# Cache disque des crawls (services/crawl_cache.py). Une entree plus jeune que
+# CRAWL_CACHE_TTL est reutilisee sans crawl ; au-dela elle est revalidee en GET
+# conditionnel. Surchargeable via --crawl-cache-ttl / --no-crawl-cache.
+CRAWL_CACHE_DIR = Path(__file__).parent / ".crawl_cache"
+CRAWL_CACHE_TTL = 3600
+
+# Moteur HTTP des utilisateurs simules : "http" (HttpUser / requests) ou
+# "fast" (FastHttpUser / geventhttpclient). Surchargeable via --user-engine.
+USER_ENGINES = ("http", "fast")
+DEFAULT_USER_ENGINE = "http"
+
+CRAWL_USER_AGENT = (
+    "Mozilla/5.0 (compatible; LoadTester/1.0; "
+    "+https://github.com/locustio/locust)"
+)
+
 # Stockage partage des URLs decouvertes entre tous les workers
 discovered_urls: list = []
 
+# Gabarit de route de chaque URL decouverte (services/url_clustering.py) :
+# les requetes sont nommees par gabarit pour borner le nombre d'entrees de stats
+url_templates: dict = {}
+
+# Chaine de Markov construite sur le graphe de liens (services/journeys.py) :
+# les utilisateurs enchainent des sessions au lieu de pages tirees au hasard
+journey_model = None
+
+# Intervalle (s) entre deux evenements "stats" publies au runner
+STATS_EVENT_INTERVAL = 1.0
+
+# Canal d'evenements vers services/locust_runner (--events-port) ; None hors API
+publisher = None
+_stats_greenlet = None
+
+# Recherche de capacite en cours (--capacity-search, services/capacity.py)
+capacity_search = None
+
+# Histogrammes de latence par (palier, endpoint) (services/histogram.py).
+# En mode distribue, chaque worker accumule ses mesures dans
+# _histogrammes_a_envoyer et les joint a ses rapports ; le master les range
+# dans le palier en cours a la reception.
+histogrammes = LatencyHistograms()
+_histogrammes_a_envoyer = LatencyHistograms()
+palier_courant = None
+
+# Bornes (heure de debut/fin) des paliers executes, pour les stats par palier
+# (services/stage_stats.py) ; ecrites dans <prefixe>_stages.json
+bornes_paliers = []
+
 # Garde : le crawl ne doit s'executer qu'une seule fois
 # (Locust 2.x declenche test_start une fois par palier avec LoadTestShape)
 _crawl_done = False
 
+# Palier demande par la forme de charge avant la fin du crawl : Locust appelle
+# tick() avant test_start, la borne du premier palier s'ouvre donc a la fin de
+# on_test_start (sinon la duree du crawl, sans requete, compterait dans le palier)
+_crawl_termine = False
+_palier_en_attente = None
+
 
 # ─────────────────────────────────────────────
 # 🕷️  CRAWLER BLACK BOX
 # ─────────────────────────────────────────────
 
+def publier(event_type, **data):
+    """Publie un evenement structure au runner (sans effet hors API)."""
+    if publisher is not None:
+        publisher.publish(event_type, **data)
+
+
+def afficher_urls(urls):
+    """Imprime la liste des URLs retenues, une par ligne "    - /chemin"."""
+    print(f"\n  {len(urls)} URL(s) decouvertes :\n", flush=True)
+    for url in urls:
+        print(f"    - {url}", flush=True)
+    print("-"*55 + "\n", flush=True)
+
+
 class BlackBoxCrawler:
     """
     Crawle automatiquement un site pour decouvrir ses URLs internes.
     Ne requiert aucune connaissance prealable de la structure du site.
+
+    Avec concurrency > 1, les pages d'un meme niveau de profondeur sont
+    telechargees en parallele (au plus `concurrency` requetes en vol) via
+    une Session partagee qui reutilise les connexions keep-alive.
     """
 
-    def __init__(self, base_url, max_depth=2, max_urls=30):
+    def __init__(self, base_url, max_depth=2, max_urls=30, concurrency=1,
+                 page_cache=None, use_sitemap=True, respect_robots=True,
+                 on_progress=None):
         self.base_url = base_url.rstrip("/")
         self.domain = urlparse(base_url).netloc
         self.max_depth = max_depth
         self.max_urls = max_urls
+        self.concurrency = max(1, int(concurrency))
+        self.use_sitemap = use_sitemap
+        self.respect_robots = respect_robots
+        # Regles robots.txt (None = tout est autorise)
+        self.robots = None
         self.visited = set()
         self.found_urls = []
+        self.pages_fetched = 0
+        self.pages_revalidated = 0
+        self._lock = threading.Lock()
+        # Appelee avec (pages telechargees, URLs trouvees) a chaque page retenue
+        self.on_progress = on_progress
+
+        # Validateurs et liens d'un crawl precedent (services/crawl_cache) :
+        # {url: {"path", "etag", "last_modified", "links"}}
+        self.page_cache = page_cache or {}
+        # Meme structure, alimentee par ce crawl pour la prochaine fois
+        self.pages = {}
+
+        # Une seule Session : pool de connexions keep-alive par hote,
+        # dimensionne pour la concurrence demandee.
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = CRAWL_USER_AGENT
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=self.concurrency,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def crawl(self):
         """Lance le crawl et retourne la liste des URLs decouvertes."""
         print("\n" + "-"*55, flush=True)
         print(f"  [CRAWL] Analyse de : {self.base_url}", flush=True)
-        print(f"  Profondeur : {self.max_depth} | Max URLs : {self.max_urls}", flush=True)
+        print(f"  Profondeur : {self.max_depth} | Max URLs : {self.max_urls} "
+              f"| Concurrence : {self.concurrency}", flush=True)
         print("-"*55, flush=True)
 
-        self._crawl_url(self.base_url, depth=0)
-
-        # Toujours inclure la racine
-        if "/" not in self.found_urls:
+        debut = time.monotonic()
+        try:
+            # Voie rapide : robots.txt puis sitemap(s) ; le crawl des liens
+            # ne sert qu'a completer si le budget d'URLs n'est pas atteint.
+            self._lire_robots_et_sitemaps()
+            if len(self.found_urls) < self.max_urls:
+                if self.concurrency > 1:
+                    self._crawl_concurrent()
+                else:
+                    self._crawl_url(self.base_url, depth=0)
+        finally:
+            self.session.close()
+        duree = time.monotonic() - debut
+
+        # Toujours inclure la racine (sauf si robots.txt l'exclut)
+        if "/" not in self.found_urls and self._autorise(self.base_url + "/"):
             self.found_urls.insert(0, "/")
 
-        print(f"\n  {len(self.found_urls)} URL(s) decouvertes :\n", flush=True)
-        for url in self.found_urls:
-            print(f"    - {url}", flush=True)
-        print("-"*55 + "\n", flush=True)
+        debit = self.pages_fetched / duree if duree > 0 else 0.0
+        print(f"\n  [CRAWL] {self.pages_fetched} page(s) en {duree:.1f}s "
+              f"({debit:.1f} pages/s, {self.pages_revalidated} inchangee(s) via 304)",
+              flush=True)
+        afficher_urls(self.found_urls)
 
         return self.found_urls
 
@@ -112,138 +262,351 @@ class BlackBoxCrawler:
             return
 
         self.visited.add(url)
+        if not self._autorise(url):
+            return
+
+        links, fallback = self._fetch_page(url)
+        if fallback:
+            self._crawl_url(fallback, depth)
+            return
+
+        # Crawler recursivement
+        for link in links:
+            if len(self.found_urls) >= self.max_urls:
+                break
+            self._crawl_url(link, depth + 1)
+
+    def _crawl_concurrent(self):
+        """
+        Parcours en largeur, niveau par niveau : chaque niveau est telecharge
+        en parallele, les resultats sont integres dans le thread appelant
+        (pas de verrou sur visited / found_urls).
+        """
+        frontier = deque([self.base_url])
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for depth in range(self.max_depth + 1):
+                if not frontier or len(self.found_urls) >= self.max_urls:
+                    break
+                next_frontier = deque()
+                pending = {}
+
+                def _soumettre():
+                    # Garde au plus `concurrency` requetes en vol et ne
+                    # depasse pas le budget d'URLs restant. La file est relue
+                    # a chaque appel : les replis HTTP ajoutes en cours de
+                    # niveau sont bien soumis.
+                    while frontier and len(pending) < self.concurrency:
+                        if len(self.found_urls) + len(pending) >= self.max_urls:
+                            return
+                        url = frontier.popleft()
+                        if url in self.visited:
+                            continue
+                        self.visited.add(url)
+                        if not self._autorise(url):
+                            continue
+                        pending[pool.submit(self._fetch_page, url)] = url
+
+                _soumettre()
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        del pending[future]
+                        links, fallback = future.result()
+                        if fallback:
+                            # Meme profondeur : on retente en HTTP dans ce niveau
+                            frontier.append(fallback)
+                            continue
+                        next_frontier.extend(links)
+                    _soumettre()
+                frontier = next_frontier
+
+    def _fetch_page(self, url):
+        """
+        Telecharge une page et retourne (liens_internes, url_de_repli).
+        url_de_repli est renseignee quand un echec SSL justifie un essai en HTTP.
+        """
+        cached = self.page_cache.get(url)
+        headers = {}
+        if cached:
+            # GET conditionnel : un 304 evite le telechargement et le parsing
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
 
         try:
-            headers = {
-                "User-Agent": (
-                    "Mozilla/5.0 (compatible; LoadTester/1.0; "
-                    "+https://github.com/locustio/locust)"
-                )
-            }
-            response = requests.get(
+            # stream=True : le corps n'est lu que si la page est du HTML,
+            # et seulement jusqu'a CRAWL_MAX_PAGE_BYTES
+            with self.session.get(
                 url,
                 timeout=CRAWL_TIMEOUT,
                 headers=headers,
-                allow_redirects=True
-            )
-
-            # N'indexe que les pages HTML
-            content_type = response.headers.get("Content-Type", "")
-            if "text/html" not in content_type:
-                return
-
-            # Extraire le chemin relatif
-            path = urlparse(response.url).path or "/"
-            if path not in self.found_urls:
-                self.found_urls.append(path)
-
-            # Parser les liens de la page
-            soup = BeautifulSoup(response.text, "html.parser")
-            links = self._extraire_liens_internes(soup, response.url)
-
-            # Crawler recursivement
-            for link in links:
-                if len(self.found_urls) >= self.max_urls:
-                    break
-                self._crawl_url(link, depth + 1)
+                allow_redirects=True,
+                stream=True
+            ) as response:
+                with self._lock:
+                    self.pages_fetched += 1
+
+                if response.status_code == 304 and cached:
+                    with self._lock:
+                        self.pages_revalidated += 1
+                    self._enregistrer_page(url, cached["path"], cached.get("etag"),
+                                           cached.get("last_modified"), cached["links"])
+                    return cached["links"], None
+
+                # N'indexe que les pages HTML
+                content_type = response.headers.get("Content-Type", "")
+                if "text/html" not in content_type:
+                    return [], None
+
+                # Extraire le chemin relatif
+                path = urlparse(response.url).path or "/"
+
+                # Extraire les liens au fil de la lecture du corps
+                encoding = response.encoding if "charset" in content_type.lower() else "utf-8"
+                links = extract_links(
+                    response.iter_content(CHUNK_SIZE),
+                    response.url,
+                    self.domain,
+                    encoding=encoding or "utf-8",
+                    max_bytes=CRAWL_MAX_PAGE_BYTES,
+                )
+                self._enregistrer_page(url, path, response.headers.get("ETag"),
+                                       response.headers.get("Last-Modified"), links)
+                return links, None
 
         except requests.exceptions.SSLError:
             logging.warning(f"  SSL error sur {url} — passage en HTTP")
             if url.startswith("https://"):
-                self._crawl_url(url.replace("https://", "http://", 1), depth)
+                return [], url.replace("https://", "http://", 1)
         except requests.exceptions.ConnectionError:
             logging.warning(f"  Connexion impossible : {url}")
         except requests.exceptions.Timeout:
             logging.warning(f"  Timeout sur : {url}")
         except Exception as e:
             logging.warning(f"  Erreur sur {url} : {e}")
+        return [], None
+
+    def _lire_robots_et_sitemaps(self):
+        """Charge les regles robots.txt et pre-remplit les URLs depuis les sitemaps."""
+        sitemaps = []
+        if self.respect_robots or self.use_sitemap:
+            rules, sitemaps = fetch_robots(self.session, self.base_url, CRAWL_TIMEOUT)
+            if self.respect_robots and rules is not None:
+                self.robots = rules
+                print("  [ROBOTS] Regles robots.txt appliquees", flush=True)
+
+        if not self.use_sitemap:
+            return
+        paths, lus = discover_sitemap_urls(
+            self.session, self.base_url, self.domain, self.robots,
+            sitemaps, self.max_urls, CRAWL_TIMEOUT,
+        )
+        with self._lock:
+            for path in paths:
+                if path not in self.found_urls and len(self.found_urls) < self.max_urls:
+                    self.found_urls.append(path)
+        print(f"  [SITEMAP] {len(paths)} URL(s) via {lus} sitemap(s)", flush=True)
+
+    def _autorise(self, url):
+        return is_allowed(self.robots, url)
+
+    def _enregistrer_page(self, url, path, etag, last_modified, links):
+        """Ajoute la page aux URLs decouvertes et a l'entree de cache a venir."""
+        # Apres redirection, la page finale peut etre exclue par robots.txt
+        if not self._autorise(urljoin(url, path)):
+            return
+        with self._lock:
+            if path not in self.found_urls and len(self.found_urls) < self.max_urls:
+                self.found_urls.append(path)
+            self.pages[url] = {
+                "path": path,
+                "etag": etag,
+                "last_modified": last_modified,
+                "links": links,
+            }
+            progression = (self.pages_fetched, len(self.found_urls))
+        if self.on_progress:
+            self.on_progress(*progression)
+
+
+# ─────────────────────────────────────────────
+# 📐 FORME DE CHARGE EN PALIERS
+# ─────────────────────────────────────────────
 
-    def _extraire_liens_internes(self, soup, page_url):
-        """Extrait tous les liens internes d'une page HTML."""
-        liens = []
-        for tag in soup.find_all("a", href=True):
-            href = tag["href"].strip()
+def paliers_du_test(environment):
+    """
+    Paliers du test : ceux transmis par --load-shape (JSON construit par
+    services/load_shapes depuis la forme demandee a l'API), sinon PALIERS.
+    """
+    raw = getattr(environment.parsed_options, "load_shape", None)
+    return loads_stages(raw) if raw else PALIERS
 
-            # Ignorer les liens vides, ancres, mailto, tel, javascript
-            if not href or href.startswith(("#", "mailto:", "tel:", "javascript:")):
-                continue
 
-            # Construire l'URL absolue
-            full_url, _ = urldefrag(urljoin(page_url, href))
-            parsed = urlparse(full_url)
+def spec_capacite(environment):
+    """Specification de la recherche de capacite (--capacity-search), sinon None."""
+    raw = getattr(environment.parsed_options, "capacity_search", None)
+    return json.loads(raw) if raw else None
 
-            # Garder uniquement les liens du meme domaine
-            if parsed.netloc != self.domain:
-                continue
 
-            # Ignorer les fichiers non-HTML classiques
-            ignored_ext = (
-                ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp",
-                ".pdf", ".zip", ".mp4", ".mp3", ".css", ".js",
-                ".ico", ".woff", ".woff2", ".ttf", ".xml", ".json"
-            )
-            if any(parsed.path.lower().endswith(ext) for ext in ignored_ext):
-                continue
+def _changer_palier(index, users, label):
+    global palier_courant, _palier_en_attente
+    palier_courant = index
+    if not _crawl_termine:
+        _palier_en_attente = (index, users, label)
+        return
+    _ouvrir_borne(index, users, label)
 
-            if full_url not in self.visited:
-                liens.append(full_url)
 
-        return liens
+def _ouvrir_palier_en_attente():
+    """Fin du crawl : ouvre la borne du palier demande pendant le crawl."""
+    global _crawl_termine, _palier_en_attente
+    _crawl_termine = True
+    if _palier_en_attente is not None:
+        _ouvrir_borne(*_palier_en_attente)
+        _palier_en_attente = None
 
 
-# ─────────────────────────────────────────────
-# 📐 FORME DE CHARGE EN PALIERS
-# ─────────────────────────────────────────────
+def _ouvrir_borne(index, users, label):
+    maintenant = time.time()
+    if bornes_paliers:
+        bornes_paliers[-1]["end"] = maintenant
+    bornes_paliers.append({"index": index, "users": users, "label": label,
+                           "start": maintenant, "end": None})
+
 
 class StepLoadShape(LoadTestShape):
-    """Montee en charge automatique par paliers."""
+    """
+    Montee en charge automatique par paliers, ou recherche de la capacite
+    max en boucle fermee quand --capacity-search est fourni.
+    """
 
     def __init__(self):
         super().__init__()
         self._palier_actuel = -1
+        self._paliers = None
+        # Mode capacite : palier en cours et instantane des stats apres stabilisation
+        self._spec = None
+        self._users = 0
+        self._spawn_rate = 1.0
+        self._palier_debut = None
+        self._instantane = None
 
     def tick(self):
+        global capacity_search
+        if self._paliers is None:
+            self._paliers = paliers_du_test(self.runner.environment)
+            self._spec = spec_capacite(self.runner.environment)
+            if self._spec:
+                capacity_search = CapacitySearch.from_spec(self._spec)
+        if self._spec:
+            return self._tick_capacite()
+
         elapsed = self.get_run_time()
         temps_cumule = 0
 
-        for index, (nb_users, spawn_rate, duree, label) in enumerate(PALIERS):
+        for index, (nb_users, spawn_rate, duree, label) in enumerate(self._paliers):
             temps_cumule += duree
             if elapsed < temps_cumule:
                 if index != self._palier_actuel:
                     self._palier_actuel = index
+                    _changer_palier(index, nb_users, label)
                     logging.info("\n" + "="*52)
                     logging.info(f"  >> {label}")
                     logging.info(f"  Duree : {duree}s | Spawn rate : {spawn_rate}/s")
                     logging.info("="*52)
+                    publier("stage", index=index, users=nb_users, spawn_rate=spawn_rate,
+                            duration=duree, label=label)
                 return (nb_users, spawn_rate)
 
         return None  # Fin du test
 
+    def _tick_capacite(self):
+        elapsed = self.get_run_time()
+
+        if self._users == 0:
+            # Premier palier : son chrono demarre au premier tick qui suit la
+            # fin du crawl (bloquant, dans test_start)
+            self._nouveau_palier(capacity_search.current, None)
+            return (self._users, self._spawn_rate)
+        if self._palier_debut is None:
+            if not _crawl_termine:
+                # Chrono (et fenetre de stabilisation) du premier palier : apres le crawl
+                return (self._users, self._spawn_rate)
+            self._palier_debut = elapsed
+
+        ecoule = elapsed - self._palier_debut
+        if self._instantane is None and ecoule >= self._spec["settle_duration"]:
+            self._instantane = stats_snapshot(self.runner.stats.total)
+
+        if ecoule >= self._spec["stage_duration"]:
+            mesure = stage_metrics(self._instantane, stats_snapshot(self.runner.stats.total))
+            suivant = capacity_search.observe(self._users, mesure)
+            publier("capacity_stage", **capacity_search.history[-1])
+            verdict = "OK" if capacity_search.history[-1]["ok"] else "ECHEC"
+            print(f"  [CAPACITE] {self._users} utilisateurs : {verdict} "
+                  f"(erreurs {mesure['error_rate']:.2f}%, p95 {mesure['p95']:.0f} ms, "
+                  f"{mesure['requests']} requetes)", flush=True)
+            if suivant is None:
+                print(f"  [CAPACITE] Capacite max soutenable : "
+                      f"{capacity_search.best} utilisateurs", flush=True)
+                publier("capacity", **capacity_search.result())
+                return None  # Fin du test : la capacite est trouvee
+            self._nouveau_palier(suivant, elapsed)
+
+        return (self._users, self._spawn_rate)
+
+    def _nouveau_palier(self, users, debut):
+        precedent = self._users
+        index = len(capacity_search.history)
+        label = f"Capacite {index + 1}  -> {users:>3} utilisateurs"
+        _changer_palier(index, users, label)
+        self._spawn_rate = self._spec.get("spawn_rate") or max(1.0, abs(users - precedent) / 5)
+        self._users = users
+        self._palier_debut = debut
+        self._instantane = None
+        logging.info("\n" + "="*52)
+        logging.info(f"  >> {label}")
+        logging.info(f"  Duree : {self._spec['stage_duration']}s | Spawn rate : {self._spawn_rate:g}/s")
+        logging.info("="*52)
+        publier("stage", index=index, users=users, spawn_rate=self._spawn_rate,
+                duration=self._spec["stage_duration"], label=label)
+
 
 # ─────────────────────────────────────────────
 # 👤 COMPORTEMENT DE L'UTILISATEUR SIMULE
 # ─────────────────────────────────────────────
 
-class WebsiteUser(HttpUser):
+class BlackBoxUser(User):
     """
     Utilisateur simule en mode black box.
-    Navigue aleatoirement sur les URLs decouvertes par le crawler.
+    Enchaine des sessions de navigation sur les URLs decouvertes par le crawler.
+    Le client HTTP est fourni par la classe concrete (voir USER_ENGINES).
     """
 
+    abstract = True
+    engine = None
     wait_time = between(WAIT_MIN, WAIT_MAX)
 
+    def on_start(self):
+        self._page = None
+
     @task
     def visiter_page_decouverte(self):
         """
-        Visite une URL aleatoire parmi celles decouvertes.
+        Visite la page suivante du parcours (chaine de Markov sur le graphe
+        de liens), ou une URL aleatoire si le modele n'est pas disponible.
         Si aucune URL n'a ete trouvee, teste uniquement '/'.
         """
-        urls = discovered_urls if discovered_urls else ["/"]
-        path = random.choice(urls)
+        if journey_model is not None:
+            path = self._page = journey_model.step(self._page)
+        else:
+            urls = discovered_urls if discovered_urls else ["/"]
+            path = random.choice(urls)
 
         with self.client.get(
             path,
-            name=f"[GET] {path}",
+            name=f"[GET] {url_templates.get(path, path)}",
             catch_response=True,
             allow_redirects=True
         ) as response:
@@ -267,14 +630,209 @@ class WebsiteUser(HttpUser):
             response.success()  # Autres codes acceptes par defaut
 
 
+class WebsiteUser(BlackBoxUser, HttpUser):
+    """Moteur "http" : client requests (HttpUser), le plus compatible."""
+
+    engine = "http"
+
+
+class FastWebsiteUser(BlackBoxUser, FastHttpUser):
+    """
+    Moteur "fast" : client geventhttpclient (FastHttpUser), nettement moins
+    couteux en CPU par requete, donc plus de RPS par coeur generateur.
+    """
+
+    engine = "fast"
+
+
 # ─────────────────────────────────────────────
 # 📊 EVENEMENTS — Crawl au demarrage + Resume
 # ─────────────────────────────────────────────
 
+@events.init_command_line_parser.add_listener
+def on_init_parser(parser):
+    """Options specifiques au crawler, transmises par services/locust_runner."""
+    parser.add_argument(
+        "--user-engine", choices=USER_ENGINES, default=DEFAULT_USER_ENGINE,
+        help="Client HTTP des utilisateurs simules (http = requests, fast = geventhttpclient)",
+    )
+    parser.add_argument(
+        "--load-shape", default="",
+        help="Paliers du test en JSON [[users, spawn_rate, duree_s, label], ...] (defaut : PALIERS)",
+    )
+    parser.add_argument(
+        "--capacity-search", default="",
+        help="Recherche de capacite en JSON (seuils, bornes, duree des paliers) ; remplace --load-shape",
+    )
+    parser.add_argument(
+        "--crawl-concurrency", type=int, default=CRAWL_CONCURRENCY,
+        help="Nombre max de pages telechargees en parallele pendant le crawl",
+    )
+    parser.add_argument(
+        "--crawl-cache-ttl", type=float, default=CRAWL_CACHE_TTL,
+        help="Duree (s) pendant laquelle un crawl en cache est reutilise tel quel",
+    )
+    parser.add_argument(
+        "--no-sitemap", action="store_true", default=False,
+        help="Ne pas utiliser robots.txt / sitemap.xml pour decouvrir les URLs",
+    )
+    parser.add_argument(
+        "--ignore-robots", action="store_true", default=False,
+        help="Ne pas appliquer les regles Disallow de robots.txt",
+    )
+    parser.add_argument(
+        "--no-crawl-cache", action="store_true", default=False,
+        help="Ignore le cache de crawl et ne l'alimente pas",
+    )
+    parser.add_argument(
+        "--events-port", type=int, default=0,
+        help="Port local du runner auquel publier les evenements structures (0 = aucun)",
+    )
+
+
+def _decouvrir_urls(host, options):
+    """
+    Retourne (urls, pages) : les URLs a tester et les pages crawlees
+    (liens compris, pour le graphe des parcours). Depuis le cache si l'entree
+    est fraiche, sinon via un crawl (conditionnel si une entree perimee existe).
+    """
+    cache = None
+    if not getattr(options, "no_crawl_cache", False):
+        cache = CrawlCache(
+            CRAWL_CACHE_DIR,
+            ttl=getattr(options, "crawl_cache_ttl", CRAWL_CACHE_TTL),
+        )
+    use_sitemap = not getattr(options, "no_sitemap", False)
+    respect_robots = not getattr(options, "ignore_robots", False)
+    key = CrawlCache.make_key(host, max_depth=CRAWL_DEPTH, max_urls=MAX_URLS,
+                              sitemap=use_sitemap, robots=respect_robots)
+    entry = cache.get(key) if cache else None
+
+    if entry and cache.is_fresh(entry):
+        age = int(time.time() - entry["created_at"])
+        print(f"\n  [CACHE] Crawl de {host} reutilise (age {age}s)", flush=True)
+        afficher_urls(entry["urls"])
+        return list(entry["urls"]), entry["pages"]
+
+    crawler = BlackBoxCrawler(
+        base_url=host,
+        max_depth=CRAWL_DEPTH,
+        max_urls=MAX_URLS,
+        concurrency=getattr(options, "crawl_concurrency", CRAWL_CONCURRENCY),
+        page_cache=entry["pages"] if entry else None,
+        use_sitemap=use_sitemap,
+        respect_robots=respect_robots,
+        on_progress=lambda pages, trouvees: publier("crawl_progress", pages=pages, urls=trouvees),
+    )
+    urls = crawler.crawl()
+
+    if cache and urls:
+        try:
+            cache.put(key, urls, crawler.pages, domain=host)
+        except OSError as e:
+            logging.warning(f"  Cache de crawl non enregistre : {e}")
+    return urls, crawler.pages
+
+
+def _appliquer_resultat_crawl(urls, templates, graph):
+    """Installe les URLs, gabarits et parcours utilises par les utilisateurs."""
+    global discovered_urls, url_templates, journey_model
+    discovered_urls = urls
+    url_templates = templates
+    journey_model = JourneyModel.from_graph(graph, urls)
+
+
+def on_crawl_result(environment, msg, **kwargs):
+    """Worker : recoit le resultat du crawl effectue une seule fois par le master."""
+    data = msg.data
+    _appliquer_resultat_crawl(data["urls"], data["templates"], data["graph"])
+    logging.info(f"Resultat du crawl recu du master : {len(discovered_urls)} URL(s)")
+
+
+@events.init.add_listener
+def on_locust_init(environment, **kwargs):
+    # Ne garder que la classe d'utilisateur du moteur choisi (le dispatcher
+    # Locust est cree au demarrage du test, apres cet evenement)
+    moteur = getattr(environment.parsed_options, "user_engine", DEFAULT_USER_ENGINE)
+    choisies = [u for u in environment.user_classes if getattr(u, "engine", None) in (None, moteur)]
+    if choisies:
+        environment.user_classes[:] = choisies
+
+    if isinstance(environment.runner, WorkerRunner):
+        environment.runner.register_message("crawl_result", on_crawl_result)
+        events.request.add_listener(_mesurer_latence_worker)
+        events.report_to_master.add_listener(on_report_to_master)
+        return
+
+    if isinstance(environment.runner, MasterRunner):
+        events.worker_report.add_listener(on_worker_report)
+    else:
+        events.request.add_listener(_mesurer_latence)
+    # Ecrits a la sortie : les workers envoient leur dernier rapport en recevant
+    # l'ordre "quit" du master, apres test_stop
+    events.quit.add_listener(lambda exit_code, **kwargs: _ecrire_histogrammes(environment))
+
+    _connecter_runner(getattr(environment.parsed_options, "events_port", 0))
+
+
+def _mesurer_latence(request_type, name, response_time, **kwargs):
+    """Processus unique : chaque requete alimente l'histogramme du palier en cours."""
+    if response_time is not None:
+        histogrammes.record(palier_courant, request_type, name, response_time)
+
+
+def _mesurer_latence_worker(request_type, name, response_time, **kwargs):
+    if response_time is not None:
+        _histogrammes_a_envoyer.record(None, request_type, name, response_time)
+
+
+def on_report_to_master(client_id, data, **kwargs):
+    """Worker : joint les histogrammes accumules depuis le dernier rapport."""
+    global _histogrammes_a_envoyer
+    if len(_histogrammes_a_envoyer):
+        data["histograms"] = _histogrammes_a_envoyer.to_entries()
+        _histogrammes_a_envoyer = LatencyHistograms()
+
+
+def on_worker_report(client_id, data, **kwargs):
+    """Master : range les histogrammes recus dans le palier en cours."""
+    entries = data.get("histograms")
+    if entries:
+        histogrammes.merge(LatencyHistograms.from_entries(entries), stage=palier_courant)
+
+
+def _connecter_runner(port):
+    """Ouvre le canal d'evenements vers services/locust_runner (master uniquement)."""
+    global publisher
+    if not port:
+        return
+    try:
+        publisher = EventPublisher.connect(port)
+    except OSError as e:
+        logging.warning(f"  Canal d'evenements indisponible (port {port}) : {e}")
+
+
+def _publier_stats(environment):
+    """Greenlet : publie chaque seconde les stats agregees de la fenetre courante."""
+    while True:
+        gevent.sleep(STATS_EVENT_INTERVAL)
+        total = environment.stats.total
+        publier(
+            "stats",
+            users=environment.runner.user_count,
+            num_requests=total.num_requests,
+            num_failures=total.num_failures,
+            rps=round(total.current_rps, 2),
+            fail_per_s=round(total.current_fail_per_sec, 2),
+            median=total.get_current_response_time_percentile(0.5) or 0,
+            p95=total.get_current_response_time_percentile(0.95) or 0,
+        )
+
+
 @events.test_start.add_listener
 def on_test_start(environment, **kwargs):
     """Lance le crawl automatique avant le debut du test de charge."""
-    global discovered_urls, _crawl_done
+    global _crawl_done, _stats_greenlet
 
     # Locust 2.x avec LoadTestShape declenche test_start a chaque changement
     # de palier. On ne crawle qu'une seule fois.
@@ -282,39 +840,73 @@ def on_test_start(environment, **kwargs):
         return
     _crawl_done = True
 
+    # En mode distribue (--processes), seul le master crawle : les workers
+    # recoivent le resultat par message avant leurs ordres de spawn.
+    if isinstance(environment.runner, WorkerRunner):
+        return
+
     host = environment.host
     if not host:
         print("  ERREUR : aucun host fourni. Utilisez --host=https://votresite.com", flush=True)
         return
 
-    duree_totale = sum(p[2] for p in PALIERS)
+    paliers = paliers_du_test(environment)
+    spec = spec_capacite(environment)
 
     print("\n" + "="*56, flush=True)
     print("     LOAD TEST BLACK BOX — DEMARRAGE", flush=True)
     print("="*56, flush=True)
     print(f"  Cible         : {host}", flush=True)
-    print(f"  Duree estimee : {duree_totale}s", flush=True)
-    print(f"  Paliers       : {len(PALIERS)} niveaux", flush=True)
+    if spec:
+        print(f"  Mode          : recherche de capacite", flush=True)
+        print(f"  Duree max     : {max_search_duration(spec):g}s", flush=True)
+        print(f"  Seuils        : erreurs <= {spec['max_error_rate']:g}% | "
+              f"p95 <= {spec['max_p95_ms']:g} ms", flush=True)
+    else:
+        print(f"  Duree estimee : {total_duration(paliers):g}s", flush=True)
+        print(f"  Paliers       : {len(paliers)} niveaux", flush=True)
     print("="*56, flush=True)
 
-    # Lancement du crawl
-    crawler = BlackBoxCrawler(
-        base_url=host,
-        max_depth=CRAWL_DEPTH,
-        max_urls=MAX_URLS
-    )
-    discovered_urls = crawler.crawl()
+    # Lancement du crawl (ou reutilisation du cache)
+    urls, pages = _decouvrir_urls(host, environment.parsed_options)
 
-    if not discovered_urls:
+    if not urls:
         print("  AVERTISSEMENT : Aucune URL decouverte. Seule '/' sera testee.\n", flush=True)
-        discovered_urls = ["/"]
+        urls = ["/"]
+
+    # Canonicalisation + regroupement en gabarits de routes, puis parcours :
+    # transitions ponderees issues du graphe de liens du crawl
+    urls = dedupe_urls(urls)
+    graph = build_link_graph(pages)
+    _appliquer_resultat_crawl(urls, cluster_routes(urls), graph)
+    nb_gabarits = len(set(url_templates.values()))
+    print(f"  [ROUTES] {len(discovered_urls)} URL(s) regroupees en {nb_gabarits} gabarit(s)", flush=True)
+    print(f"  [PARCOURS] {len(journey_model.transitions)} page(s) avec transitions", flush=True)
+
+    if isinstance(environment.runner, MasterRunner):
+        environment.runner.send_message("crawl_result", {
+            "urls": discovered_urls,
+            "templates": url_templates,
+            "graph": graph,
+        })
+        print(f"  [DISTRIBUE] Resultat du crawl envoye a "
+              f"{environment.runner.worker_count} worker(s)", flush=True)
 
     print(f"  {len(discovered_urls)} URL(s) utilisees pour le test de charge.\n", flush=True)
+    publier("crawl_done", urls=discovered_urls, routes=nb_gabarits)
+    _ouvrir_palier_en_attente()
+
+    if publisher is not None:
+        _stats_greenlet = environment.runner.greenlet.spawn(_publier_stats, environment)
 
 
 @events.test_stop.add_listener
 def on_test_stop(environment, **kwargs):
     """Affiche le resume final du test."""
+    # Les statistiques agregees sont cote master
+    if isinstance(environment.runner, WorkerRunner):
+        return
+
     stats = environment.stats.total
 
     p95 = stats.get_response_time_percentile(0.95) or 0
@@ -326,6 +918,8 @@ def on_test_stop(environment, **kwargs):
     print("\n" + "="*56, flush=True)
     print("     TEST TERMINE — RESUME FINAL", flush=True)
     print("="*56, flush=True)
+    moteurs = sorted({getattr(u, "engine", None) or u.__name__ for u in environment.user_classes})
+    print(f"  Moteur           : {', '.join(moteurs)}", flush=True)
     print(f"  Requetes totales : {stats.num_requests}", flush=True)
     print(f"  Echecs           : {stats.num_failures}", flush=True)
     print(f"  Taux d'erreur    : {taux_erreur:.2f}%", flush=True)
@@ -333,4 +927,44 @@ def on_test_stop(environment, **kwargs):
     print(f"  Latence mediane  : {stats.median_response_time:.1f} ms", flush=True)
     print(f"  Latence P95      : {p95:.1f} ms", flush=True)
     print(f"  Latence max      : {stats.max_response_time:.1f} ms", flush=True)
-    print("="*56 + "\n", flush=True)
\ No newline at end of file
+    if capacity_search is not None:
+        print(f"  Capacite max     : {capacity_search.best} utilisateurs", flush=True)
+    print("="*56 + "\n", flush=True)
+
+    if capacity_search is not None:
+        _ecrire_resultat_capacite(environment)
+    if bornes_paliers:
+        _ecrire_bornes_paliers(environment)
+
+    if _stats_greenlet is not None:
+        _stats_greenlet.kill(block=False)
+    publier("test_stop", num_requests=stats.num_requests, num_failures=stats.num_failures)
+
+
+def _ecrire_resultat_capacite(environment):
+    """Ecrit le resultat de la recherche a cote des CSV (<prefixe>_capacity.json)."""
+    prefix = getattr(environment.parsed_options, "csv_prefix", None)
+    if not prefix:
+        return
+    path = Path(f"{prefix}{RESULT_SUFFIX}")
+    path.write_text(json.dumps(capacity_search.result()), encoding="utf-8")
+
+
+def _ecrire_histogrammes(environment):
+    """Ecrit les histogrammes de latence a cote des CSV (<prefixe>_histograms.json)."""
+    prefix = getattr(environment.parsed_options, "csv_prefix", None)
+    if not prefix or not len(histogrammes):
+        return
+    path = Path(f"{prefix}{HISTOGRAMS_SUFFIX}")
+    path.write_text(json.dumps(histogrammes.to_entries()), encoding="utf-8")
+
+
+def _ecrire_bornes_paliers(environment):
+    """Ecrit les bornes des paliers executes a cote des CSV (<prefixe>_stages.json)."""
+    prefix = getattr(environment.parsed_options, "csv_prefix", None)
+    if not prefix:
+        return
+    if bornes_paliers[-1]["end"] is None:
+        bornes_paliers[-1]["end"] = time.time()
+    path = Path(f"{prefix}{STAGES_SUFFIX}")
+    path.write_text(json.dumps(bornes_paliers), encoding="utf-8")
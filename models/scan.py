@@ -9,6 +9,10 @@ class ScanHistoryBase(BaseModel):
     error_rate: float
     avg_rps: float
     p95_latency: float
+    engine: Optional[str] = None  # "http" | "fast" (moteur des utilisateurs simulés)
+    workers: Optional[int] = None
+    # Résultat d'une recherche de capacité (forme de charge "capacity")
+    capacity: Optional[Dict[str, Any]] = None
 
 class ScanHistoryCreate(ScanHistoryBase):
     global_stats: Optional[Dict[str, Any]] = None # Store raw stats dump just in case
@@ -1,4 +1,122 @@
-from pydantic import BaseModel
+from typing import Annotated, List, Literal, Optional, Union
+
+from pydantic import BaseModel, Field, model_validator
+
+# Bornes communes des formes de charge
+MAX_USERS = 50_000
+MAX_STAGE_SECONDS = 24 * 3600
+
+Users = Annotated[int, Field(ge=0, le=MAX_USERS)]
+Seconds = Annotated[float, Field(gt=0, le=MAX_STAGE_SECONDS)]
+SpawnRate = Annotated[float, Field(gt=0, le=10_000)]
+
+
+class StepShape(BaseModel):
+    """Paliers successifs (forme historique de main.py)."""
+    type: Literal["step"]
+    users: List[Users] = Field([1, 20, 50, 100, 500], min_length=1, max_length=50)
+    step_duration: Seconds = 30
+    spawn_rate: Optional[SpawnRate] = None
+
+
+class RampShape(BaseModel):
+    """Montée linéaire de 0 à `users` sur `duration` secondes, puis plateau optionnel."""
+    type: Literal["ramp"]
+    users: Annotated[int, Field(ge=1, le=MAX_USERS)]
+    duration: Seconds
+    hold_duration: Optional[Seconds] = None
+
+
+class SpikeShape(BaseModel):
+    """Charge de base, pic brutal, puis retour à la base."""
+    type: Literal["spike"]
+    base_users: Users = 10
+    spike_users: Annotated[int, Field(ge=1, le=MAX_USERS)]
+    base_duration: Seconds = 30
+    spike_duration: Seconds = 30
+    recovery_duration: Seconds = 30
+    spike_spawn_rate: Optional[SpawnRate] = None
+
+
+class SoakShape(BaseModel):
+    """Test d'endurance : montée puis charge constante longue."""
+    type: Literal["soak"]
+    users: Annotated[int, Field(ge=1, le=MAX_USERS)]
+    ramp_duration: Seconds = 60
+    duration: Seconds = 1800
+
+
+class CustomStage(BaseModel):
+    users: Users
+    duration: Seconds
+    spawn_rate: Optional[SpawnRate] = None
+    label: Optional[str] = Field(None, max_length=80)
+
+
+class CustomShape(BaseModel):
+    """Liste libre de paliers."""
+    type: Literal["custom"]
+    stages: List[CustomStage] = Field(..., min_length=1, max_length=100)
+
+
+class CapacityShape(BaseModel):
+    """
+    Recherche de la capacité max soutenable : le nombre d'utilisateurs est
+    multiplié par growth_factor tant que les seuils sont tenus, puis affiné
+    par dichotomie jusqu'à `precision` utilisateurs près.
+    """
+    type: Literal["capacity"]
+    start_users: Annotated[int, Field(ge=1, le=MAX_USERS)] = 10
+    max_users: Annotated[int, Field(ge=1, le=MAX_USERS)] = 2000
+    growth_factor: float = Field(2.0, gt=1, le=10)
+    stage_duration: Seconds = 30
+    # Début de palier exclu de la mesure (montée en charge, warm-up)
+    settle_duration: float = Field(5, ge=0, le=MAX_STAGE_SECONDS)
+    # Seuils d'un palier sain : taux d'erreur (%) et latence p95 (ms)
+    max_error_rate: float = Field(1.0, ge=0, le=100)
+    max_p95_ms: float = Field(1000, gt=0)
+    precision: int = Field(5, ge=1)
+    max_stages: int = Field(20, ge=1, le=100)
+    spawn_rate: Optional[SpawnRate] = None
+
+    @model_validator(mode="after")
+    def _check_bounds(self):
+        if self.start_users > self.max_users:
+            raise ValueError("start_users doit être inférieur ou égal à max_users")
+        if self.settle_duration >= self.stage_duration:
+            raise ValueError("settle_duration doit être inférieur à stage_duration")
+        return self
+
+
+LoadShape = Annotated[
+    Union[StepShape, RampShape, SpikeShape, SoakShape, CustomShape, CapacityShape],
+    Field(discriminator="type"),
+]
+
 
 class ScanRequest(BaseModel):
     domain: str
+    # Pages telechargees en parallele pendant le crawl (1 = sequentiel)
+    crawl_concurrency: int = Field(8, ge=1, le=64)
+    # Cache de crawl par domaine : reutilise tel quel pendant crawl_cache_ttl
+    # secondes, puis revalide en GET conditionnel
+    use_crawl_cache: bool = True
+    crawl_cache_ttl: int = Field(3600, ge=0)
+    # Decouverte via robots.txt / sitemap.xml avant le crawl des liens,
+    # et respect des regles Disallow de robots.txt
+    use_sitemap: bool = True
+    respect_robots: bool = True
+    # Processus générateurs de charge : 1 = un seul processus Locust,
+    # N > 1 = 1 master + N workers, 0 = un worker par cœur (os.cpu_count())
+    workers: int = Field(1, ge=0, le=64)
+    # Client HTTP des utilisateurs simulés : "http" (HttpUser / requests)
+    # ou "fast" (FastHttpUser / geventhttpclient, plus de RPS par cœur)
+    engine: Literal["http", "fast"] = "http"
+    # Forme de charge ; None = les 5 paliers par défaut (PALIERS dans main.py)
+    load_shape: Optional[LoadShape] = None
+
+
+class JobRequest(ScanRequest):
+    """Scan soumis à l'ordonnanceur de jobs (services/jobs)."""
+    # Les jobs en attente sont servis par priorité décroissante
+    priority: int = Field(0, ge=0, le=9)
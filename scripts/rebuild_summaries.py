@@ -0,0 +1,47 @@
+"""
+Reconstruit les résumés de tableau de bord (collection user_summaries) à
+partir de la collection scans.
+
+À lancer une fois après le déploiement pour les scans enregistrés avant les
+résumés, ou pour réparer un résumé désynchronisé (ex. scan supprimé à la main
+dans Mongo). Les résumés sont ensuite tenus à jour à chaque scan enregistré
+ou supprimé.
+
+Usage : python scripts/rebuild_summaries.py [--user USER_ID ...]
+(variable d'environnement dburl requise, comme pour l'application)
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.database import close_mongo_connection, connect_to_mongo, get_db  # noqa: E402
+from services.scan_service import format_summary, rebuild_user_summary  # noqa: E402
+
+
+async def rebuild(user_ids):
+    await connect_to_mongo()
+    try:
+        db = get_db()
+        if not user_ids:
+            user_ids = await db.scans.distinct("user_id")
+        for user_id in user_ids:
+            summary = format_summary(await rebuild_user_summary(db, user_id))
+            print(f"{user_id} : {summary['total_scans']} scans, {summary['unique_domains']} domaines")
+        print(f"{len(user_ids)} résumé(s) reconstruit(s)")
+    finally:
+        close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", dest="users", nargs="+", help="Identifiants des utilisateurs (tous par défaut)")
+    args = parser.parse_args()
+    asyncio.run(rebuild(args.users))
+
+
+if __name__ == "__main__":
+    main()
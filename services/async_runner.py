@@ -0,0 +1,239 @@
+"""
+Runner asyncio : même pipeline que services/locust_runner.run_locust_thread,
+mais sur la boucle du serveur, sans thread dédié au scan. Les lectures de
+fichiers et le calcul pur passent par le pool de threads par défaut
+d'asyncio : suivi du fichier d'historique, parsing final des CSV et
+compression des résultats à l'enregistrement (services/locust_runner._save_scan).
+
+- subprocess : asyncio.create_subprocess_exec, stdout lu en asynchrone ;
+- canal d'événements : serveur asyncio local (--events-port) ;
+- durée max : asyncio.wait_for au lieu d'un threading.Timer ;
+- /api/stop annule la tâche : le subprocess est arrêté et le statut repasse à "idle".
+
+Sélectionné par le réglage scan_runner = "asyncio" (core.config), et utilisé
+par l'ordonnanceur de jobs (services/jobs) avec un state, des abonnés WS et
+un dossier d'artefacts propres à chaque job.
+"""
+
+import asyncio
+import functools
+import traceback
+
+from core.cache import response_cache
+from core.config import BACKEND_DIR
+from core.state import state, log_subscribers
+from core.logger import get_logger
+from models.schemas import ScanRequest
+from services.log_forwarder import LogForwarder
+from services.stats_channel import read_events
+from services.history_tailer import HISTORY_POLL_INTERVAL
+from services.locust_runner import (
+    EventChannelStatus,
+    _apply_event,
+    _build_command,
+    _collect_stats,
+    _history_event,
+    _history_tailer,
+    _max_duration,
+    _resolve_workers,
+    _result_line,
+    _save_scan,
+    _stdout_transition,
+    _subprocess_env,
+)
+from api.websockets import broadcast_event, broadcast_logs, broadcast_status
+
+logger = get_logger("services.async_runner")
+
+# Délai laissé à Locust pour s'arrêter proprement (CSV finaux) avant kill()
+TERMINATE_GRACE = 10
+# Taille max d'une ligne de stdout (limite du StreamReader)
+STDOUT_LINE_LIMIT = 1024 * 1024
+
+
+async def _terminate(proc):
+    if proc.returncode is not None:
+        return
+    proc.terminate()
+    try:
+        await asyncio.wait_for(proc.wait(), TERMINATE_GRACE)
+    except asyncio.TimeoutError:
+        logger.warning("Locust ne s'est pas arrêté à temps — kill()")
+        proc.kill()
+        await proc.wait()
+
+
+async def _stop_and_drain(proc, pump):
+    """
+    Arrête Locust en continuant de vider son stdout : les dernières lignes sont
+    relayées et un pipe plein ne peut pas bloquer l'arrêt jusqu'au kill().
+    """
+    await _terminate(proc)
+    if pump is None:
+        return
+    try:
+        await asyncio.wait_for(asyncio.shield(pump), TERMINATE_GRACE)
+    except asyncio.TimeoutError:
+        # stdout gardé ouvert par un worker forké encore vivant
+        pump.cancel()
+
+
+async def _pump_stdout(proc, forwarder: LogForwarder, channel: EventChannelStatus, scan_state: dict = state,
+                       subscribers: list = log_subscribers):
+    """Relaie le stdout de Locust jusqu'à la fin du processus."""
+    while True:
+        raw = await proc.stdout.readline()
+        if not raw:
+            break
+        line = raw.decode("utf-8", errors="replace").rstrip()
+        if line:
+            logger.debug(f"[Locust Stdout] {line}")
+            forwarder.put(line)
+            for coro in _stdout_transition(line, channel, scan_state, subscribers):
+                await coro
+    return await proc.wait()
+
+
+async def _follow_history(tailer, subscribers: list):
+    """Relaie les nouveaux points d'historique jusqu'à l'annulation de la tâche."""
+    try:
+        while True:
+            await asyncio.sleep(HISTORY_POLL_INTERVAL)
+            await _publish_history(tailer, subscribers)
+    except Exception as e:
+        logger.error(f"Suivi de l'historique interrompu: {type(e).__name__}: {e}")
+
+
+async def _publish_history(tailer, subscribers: list):
+    points = await asyncio.to_thread(tailer.poll)
+    if points:
+        await broadcast_event(_history_event(points), subscribers)
+
+
+async def run_locust_async(domain: str, user_id: str = None, options: ScanRequest = None,
+                           scan_state: dict = None, subscribers: list = None, csv_dir=None):
+    """
+    Lance Locust en subprocess asyncio et suit le scan jusqu'à son terme.
+    scan_state / subscribers / csv_dir : ceux du job (services/jobs) ; par
+    défaut le state global, ses clients /ws/logs et CSV_DIR.
+    """
+    if options is None:
+        options = ScanRequest(domain=domain)
+    if scan_state is None:
+        scan_state, subscribers = state, log_subscribers
+    workers = _resolve_workers(options.workers)
+    loop = asyncio.get_running_loop()
+    set_status = functools.partial(broadcast_status, scan_state=scan_state, subscribers=subscribers)
+
+    forwarder = LogForwarder(
+        loop, functools.partial(broadcast_logs, scan_state=scan_state, subscribers=subscribers)
+    )
+    forwarder.start()
+    scan_state["log_forwarder"] = forwarder
+
+    channel = EventChannelStatus()
+
+    async def _on_events(reader, writer):
+        channel.open = True
+        try:
+            async for event in read_events(reader):
+                channel.on_event(event)
+                for coro in _apply_event(event, scan_state, subscribers):
+                    await coro
+        except Exception as e:
+            logger.error(f"Canal d'événements interrompu: {type(e).__name__}: {e}")
+        finally:
+            writer.close()
+        channel.on_close()
+
+    events_server = await asyncio.start_server(_on_events, "127.0.0.1", 0)
+    events_port = events_server.sockets[0].getsockname()[1]
+
+    await set_status("crawling")
+    forwarder.put(f"[DÉMARRAGE] Cible : {domain}")
+    if workers > 1:
+        forwarder.put(f"[DISTRIBUÉ] 1 master + {workers} workers Locust")
+
+    cmd = _build_command(domain, options, workers, events_port, csv_dir)
+    cmd_str = ' '.join(cmd)
+    logger.debug(f"Commande Locust as subprocess: {cmd_str}")
+    forwarder.put(f"[CMD] {cmd_str}")
+
+    tailer = _history_tailer(csv_dir)
+    history_task = None
+    proc = None
+    pump = None
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            cwd=str(BACKEND_DIR),
+            env=_subprocess_env(),
+            limit=STDOUT_LINE_LIMIT,
+        )
+        scan_state["process"] = proc
+        logger.info(f"Subprocess Locust (asyncio) démarré avec PID: {proc.pid}")
+        history_task = asyncio.create_task(_follow_history(tailer, subscribers))
+
+        pump = asyncio.create_task(_pump_stdout(proc, forwarder, channel, scan_state, subscribers))
+        try:
+            # shield : le watchdog ne coupe pas la lecture du stdout
+            exit_code = await asyncio.wait_for(asyncio.shield(pump), _max_duration(options))
+        except asyncio.TimeoutError:
+            logger.warning("[WATCHDOG] Durée max atteinte — processus Locust forcé à s'arrêter")
+            forwarder.put("[WATCHDOG] Durée max atteinte — arrêt du test")
+            await _stop_and_drain(proc, pump)
+            exit_code = proc.returncode
+        logger.info(f"Process Locust terminé avec le code d'arrêt: {exit_code}")
+        history_task.cancel()
+        await _publish_history(tailer, subscribers)
+
+        # Parsing des CSV (historique potentiellement volumineux) hors de la boucle
+        stats = await asyncio.to_thread(_collect_stats, options, workers, csv_dir)
+        scan_state["stats"] = stats
+        if scan_state is state:
+            response_cache.invalidate(namespace="stats")
+
+        if exit_code != 0 and not stats:
+            error_msg = f"Locust a terminé de manière inattendue avec le code {exit_code}"
+            logger.error(error_msg)
+            forwarder.put(f"[ERREUR] {error_msg}")
+            await forwarder.drain()
+            await set_status("error")
+        else:
+            logger.info("Test de charge Locust complété avec succès.")
+            await forwarder.drain()
+            await set_status("done")
+            forwarder.put("[TERMINÉ] Test de charge terminé.")
+            if stats:
+                result_str = _result_line(options, stats)
+                logger.info(f"Résumé stats: {result_str}")
+                forwarder.put(f"[RÉSULTAT] {result_str}")
+                if user_id:
+                    await _save_scan(domain, user_id, options, workers, stats)
+
+    except asyncio.CancelledError:
+        # /api/stop : on arrête Locust et on rend la main sans résultat
+        logger.info("Scan annulé — arrêt du processus Locust")
+        if proc is not None:
+            await _stop_and_drain(proc, pump)
+        forwarder.put("[ARRÊT] Test de charge interrompu.")
+        await forwarder.drain()
+        await set_status("idle")
+        raise
+    except Exception as e:
+        logger.exception(f"Exception non gérée dans le runner asyncio: {e}")
+        forwarder.put(f"[ERREUR] {e}")
+        forwarder.put(f"[TRACEBACK] {traceback.format_exc()}")
+        await forwarder.drain()
+        await set_status("error")
+    finally:
+        if history_task is not None:
+            history_task.cancel()
+        if pump is not None and not pump.done():
+            pump.cancel()
+        events_server.close()
+        await forwarder.aclose()
+        scan_state["process"] = None
+        scan_state["scan_task"] = None
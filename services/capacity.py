@@ -0,0 +1,129 @@
+"""
+Recherche en boucle fermée de la capacité maximale soutenable.
+
+Le nombre d'utilisateurs est multiplié par growth_factor tant que les seuils
+(taux d'erreur, p95) sont respectés, puis une dichotomie entre le dernier
+palier sain et le premier palier en échec resserre l'intervalle jusqu'à
+`precision` utilisateurs. Chaque palier est mesuré sur ses propres requêtes
+(différence de deux instantanés des stats Locust), hors période de stabilisation.
+"""
+
+import math
+from typing import Optional
+
+# Résultat écrit à côté des CSV Locust : <csv_prefix>_capacity.json
+RESULT_SUFFIX = "_capacity.json"
+
+
+def percentile_from_counts(counts: dict, q: float) -> float:
+    """Percentile q (0-1) d'un histogramme {temps_ms: nombre} (format Locust)."""
+    total = sum(counts.values())
+    if total <= 0:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for value in sorted(counts):
+        seen += counts[value]
+        if seen >= rank:
+            return float(value)
+    return float(max(counts))
+
+
+def stats_snapshot(entry) -> tuple:
+    """Instantané (requêtes, échecs, histogramme) d'un StatsEntry Locust."""
+    return entry.num_requests, entry.num_failures, dict(entry.response_times)
+
+
+def stage_metrics(before: tuple, after: tuple) -> dict:
+    """Métriques des seules requêtes survenues entre deux instantanés."""
+    requests = after[0] - before[0]
+    failures = after[1] - before[1]
+    counts = {}
+    for value, count in after[2].items():
+        delta = count - before[2].get(value, 0)
+        if delta > 0:
+            counts[value] = delta
+    return {
+        "requests": requests,
+        "failures": failures,
+        "error_rate": round(failures / requests * 100, 2) if requests > 0 else 0.0,
+        "p95": percentile_from_counts(counts, 0.95),
+    }
+
+
+class CapacitySearch:
+    def __init__(self, start_users: int, max_users: int, growth_factor: float = 2.0,
+                 precision: int = 5, max_error_rate: float = 1.0, max_p95_ms: float = 1000.0,
+                 max_stages: int = 20):
+        self.current = max(1, min(start_users, max_users))
+        self.max_users = max_users
+        self.growth_factor = growth_factor
+        self.precision = max(1, precision)
+        self.max_error_rate = max_error_rate
+        self.max_p95_ms = max_p95_ms
+        self.max_stages = max_stages
+        self.best = 0          # plus grand palier sain
+        self.first_failing = None
+        self.history = []
+        self.done = False
+
+    @classmethod
+    def from_spec(cls, spec: dict) -> "CapacitySearch":
+        """Depuis une forme de charge "capacity" (models.schemas.CapacityShape)."""
+        return cls(
+            start_users=spec["start_users"],
+            max_users=spec["max_users"],
+            growth_factor=spec["growth_factor"],
+            precision=spec["precision"],
+            max_error_rate=spec["max_error_rate"],
+            max_p95_ms=spec["max_p95_ms"],
+            max_stages=spec["max_stages"],
+        )
+
+    def passes(self, metrics: dict) -> bool:
+        return (
+            metrics["requests"] > 0
+            and metrics["error_rate"] <= self.max_error_rate
+            and metrics["p95"] <= self.max_p95_ms
+        )
+
+    def observe(self, users: int, metrics: dict) -> Optional[int]:
+        """Enregistre la mesure d'un palier ; retourne le prochain nombre d'utilisateurs ou None (fin)."""
+        ok = self.passes(metrics)
+        self.history.append({"users": users, "ok": ok, **metrics})
+        if ok:
+            self.best = max(self.best, users)
+        elif self.first_failing is None or users < self.first_failing:
+            self.first_failing = users
+
+        if len(self.history) >= self.max_stages:
+            return self._finish()
+
+        if self.first_failing is None:
+            if users >= self.max_users:
+                return self._finish()
+            self.current = min(math.ceil(users * self.growth_factor), self.max_users)
+            return self.current
+
+        if self.first_failing - self.best <= self.precision:
+            return self._finish()
+        self.current = (self.best + self.first_failing) // 2
+        return self.current
+
+    def _finish(self):
+        self.done = True
+        return None
+
+    def result(self) -> dict:
+        return {
+            "capacity_users": self.best,
+            "first_failing_users": self.first_failing,
+            "reached_max_users": self.first_failing is None and self.best >= self.max_users,
+            "thresholds": {"max_error_rate": self.max_error_rate, "max_p95_ms": self.max_p95_ms},
+            "stages": self.history,
+        }
+
+
+def max_search_duration(spec: dict) -> float:
+    """Durée maximale d'une recherche (tous les paliers autorisés consommés)."""
+    return spec["max_stages"] * spec["stage_duration"]
@@ -0,0 +1,106 @@
+"""
+Cache disque des crawls, par domaine et paramètres de crawl.
+
+Chaque entrée est un fichier JSON contenant les URLs découvertes et, par page,
+les validateurs HTTP (ETag / Last-Modified) et les liens extraits :
+- entrée fraîche (âge < ttl)  -> le crawl est entièrement sauté ;
+- entrée périmée              -> le crawl est rejoué en GET conditionnel,
+                                 une réponse 304 réutilise les liens en cache ;
+- au-delà de max_age, ou au-delà de max_entries (LRU sur le mtime du fichier),
+  l'entrée est supprimée.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from core.logger import get_logger
+
+logger = get_logger("services.crawl_cache")
+
+CACHE_VERSION = 1
+
+
+class CrawlCache:
+    def __init__(self, directory, ttl: float = 3600, max_entries: int = 50,
+                 max_age: float = 7 * 24 * 3600):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+    @staticmethod
+    def make_key(domain: str, **params) -> str:
+        """Clé stable pour un domaine et un jeu de paramètres de crawl."""
+        raw = json.dumps({"domain": domain.lower().rstrip("/"), **params}, sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        """Retourne l'entrée (fraîche ou non) et la marque comme récemment utilisée."""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrée de cache illisible {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        if entry.get("version") != CACHE_VERSION:
+            path.unlink(missing_ok=True)
+            return None
+        if time.time() - entry.get("created_at", 0) > self.max_age:
+            path.unlink(missing_ok=True)
+            return None
+
+        os.utime(path)  # LRU : le mtime sert de date de dernier accès
+        return entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry.get("created_at", 0) < self.ttl
+
+    def put(self, key: str, urls: list, pages: dict, **meta):
+        """Enregistre une entrée de façon atomique puis applique l'éviction."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "version": CACHE_VERSION,
+            "created_at": time.time(),
+            "urls": urls,
+            "pages": pages,
+            **meta,
+        }
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, separators=(",", ":"))
+        os.replace(tmp, path)
+        self.prune()
+
+    def prune(self):
+        """Supprime les entrées trop vieilles puis les moins récemment utilisées."""
+        if not self.directory.exists():
+            return
+        now = time.time()
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                mtime = path.stat().st_mtime
+            except OSError:
+                continue
+            if now - mtime > self.max_age:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((mtime, path))
+
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries:]:
+            logger.info(f"Éviction LRU de l'entrée de cache {path.name}")
+            path.unlink(missing_ok=True)
@@ -0,0 +1,235 @@
+"""
+Histogrammes de latence à seaux logarithmiques (à la HdrHistogram),
+fusionnables sans perte.
+
+Les valeurs sont enregistrées en microsecondes. Chaque puissance de deux est
+découpée en 2^SUB_BUCKET_BITS seaux linéaires : l'erreur relative sur une
+valeur est au plus 2^-SUB_BUCKET_BITS (~0,05 %), quelle que soit l'échelle, ce qui
+permet de lire des percentiles extrêmes (p99.9, p99.99...) que les colonnes
+fixes des CSV Locust ne donnent pas. Deux histogrammes de même résolution se
+fusionnent en additionnant leurs compteurs : on peut regrouper paliers, runs
+ou workers après coup sans perdre de précision.
+
+main.py en enregistre un par (palier, endpoint) et les écrit dans
+<csv_prefix>_histograms.json, sérialisés en varints compressés (zlib)
+encodés en base64.
+"""
+
+import base64
+import math
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Résultat écrit à côté des CSV Locust : <csv_prefix>_histograms.json
+RESULT_SUFFIX = "_histograms.json"
+
+FORMAT_VERSION = 1
+# 2^11 seaux par puissance de deux : 3 chiffres significatifs
+SUB_BUCKET_BITS = 11
+UNITS_PER_MS = 1000
+
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varints(data: bytes):
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+    if shift:
+        raise ValueError("Varint tronqué")
+
+
+class LogHistogram:
+    def __init__(self, sub_bucket_bits: int = SUB_BUCKET_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self._sub_buckets = 1 << sub_bucket_bits
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    # ── Seaux ────────────────────────────────────────────────────────
+
+    def bucket_index(self, value: int) -> int:
+        if value < self._sub_buckets:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits - 1
+        return shift * self._sub_buckets + (value >> shift)
+
+    def bucket_range(self, index: int) -> Tuple[int, int]:
+        """Bornes [basse, haute] (en µs) des valeurs rangées dans le seau `index`."""
+        if index < 2 * self._sub_buckets:
+            return index, index
+        shift = index // self._sub_buckets - 1
+        low = (index - shift * self._sub_buckets) << shift
+        return low, low + (1 << shift) - 1
+
+    # ── Enregistrement / fusion ──────────────────────────────────────
+
+    def record(self, value_ms: float, count: int = 1):
+        value = max(0, int(value_ms * UNITS_PER_MS + 0.5))
+        index = self.bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "LogHistogram") -> "LogHistogram":
+        """Ajoute les compteurs de `other` (même résolution) ; renvoie self."""
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("Histogrammes de résolutions différentes")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    @classmethod
+    def merged(cls, histograms: Iterable["LogHistogram"]) -> "LogHistogram":
+        result = cls()
+        for histogram in histograms:
+            result.merge(histogram)
+        return result
+
+    # ── Lecture ──────────────────────────────────────────────────────
+
+    def percentile(self, q: float) -> float:
+        """Percentile q (0-100) en ms : valeur du seau où le rang q est atteint."""
+        if self.total == 0:
+            return 0.0
+        if q >= 100:
+            return self.max / UNITS_PER_MS
+        rank = max(1, math.ceil(self.total * q / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                low, high = self.bucket_range(index)
+                value = min(max((low + high) / 2, self.min), self.max)
+                return value / UNITS_PER_MS
+        return self.max / UNITS_PER_MS
+
+    def percentiles(self, qs: Iterable[float]) -> Dict[str, float]:
+        return {f"{q:g}": round(self.percentile(q), 3) for q in qs}
+
+    def mean(self) -> float:
+        return self.sum / self.total / UNITS_PER_MS if self.total else 0.0
+
+    def summary(self, qs: Iterable[float]) -> dict:
+        return {
+            "count": self.total,
+            "min": (self.min or 0) / UNITS_PER_MS,
+            "max": (self.max or 0) / UNITS_PER_MS,
+            "mean": round(self.mean(), 3),
+            "percentiles": self.percentiles(qs),
+        }
+
+    # ── Sérialisation ────────────────────────────────────────────────
+
+    def encode(self) -> str:
+        """
+        version, résolution, min, max, somme, nombre de seaux, puis pour
+        chaque seau (écart d'index avec le précédent, compteur) en varints.
+        """
+        out = bytearray()
+        for value in (FORMAT_VERSION, self.sub_bucket_bits, self.min or 0, self.max or 0,
+                      self.sum, len(self.counts)):
+            _write_varint(out, value)
+        previous = 0
+        for index in sorted(self.counts):
+            _write_varint(out, index - previous)
+            _write_varint(out, self.counts[index])
+            previous = index
+        return base64.b64encode(zlib.compress(bytes(out))).decode("ascii")
+
+    @classmethod
+    def decode(cls, encoded: str) -> "LogHistogram":
+        values = _read_varints(zlib.decompress(base64.b64decode(encoded)))
+        version = next(values)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Version d'histogramme inconnue : {version}")
+        histogram = cls(next(values))
+        low, high, histogram.sum, buckets = next(values), next(values), next(values), next(values)
+        index = 0
+        for _ in range(buckets):
+            index += next(values)
+            count = next(values)
+            histogram.counts[index] = count
+            histogram.total += count
+        if histogram.total:
+            histogram.min, histogram.max = low, high
+        return histogram
+
+
+class LatencyHistograms:
+    """Un histogramme par (palier, méthode, endpoint)."""
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[Optional[int], str, str], LogHistogram] = {}
+
+    def __len__(self) -> int:
+        return len(self.histograms)
+
+    def record(self, stage: Optional[int], method: str, name: str, value_ms: float):
+        key = (stage, method, name)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LogHistogram()
+        histogram.record(value_ms)
+
+    def merge(self, other: "LatencyHistograms", stage: Optional[int] = None):
+        """Fusionne `other` ; si `stage` est donné, ses entrées sont rangées dans ce palier."""
+        for (own_stage, method, name), histogram in other.histograms.items():
+            key = (own_stage if stage is None else stage, method, name)
+            if key in self.histograms:
+                self.histograms[key].merge(histogram)
+            else:
+                self.histograms[key] = LogHistogram().merge(histogram)
+
+    def select(self, stages: Optional[Iterable[int]] = None,
+               endpoint: Optional[str] = None) -> LogHistogram:
+        """Histogramme fusionné des paliers / de l'endpoint demandés (tous par défaut)."""
+        stages = None if stages is None else set(stages)
+        return LogHistogram.merged(
+            histogram for (stage, _, name), histogram in self.histograms.items()
+            if (stages is None or stage in stages) and (endpoint is None or name == endpoint)
+        )
+
+    def stages(self) -> List[int]:
+        return sorted({stage for stage, _, _ in self.histograms if stage is not None})
+
+    def endpoints(self) -> List[str]:
+        return sorted({name for _, _, name in self.histograms})
+
+    def to_entries(self) -> List[dict]:
+        return [
+            {"stage": stage, "method": method, "name": name, "hist": histogram.encode()}
+            for (stage, method, name), histogram in self.histograms.items()
+        ]
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[dict]) -> "LatencyHistograms":
+        result = cls()
+        for entry in entries:
+            key = (entry.get("stage"), entry.get("method", ""), entry["name"])
+            histogram = LogHistogram.decode(entry["hist"])
+            if key in result.histograms:
+                result.histograms[key].merge(histogram)
+            else:
+                result.histograms[key] = histogram
+        return result
@@ -0,0 +1,88 @@
+"""
+Suivi incrémental de rapport_stats_history.csv pendant le test.
+
+Locust ajoute des lignes à ce fichier chaque seconde (--csv-full-history).
+HistoryTailer garde l'offset déjà lu et ne parse que les lignes complètes
+ajoutées depuis le dernier appel : chaque tick coûte O(nouvelles lignes)
+et non O(fichier). Seules les lignes "Aggregated" sont retenues, au même
+format que result["history"] de services/parser.parse_csv_stats.
+"""
+
+import csv
+import threading
+from pathlib import Path
+from typing import List
+
+from core.logger import get_logger
+from services.parser import HistoryColumns, resolve_history_fields
+
+logger = get_logger("services.history_tailer")
+
+# Intervalle entre deux lectures du fichier (Locust écrit une ligne par seconde)
+HISTORY_POLL_INTERVAL = 1.0
+# Lecture max par appel : un tailer en retard rattrape en plusieurs ticks
+MAX_READ_BYTES = 4 * 1024 * 1024
+
+
+class HistoryTailer:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.offset = 0
+        self._partial = b""
+        self._columns = None   # (index de "Name", [(clé, index, conversion), ...])
+        self._lock = threading.Lock()
+
+    def reset(self):
+        self.offset = 0
+        self._partial = b""
+        self._columns = None
+
+    def poll(self) -> List[dict]:
+        """Points "Aggregated" ajoutés depuis le dernier appel (liste vide sinon)."""
+        with self._lock:
+            return self._poll()
+
+    def _poll(self) -> List[dict]:
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return []
+        if size < self.offset:
+            # Fichier recréé (nouveau scan dans le même dossier)
+            logger.info(f"{self.path.name} tronqué — reprise au début")
+            self.reset()
+        if size == self.offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(MAX_READ_BYTES)
+        self.offset += len(chunk)
+
+        data = self._partial + chunk
+        end = data.rfind(b"\n")
+        if end < 0:
+            self._partial = data
+            return []
+        self._partial = data[end + 1:]
+        return self._parse_lines(data[:end].split(b"\n"))
+
+    def _parse_lines(self, lines: List[bytes]) -> List[dict]:
+        if self._columns is None:
+            if not lines:
+                return []
+            header = next(csv.reader([lines[0].decode("utf-8", errors="replace")]), [])
+            self._columns = resolve_history_fields(header)
+            lines = lines[1:]
+            if self._columns is None:
+                logger.warning(f"En-tête inattendu dans {self.path.name}: {header[:5]}")
+                return []
+
+        name_idx, fields = self._columns
+        # Préfiltre sur les octets : les lignes par endpoint ne sont jamais décodées
+        candidates = [line.decode("utf-8", errors="replace") for line in lines if b"Aggregated" in line]
+        history = HistoryColumns()
+        for row in csv.reader(candidates):
+            if len(row) > name_idx and row[name_idx] == "Aggregated":
+                history.append_row(row, fields)
+        return history.records()
@@ -0,0 +1,237 @@
+"""
+Ordonnanceur de scans multi-utilisateurs.
+
+Chaque job a son identifiant, son propre state (même structure que
+core.state.state), ses abonnés WebSocket et son dossier d'artefacts
+CSV_DIR/jobs/<id> : plusieurs scans tournent en parallèle sans se marcher
+dessus (CSV, logs, statut).
+
+Les jobs s'exécutent avec le runner asyncio (services/async_runner). La
+capacité est un pool de slots dérivé du nombre de cœurs : un job consomme
+autant de slots que de processus générateurs de charge (options.workers).
+Les jobs en attente sont servis par priorité décroissante puis par ordre
+d'arrivée ; un job ne double jamais un job plus prioritaire (pas de
+contournement de la file).
+
+Le scan global de POST /api/scan (core.state.state) ne passe pas par cet
+ordonnanceur et n'est pas compté dans le pool : ses processus Locust
+s'ajoutent à ceux des jobs.
+"""
+
+import asyncio
+import functools
+import heapq
+import itertools
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from core.config import CSV_DIR
+from core.log_ring import LogRing
+from core.logger import get_logger
+from models.schemas import ScanRequest
+from services.async_runner import run_locust_async
+from services.locust_runner import _resolve_workers
+from api.websockets import broadcast_status
+
+logger = get_logger("services.jobs")
+
+JOBS_DIR = CSV_DIR / "jobs"
+# Jobs terminés conservés en mémoire (et leurs artefacts sur disque)
+MAX_FINISHED_JOBS = 100
+FINISHED_STATUSES = ("done", "error", "cancelled")
+
+
+def default_slots() -> int:
+    """Un slot par cœur : un slot = un processus Locust générateur de charge."""
+    return max(1, os.cpu_count() or 1)
+
+
+def new_scan_state(domain: str = "") -> dict:
+    """State d'un scan, même structure que core.state.state."""
+    return {
+        "status": "idle",
+        "domain": domain,
+        "logs": LogRing(),
+        "process": None,
+        "stats": None,
+        "discovered_urls": [],
+        "live": None,
+        "log_forwarder": None,
+        "scan_task": None,
+    }
+
+
+class Job:
+    def __init__(self, user_id: str, request: ScanRequest, domain: str, priority: int, slots: int):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.request = request
+        self.domain = domain
+        self.priority = priority
+        self.slots = slots
+        self.state = new_scan_state(domain)
+        self.state["status"] = "queued"
+        self.subscribers = []
+        self.artifact_dir = JOBS_DIR / self.id
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.task = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state["status"] in FINISHED_STATUSES
+
+    def summary(self, queue_position: Optional[int] = None) -> dict:
+        return {
+            "id": self.id,
+            "domain": self.domain,
+            "status": self.state["status"],
+            "priority": self.priority,
+            "slots": self.slots,
+            "queue_position": queue_position,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "live": self.state["live"],
+        }
+
+
+class JobScheduler:
+    def __init__(self, total_slots: Optional[int] = None, runner=run_locust_async):
+        self.total_slots = total_slots or default_slots()
+        self.used_slots = 0
+        self._runner = runner
+        self._jobs = {}
+        self._queue = []   # tas de (-priorité, ordre d'arrivée, job)
+        self._order = itertools.count()
+        self._finishing = set()   # _finish des tâches annulées avant de démarrer
+
+    # ── Soumission / annulation ──────────────────────────────────────
+
+    def submit(self, user_id: str, request: ScanRequest, domain: str, priority: int = 0) -> Job:
+        """Enregistre un job et le démarre si des slots sont libres (à appeler depuis la boucle)."""
+        slots = min(_resolve_workers(request.workers), self.total_slots)
+        job = Job(user_id, request, domain, priority, slots)
+        self._jobs[job.id] = job
+        heapq.heappush(self._queue, (-priority, next(self._order), job))
+        logger.info(f"Job {job.id} soumis ({domain}, priorité {priority}, {slots} slot(s))")
+        self._dispatch()
+        return job
+
+    async def cancel(self, job: Job) -> bool:
+        """Retire un job de la file ou arrête son scan. False s'il est déjà terminé."""
+        if job.finished:
+            return False
+        if job.task is None:
+            self._queue = [entry for entry in self._queue if entry[2] is not job]
+            heapq.heapify(self._queue)
+            await self._finish(job, "cancelled")
+            # Le job retiré bloquait peut-être la tête de file
+            self._dispatch()
+            return True
+        job.task.cancel()
+        return True
+
+    # ── Consultation ─────────────────────────────────────────────────
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def jobs_for(self, user_id: str) -> list:
+        return sorted(
+            (job for job in self._jobs.values() if job.user_id == user_id),
+            key=lambda job: job.created_at,
+            reverse=True,
+        )
+
+    def queue_position(self, job: Job) -> Optional[int]:
+        """Rang (1 = prochain) d'un job en attente, None s'il n'est pas en file."""
+        if job.task is not None or job.finished:
+            return None
+        ordered = sorted(self._queue, key=lambda entry: entry[:2])
+        for rank, (_, _, queued) in enumerate(ordered, start=1):
+            if queued is job:
+                return rank
+        return None
+
+    def metrics(self) -> dict:
+        running = sum(1 for job in self._jobs.values() if job.task is not None and not job.finished)
+        return {
+            "total_slots": self.total_slots,
+            "used_slots": self.used_slots,
+            "running": running,
+            "queued": len(self._queue),
+        }
+
+    # ── Exécution ────────────────────────────────────────────────────
+
+    def _dispatch(self):
+        """Démarre les jobs en tête de file tant que leurs slots sont disponibles."""
+        while self._queue:
+            job = self._queue[0][2]
+            if self.used_slots + job.slots > self.total_slots:
+                return
+            heapq.heappop(self._queue)
+            self._start(job)
+
+    def _start(self, job: Job):
+        self.used_slots += job.slots
+        job.started_at = datetime.utcnow()
+        job.artifact_dir.mkdir(parents=True, exist_ok=True)
+        job.task = asyncio.create_task(self._run(job))
+        job.task.add_done_callback(functools.partial(self._task_done, job))
+        job.state["scan_task"] = job.task
+        logger.info(f"Job {job.id} démarré ({self.used_slots}/{self.total_slots} slots utilisés)")
+
+    async def _run(self, job: Job):
+        status = None
+        try:
+            await self._runner(
+                job.domain, job.user_id, job.request,
+                scan_state=job.state, subscribers=job.subscribers, csv_dir=job.artifact_dir,
+            )
+        except asyncio.CancelledError:
+            status = "cancelled"
+        except Exception as e:
+            logger.exception(f"Job {job.id} en échec: {e}")
+            status = "error"
+        await self._finish(job, status)
+
+    def _task_done(self, job: Job, task: asyncio.Task):
+        """
+        Libère les slots du job dès la fin de sa tâche, y compris une tâche
+        annulée avant sa première étape (dont _run ne s'exécute jamais).
+        """
+        self.used_slots -= job.slots
+        if not job.finished:
+            finishing = asyncio.ensure_future(self._finish(job, "cancelled"))
+            self._finishing.add(finishing)
+            finishing.add_done_callback(self._finishing.discard)
+        self._dispatch()
+
+    async def _finish(self, job: Job, status: Optional[str]):
+        if status is not None:
+            await broadcast_status(status, job.state, job.subscribers)
+        elif not job.finished:
+            # Le runner s'est arrêté sans statut terminal
+            await broadcast_status("error", job.state, job.subscribers)
+        job.finished_at = datetime.utcnow()
+        logger.info(f"Job {job.id} terminé: {job.state['status']}")
+        self._evict()
+
+    def _evict(self):
+        """Oublie les jobs terminés les plus anciens au-delà de MAX_FINISHED_JOBS."""
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished),
+            key=lambda job: job.finished_at,
+        )
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+            shutil.rmtree(job.artifact_dir, ignore_errors=True)
+
+
+scheduler = JobScheduler()
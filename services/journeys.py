@@ -0,0 +1,128 @@
+"""
+Parcours utilisateurs markoviens construits à partir du graphe de liens du crawl.
+
+- page d'entrée : tirée proportionnellement au nombre de liens entrants (+1) ;
+- page suivante : tirée parmi les liens sortants de la page courante,
+  pondérés par la popularité (liens entrants + 1) de la cible ;
+- fin de session : avec une probabilité exit_probability à chaque étape,
+  ou sur une page sans lien sortant connu.
+
+Chaque distribution est pré-calculée en table d'alias (méthode de Vose) :
+un tirage coûte O(1) quel que soit le nombre de pages ou d'utilisateurs.
+"""
+
+import random
+from collections import Counter
+from urllib.parse import urlparse
+
+from services.url_clustering import canonicalize
+
+DEFAULT_EXIT_PROBABILITY = 0.2
+
+
+class AliasTable:
+    """Tirage O(1) dans une distribution discrète (méthode d'alias de Vose)."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        if n == 0:
+            raise ValueError("AliasTable requiert au moins un poids")
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("La somme des poids doit être positive")
+
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def __len__(self):
+        return len(self.prob)
+
+    def sample(self, rng=random) -> int:
+        i = int(rng.random() * len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+def build_link_graph(pages: dict) -> dict:
+    """
+    Graphe {chemin source: [chemins cibles]} à partir des pages du crawler
+    ({url: {"path", "links", ...}}, cf. BlackBoxCrawler.pages).
+    """
+    graph = {}
+    for page in pages.values():
+        targets = graph.setdefault(page["path"], [])
+        for link in page.get("links", ()):
+            targets.append(urlparse(link).path or "/")
+    return graph
+
+
+class JourneyModel:
+    """Chaîne de Markov sur les pages découvertes."""
+
+    def __init__(self, nodes, entry, transitions, exit_probability=DEFAULT_EXIT_PROBABILITY):
+        self.nodes = nodes
+        self.entry = entry
+        self.transitions = transitions  # index noeud -> (AliasTable, [index cibles])
+        self.exit_probability = exit_probability
+        self._positions = {n: i for i, n in enumerate(nodes)}
+
+    @classmethod
+    def from_graph(cls, graph: dict, nodes: list, exit_probability=DEFAULT_EXIT_PROBABILITY):
+        """
+        Construit le modèle sur `nodes` (les URLs retenues pour le test). Les
+        chemins du graphe sont rapprochés des noeuds par forme canonique ;
+        les liens vers des pages non retenues sont ignorés.
+        """
+        index = {}
+        for i, node in enumerate(nodes):
+            index.setdefault(canonicalize(node), i)
+
+        edges = {}
+        for src, targets in graph.items():
+            i = index.get(canonicalize(src))
+            if i is None:
+                continue
+            out = edges.setdefault(i, set())
+            for target in targets:
+                j = index.get(canonicalize(target))
+                if j is not None and j != i:
+                    out.add(j)
+
+        inbound = Counter(j for out in edges.values() for j in out)
+        popularity = [inbound[i] + 1 for i in range(len(nodes))]
+
+        transitions = {}
+        for i, out in edges.items():
+            if out:
+                targets = sorted(out)
+                transitions[i] = (AliasTable([popularity[j] for j in targets]), targets)
+
+        return cls(list(nodes), AliasTable(popularity), transitions, exit_probability)
+
+    def start(self, rng=random) -> str:
+        """Page d'entrée d'une nouvelle session."""
+        return self.nodes[self.entry.sample(rng)]
+
+    def step(self, current, rng=random) -> str:
+        """
+        Page suivante depuis `current` ; une nouvelle session démarre (page
+        d'entrée) quand current vaut None, en fin de session ou sur une impasse.
+        """
+        if current is None:
+            return self.start(rng)
+        i = self._positions.get(current)
+        if i is None or i not in self.transitions or rng.random() < self.exit_probability:
+            return self.start(rng)
+        table, targets = self.transitions[i]
+        return self.nodes[targets[table.sample(rng)]]
@@ -0,0 +1,103 @@
+"""
+Extraction incrémentale des liens internes d'une page HTML.
+
+Remplace l'arbre BeautifulSoup du crawler : le corps de la réponse est lu par
+morceaux et donné à un html.parser.HTMLParser événementiel, les liens sont
+émis au fil de l'eau et la lecture s'arrête après max_bytes octets.
+"""
+
+import codecs
+import posixpath
+from html.parser import HTMLParser
+from typing import Iterable, Iterator
+from urllib.parse import urljoin, urldefrag, urlparse
+
+# Fichiers non-HTML classiques, ignorés par le crawler
+IGNORED_EXTENSIONS = frozenset({
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp",
+    ".pdf", ".zip", ".mp4", ".mp3", ".css", ".js",
+    ".ico", ".woff", ".woff2", ".ttf", ".xml", ".json",
+})
+
+# Liens vides, ancres, mailto, tel, javascript
+SKIPPED_PREFIXES = ("#", "mailto:", "tel:", "javascript:")
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+
+
+def is_ignored_path(path: str) -> bool:
+    """Vrai si l'extension du chemin désigne une ressource non-HTML."""
+    return posixpath.splitext(path)[1].lower() in IGNORED_EXTENSIONS
+
+
+class LinkExtractor(HTMLParser):
+    """Parser SAX-like qui accumule les liens internes des balises <a href>."""
+
+    def __init__(self, page_url: str, domain: str):
+        super().__init__(convert_charrefs=True)
+        self.page_url = page_url
+        self.domain = domain
+        self.pending = []
+        self._seen = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+        for name, value in attrs:
+            if name == "href" and value:
+                self._add(value.strip())
+                return
+
+    def _add(self, href: str):
+        if not href or href.startswith(SKIPPED_PREFIXES):
+            return
+
+        # Construire l'URL absolue
+        full_url, _ = urldefrag(urljoin(self.page_url, href))
+        parsed = urlparse(full_url)
+
+        # Garder uniquement les liens du meme domaine
+        if parsed.netloc != self.domain or is_ignored_path(parsed.path):
+            return
+
+        if full_url not in self._seen:
+            self._seen.add(full_url)
+            self.pending.append(full_url)
+
+    def drain(self) -> list:
+        links, self.pending = self.pending, []
+        return links
+
+
+def iter_links(chunks: Iterable[bytes], page_url: str, domain: str,
+               encoding: str = "utf-8", max_bytes: int = DEFAULT_MAX_BYTES) -> Iterator[str]:
+    """
+    Émet les liens internes au fur et à mesure de la lecture des morceaux.
+    Au-delà de max_bytes octets, le reste du document est ignoré.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parser = LinkExtractor(page_url, domain)
+
+    remaining = max_bytes
+    for chunk in chunks:
+        if not chunk:
+            continue
+        chunk = chunk[:remaining]
+        remaining -= len(chunk)
+        parser.feed(decoder.decode(chunk))
+        yield from parser.drain()
+        if remaining <= 0:
+            break
+
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    yield from parser.drain()
+
+
+def extract_links(chunks: Iterable[bytes], page_url: str, domain: str,
+                  encoding: str = "utf-8", max_bytes: int = DEFAULT_MAX_BYTES) -> list:
+    return list(iter_links(chunks, page_url, domain, encoding, max_bytes))
@@ -0,0 +1,90 @@
+"""
+Formes de charge : traduction d'une spécification (step, ramp, spike, soak,
+custom) en liste de paliers (nb_users, spawn_rate, durée, label), le format
+de PALIERS dans main.py.
+
+La spécification est validée côté API (models.schemas) ; les paliers sont
+transmis au subprocess Locust en JSON via --load-shape.
+"""
+
+import json
+from typing import NamedTuple, Optional
+
+
+class Stage(NamedTuple):
+    users: int
+    spawn_rate: float
+    duration: float
+    label: str
+
+
+def _label(index: int, users: int, kind: str = "Palier") -> str:
+    pluriel = "s" if users > 1 else ""
+    return f"{kind} {index}  -> {users:>3} utilisateur{pluriel}"
+
+
+def _spawn_rate(target: int, previous: int, rate: Optional[float], seconds: float = 5.0) -> float:
+    """Taux explicite, sinon de quoi atteindre la cible en ~`seconds` secondes."""
+    if rate:
+        return float(rate)
+    return max(1.0, abs(target - previous) / seconds)
+
+
+def build_stages(spec: dict) -> list:
+    """Construit les paliers d'une spécification de forme de charge."""
+    kind = spec["type"]
+
+    if kind == "step":
+        stages, previous = [], 0
+        for i, users in enumerate(spec["users"], start=1):
+            rate = _spawn_rate(users, previous, spec.get("spawn_rate"))
+            stages.append(Stage(users, rate, spec["step_duration"], _label(i, users)))
+            previous = users
+        return stages
+
+    if kind == "ramp":
+        users, duration = spec["users"], spec["duration"]
+        # Locust ajoute les utilisateurs à spawn_rate/s : montée linéaire de 0 à users
+        stages = [Stage(users, max(users / duration, 0.01), duration, f"Rampe     -> {users:>3} utilisateurs")]
+        if spec.get("hold_duration"):
+            stages.append(Stage(users, users, spec["hold_duration"], f"Plateau   -> {users:>3} utilisateurs"))
+        return stages
+
+    if kind == "spike":
+        base, spike = spec["base_users"], spec["spike_users"]
+        spike_rate = spec.get("spike_spawn_rate") or max(1.0, spike / 2)
+        return [
+            Stage(base, _spawn_rate(base, 0, None), spec["base_duration"], _label(1, base, "Base")),
+            Stage(spike, spike_rate, spec["spike_duration"], _label(2, spike, "Pic")),
+            Stage(base, spike_rate, spec["recovery_duration"], _label(3, base, "Retour")),
+        ]
+
+    if kind == "soak":
+        users, ramp = spec["users"], spec["ramp_duration"]
+        return [
+            Stage(users, max(users / ramp, 0.01), ramp, f"Montee    -> {users:>3} utilisateurs"),
+            Stage(users, users, spec["duration"], f"Endurance -> {users:>3} utilisateurs"),
+        ]
+
+    if kind == "custom":
+        stages, previous = [], 0
+        for i, stage in enumerate(spec["stages"], start=1):
+            rate = _spawn_rate(stage["users"], previous, stage.get("spawn_rate"))
+            label = stage.get("label") or _label(i, stage["users"])
+            stages.append(Stage(stage["users"], rate, stage["duration"], label))
+            previous = stage["users"]
+        return stages
+
+    raise ValueError(f"Forme de charge inconnue : {kind}")
+
+
+def total_duration(stages) -> float:
+    return sum(stage[2] for stage in stages)
+
+
+def dumps_stages(stages) -> str:
+    return json.dumps([list(stage) for stage in stages], separators=(",", ":"))
+
+
+def loads_stages(raw: str) -> list:
+    return [Stage(int(u), float(r), float(d), str(l)) for u, r, d, l in json.loads(raw)]
@@ -1,18 +1,31 @@
 import asyncio
+import datetime
+import json
 import os
+import socket
 import subprocess
 import sys
 import threading
 import traceback
+from core.cache import response_cache
 from core.config import BACKEND_DIR, MAIN_PY, CSV_DIR
-from core.state import state
+from core.state import state, log_subscribers
+from models.schemas import ScanRequest
 from services.parser import parse_csv_stats
-from api.websockets import broadcast_log, broadcast_status
+from services.load_shapes import build_stages, dumps_stages, total_duration
+from services.capacity import max_search_duration
+from services.stats_channel import EventListener
+from services.history_tailer import HistoryTailer, HISTORY_POLL_INTERVAL
+from services.log_forwarder import LogForwarder
+from services.result_store import pack_results, store_packed
+from services.scan_service import SUMMARY_MARKER, update_user_summary
+from api.websockets import broadcast_event, broadcast_logs, broadcast_status
 from core.logger import get_logger
 
 logger = get_logger("services.locust_runner")
 
 MAX_DURATION = 360  # 6 minutes — hard limit (crawl ~60s + test 150s + marge)
+DEFAULT_TEST_DURATION = 150  # 5 paliers de 30s (PALIERS dans main.py)
 
 
 from core.database import get_db
@@ -22,8 +35,238 @@ def _kill_if_running(proc):
         logger.warning("[WATCHDOG] Durée max atteinte — processus Locust forcé à s'arrêter")
         proc.terminate()
 
-def run_locust_thread(domain: str, loop, user_id: str = None):
+def _resolve_workers(requested: int) -> int:
+    """0 = un worker par cœur ; 1 (ou moins) = un seul processus Locust."""
+    if requested == 0:
+        return os.cpu_count() or 1
+    return max(1, requested)
+
+def _free_port() -> int:
+    """Port TCP libre pour le master Locust (évite le 5557 partagé entre scans)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _distributed_args(workers: int) -> list:
+    """
+    Mode multi-cœurs : Locust se forke en 1 master + N workers (--processes).
+    Seul le master écrit les CSV ; les workers forkés héritent du même stdout
+    (leurs lignes arrivent mêlées à celles du master) et se connectent en local.
+    """
+    if workers <= 1:
+        return []
+    port = _free_port()
+    return [
+        f"--processes={workers}",
+        f"--master-bind-port={port}",
+        f"--master-port={port}",
+    ]
+
+def _max_duration(options: ScanRequest) -> float:
+    """Watchdog : durée de la forme de charge + la marge prévue pour le crawl."""
+    if options.load_shape is None:
+        return MAX_DURATION
+    if options.load_shape.type == "capacity":
+        return max_search_duration(options.load_shape.model_dump()) + (MAX_DURATION - DEFAULT_TEST_DURATION)
+    stages = build_stages(options.load_shape.model_dump())
+    return total_duration(stages) + (MAX_DURATION - DEFAULT_TEST_DURATION)
+
+def _scan_option_args(options: ScanRequest) -> list:
+    """Traduit les options du scan en arguments CLI personnalisés de main.py."""
+    args = [
+        f"--user-engine={options.engine}",
+        f"--crawl-concurrency={options.crawl_concurrency}",
+        f"--crawl-cache-ttl={options.crawl_cache_ttl}",
+    ]
+    if not options.use_crawl_cache:
+        args.append("--no-crawl-cache")
+    if not options.use_sitemap:
+        args.append("--no-sitemap")
+    if not options.respect_robots:
+        args.append("--ignore-robots")
+    if options.load_shape is not None and options.load_shape.type == "capacity":
+        spec = json.dumps(options.load_shape.model_dump(), separators=(",", ":"))
+        args.append(f"--capacity-search={spec}")
+    elif options.load_shape is not None:
+        args.append(f"--load-shape={dumps_stages(build_stages(options.load_shape.model_dump()))}")
+    return args
+
+def _build_command(domain: str, options: ScanRequest, workers: int, events_port: int,
+                   csv_dir=None) -> list:
+    """Ligne de commande du subprocess Locust (commune aux runners thread et asyncio)."""
+    csv_prefix = str((csv_dir or CSV_DIR) / "rapport")
+    return [
+        sys.executable, "-u", "-m", "locust",  # -u = stdout non bufferisé
+        "-f", str(MAIN_PY),
+        f"--host={domain}",
+        "--headless",
+        f"--csv={csv_prefix}",
+        "--csv-full-history",
+        "--loglevel=INFO",
+        *_scan_option_args(options),
+        *_distributed_args(workers),
+        f"--events-port={events_port}",
+    ]
+
+def _subprocess_env() -> dict:
+    return {**os.environ, "PYTHONIOENCODING": "utf-8", "PYTHONUNBUFFERED": "1"}
+
+def _collect_stats(options: ScanRequest, workers: int, csv_dir=None):
+    """Parse les CSV du run et les annote avec les options du scan."""
+    logger.info("Parsing final des statistiques CSV...")
+    stats = parse_csv_stats(csv_dir)
+    if stats:
+        stats["engine"] = options.engine
+        stats["workers"] = workers
+    return stats
+
+def _result_line(options: ScanRequest, stats: dict) -> str:
+    g = stats["global"]
+    result_str = (
+        f"Moteur: {options.engine} | "
+        f"{g['num_requests']} requêtes | "
+        f"Erreurs: {g['failure_rate']}% | "
+        f"RPS: {g['rps']:.1f} | "
+        f"P95: {g['p95_response']:.1f}ms"
+    )
+    if stats.get("capacity"):
+        result_str += f" | Capacité: {stats['capacity']['capacity_users']} utilisateurs"
+    if stats.get("saturation"):
+        result_str += f" | Saturation: {stats['saturation']['users']} utilisateurs"
+    return result_str
+
+def _scan_document(domain: str, user_id: str, options: ScanRequest, workers: int, stats: dict) -> tuple:
+    """Document scan et bloc compressé de ses résultats (calcul pur, exécuté hors de la boucle)."""
+    g = stats["global"]
+    scan_doc = {
+        "domain": domain,
+        "total_requests": g['num_requests'],
+        "failures": g['num_failures'],
+        "error_rate": g['failure_rate'],
+        "avg_rps": g['rps'],
+        "p95_latency": g['p95_response'],
+        "global_stats": g,
+        "engine": options.engine,
+        "workers": workers,
+        "capacity": stats.get("capacity"),
+        "stages": stats.get("stages"),
+        "saturation": stats.get("saturation"),
+        "scalability": stats.get("scalability"),
+        # Compté par $inc dans le résumé de l'utilisateur (services/scan_service)
+        SUMMARY_MARKER: True,
+        "user_id": user_id,
+        "created_at": datetime.datetime.utcnow()
+    }
+    # Historique, endpoints et histogrammes : bloc colonnaire compressé (zlib niveau 9)
+    return scan_doc, pack_results(stats)
+
+async def _save_scan(domain: str, user_id: str, options: ScanRequest, workers: int, stats: dict):
+    """Enregistre le scan dans l'historique de l'utilisateur."""
+    db = get_db()
+    if db is None:
+        return
+    scan_doc, blob = await asyncio.to_thread(_scan_document, domain, user_id, options, workers, stats)
+    scan_doc["results"] = await store_packed(db, blob)
+    await db.scans.insert_one(scan_doc)
+    await update_user_summary(db, scan_doc)
+    response_cache.invalidate(user_id=user_id)
+    logger.info(f"Scan history saved to database for user {user_id}")
+
+def _apply_event(event: dict, scan_state: dict = state, subscribers: list = log_subscribers) -> list:
+    """
+    Applique au state du scan un événement structuré de main.py ; retourne
+    les coroutines de diffusion WS à exécuter dans l'ordre.
+    """
+    kind = event.get("type")
+    coros = []
+    if kind == "crawl_done":
+        scan_state["discovered_urls"] = list(event.get("urls") or [])
+        logger.info("Transition: Crawl terminé -> Lancement du Test")
+        coros.append(broadcast_status("running", scan_state, subscribers))
+    elif kind == "stats":
+        scan_state["live"] = event
+    coros.append(broadcast_event(event, subscribers))
+    return coros
+
+# Repli si le canal d'événements n'est pas connecté ou a été coupé : lignes
+# écrites après le crawl. Pas de ligne de forme de charge ("Ramping to",
+# "Shape test updating to") : Locust les écrit avant test_start, donc avant le crawl.
+STDOUT_RUNNING_MARKERS = ("utilisees pour le test de charge", "All users spawned")
+
+class EventChannelStatus:
+    """État du canal d'événements d'un scan, consulté par la lecture du stdout."""
+
+    def __init__(self):
+        self.open = False       # main.py connecté, canal pas encore fermé
+        self.finished = False   # événement test_stop reçu
+
+    def on_event(self, event: dict):
+        if event.get("type") == "test_stop":
+            self.finished = True
+
+    def on_close(self):
+        # En fin normale, le socket se ferme avant que le processus soit terminé :
+        # seul test_stop distingue une fin de test d'une coupure
+        self.open = False
+        if not self.finished:
+            logger.warning("Canal d'événements fermé avant la fin du test — repli sur le stdout")
+
+def _stdout_transition(line: str, channel: EventChannelStatus, scan_state: dict = state,
+                       subscribers: list = log_subscribers) -> list:
+    """
+    Passage en "running" détecté dans le stdout quand le canal ne peut plus
+    apporter crawl_done ; renvoie les coroutines de diffusion (vide sinon).
+    """
+    if channel.open or scan_state["status"] != "crawling":
+        return []
+    if not any(marker in line for marker in STDOUT_RUNNING_MARKERS):
+        return []
+    logger.warning("Transition détectée dans le stdout (canal d'événements muet): Crawl terminé -> Lancement du Test")
+    return [broadcast_status("running", scan_state, subscribers)]
+
+def _handle_event(event: dict, broadcast):
+    """Applique au state un événement structuré de main.py puis le relaie aux clients WS."""
+    for coro in _apply_event(event):
+        broadcast(coro)
+
+def _consume_events(listener: EventListener, proc, broadcast, channel: EventChannelStatus):
+    """Thread lecteur du canal d'événements (jusqu'à la fin du subprocess)."""
+    def _connected():
+        channel.open = True
+
+    try:
+        for event in listener.events(alive=lambda: proc.poll() is None, on_connect=_connected):
+            channel.on_event(event)
+            _handle_event(event, broadcast)
+    except Exception as e:
+        logger.error(f"Canal d'événements interrompu: {type(e).__name__}: {e}")
+    channel.on_close()
+
+def _history_tailer(csv_dir=None) -> HistoryTailer:
+    return HistoryTailer((csv_dir or CSV_DIR) / "rapport_stats_history.csv")
+
+def _history_event(points: list) -> dict:
+    """Message WS "history" : uniquement les points ajoutés depuis le précédent."""
+    return {"type": "history", "points": points}
+
+def _follow_history(tailer: HistoryTailer, stop: threading.Event, broadcast):
+    """Thread : relaie les nouveaux points d'historique jusqu'à la fin du subprocess."""
+    try:
+        while True:
+            stopped = stop.wait(HISTORY_POLL_INTERVAL)
+            points = tailer.poll()
+            if points:
+                broadcast(broadcast_event(_history_event(points)))
+            if stopped:
+                return
+    except Exception as e:
+        logger.error(f"Suivi de l'historique interrompu: {type(e).__name__}: {e}")
+
+def run_locust_thread(domain: str, loop, user_id: str = None, options: ScanRequest = None):
     """Lance Locust en subprocess dans un thread séparé."""
+    if options is None:
+        options = ScanRequest(domain=domain)
+    workers = _resolve_workers(options.workers)
     logger.info(f"[DIAG][THREAD] ===== THREAD LOCUST DÉMARRÉ =====")
     logger.info(f"[DIAG][THREAD] domain={domain}")
     logger.info(f"[DIAG][THREAD] loop={loop}, loop.is_running={loop.is_running()}, loop.is_closed={loop.is_closed()}")
@@ -38,26 +281,26 @@ def run_locust_thread(domain: str, loop, user_id: str = None):
         except Exception as e:
             logger.error(f"[DIAG][THREAD] _broadcast ERREUR: {type(e).__name__}: {e}")
 
+    # Les lignes de log passent par une file bornée vidée par lots sur la
+    # boucle : la lecture du stdout ne bloque jamais sur les WebSockets
+    forwarder = LogForwarder(loop, broadcast_logs)
+    forwarder.start()
+    state["log_forwarder"] = forwarder
+
     logger.info(f"[DIAG][THREAD] Appel broadcast_status('crawling')...")
     _broadcast(broadcast_status("crawling"))
     logger.info(f"[DIAG][THREAD] state['status'] APRÈS crawling broadcast = '{state['status']}'")
-    _broadcast(broadcast_log(f"[DÉMARRAGE] Cible : {domain}"))
+    forwarder.put(f"[DÉMARRAGE] Cible : {domain}")
+    if workers > 1:
+        forwarder.put(f"[DISTRIBUÉ] 1 master + {workers} workers Locust")
 
-    csv_prefix = str(CSV_DIR / "rapport")
-
-    cmd = [
-        sys.executable, "-u", "-m", "locust",  # -u = stdout non bufferisé
-        "-f", str(MAIN_PY),
-        f"--host={domain}",
-        "--headless",
-        f"--csv={csv_prefix}",
-        "--csv-full-history",
-        "--loglevel=INFO",
-    ]
+    # Canal d'événements structurés (crawl, paliers, stats par seconde)
+    listener = EventListener()
+    cmd = _build_command(domain, options, workers, listener.port)
 
     cmd_str = ' '.join(cmd)
     logger.debug(f"Commande Locust as subprocess: {cmd_str}")
-    _broadcast(broadcast_log(f"[CMD] {cmd_str}"))
+    forwarder.put(f"[CMD] {cmd_str}")
 
     try:
         logger.info(f"[DIAG][THREAD] Lancement subprocess.Popen pour {domain}")
@@ -72,106 +315,82 @@ def run_locust_thread(domain: str, loop, user_id: str = None):
             encoding="utf-8",
             errors="replace",
             bufsize=1,
-            env={**os.environ, "PYTHONIOENCODING": "utf-8", "PYTHONUNBUFFERED": "1"},
+            env=_subprocess_env(),
         )
         state["process"] = proc
         logger.info(f"[DIAG][THREAD] Subprocess Locust démarré avec PID: {proc.pid}")
         logger.info(f"[DIAG][THREAD] state['process'] assigné. proc.returncode={proc.returncode}")
 
-        watchdog = threading.Timer(MAX_DURATION, _kill_if_running, args=(proc,))
+        watchdog = threading.Timer(_max_duration(options), _kill_if_running, args=(proc,))
         watchdog.daemon = True
         watchdog.start()
 
-        crawl_done = False
+        # Les transitions d'état et les URLs découvertes arrivent par le canal
+        # d'événements ; le stdout n'est plus que du log pour l'affichage.
+        channel = EventChannelStatus()
+        events_thread = threading.Thread(
+            target=_consume_events, args=(listener, proc, _broadcast, channel), daemon=True
+        )
+        events_thread.start()
+
+        # Points d'historique (graphes RPS/P95) diffusés au fil de l'eau
+        history_stop = threading.Event()
+        history_thread = threading.Thread(
+            target=_follow_history, args=(_history_tailer(), history_stop, _broadcast), daemon=True
+        )
+        history_thread.start()
+
         logger.debug("Début de la lecture du stdout du processus Locust")
         for line in iter(proc.stdout.readline, ""):
             line = line.rstrip()
             if not line:
                 continue
-
-            # Synchroniser les URLs découvertes dans le state partagé.
-            # Le crawler imprime chaque URL sur une ligne "    - /chemin"
-            stripped = line.strip()
-            if stripped.startswith("- /") or (stripped.startswith("- http") and "://" in stripped):
-                url_part = stripped[2:].strip()
-                if url_part and url_part not in state["discovered_urls"]:
-                    state["discovered_urls"].append(url_part)
-
-            # Detect crawl -> running transition.
-            # On attend la ligne imprimée APRÈS le crawl dans on_test_start()
-            # ("URL(s) utilisees pour le test" sans accent, ou le banner final).
-            # On évite "LOAD TEST" qui apparaît AVANT le crawl dans on_test_start.
-            if not crawl_done and (
-                "URL(s) utilisees pour le test" in line   # fin du crawl (main.py l.302)
-                or "utilisees pour le test de charge" in line  # variante
-                or "Aucune URL decouverte" in line         # cas sans URL
-                or "All users spawned" in line             # Locust démarre les users
-                or "Spawning is complete" in line          # Locust ancien format
-            ):
-                crawl_done = True
-                logger.info("Transition détectée: Crawl terminé -> Lancement du Test")
-                _broadcast(broadcast_status("running"))
-
             logger.debug(f"[Locust Stdout] {line}")
-            _broadcast(broadcast_log(line))
+            forwarder.put(line)
+            for coro in _stdout_transition(line, channel):
+                _broadcast(coro)
 
         proc.wait()
         watchdog.cancel()
+        events_thread.join(timeout=5)
+        history_stop.set()
+        history_thread.join(timeout=5)
         exit_code = proc.returncode
         logger.info(f"Process Locust terminé avec le code d'arrêt: {exit_code}")
 
-        # Parse CSV stats
-        logger.info("Parsing final des statistiques CSV...")
-        stats = parse_csv_stats()
+        stats = _collect_stats(options, workers)
         state["stats"] = stats
+        response_cache.invalidate(namespace="stats")
 
         if exit_code != 0 and not stats:
             error_msg = f"Locust a terminé de manière inattendue avec le code {exit_code}"
             logger.error(error_msg)
-            _broadcast(broadcast_log(f"[ERREUR] {error_msg}"))
+            forwarder.put(f"[ERREUR] {error_msg}")
+            forwarder.flush()
             _broadcast(broadcast_status("error"))
         else:
             logger.info("Test de charge Locust complété avec succès.")
+            forwarder.flush()
             _broadcast(broadcast_status("done"))
-            _broadcast(broadcast_log("[TERMINÉ] Test de charge terminé."))
+            forwarder.put("[TERMINÉ] Test de charge terminé.")
             if stats:
-                g = stats["global"]
-                result_str = (
-                    f"{g['num_requests']} requêtes | "
-                    f"Erreurs: {g['failure_rate']}% | "
-                    f"RPS: {g['rps']:.1f} | "
-                    f"P95: {g['p95_response']:.1f}ms"
-                )
+                result_str = _result_line(options, stats)
                 logger.info(f"Résumé stats: {result_str}")
-                _broadcast(broadcast_log(f"[RÉSULTAT] {result_str}"))
+                forwarder.put(f"[RÉSULTAT] {result_str}")
 
                 # Save to DB
                 if user_id:
-                    async def save_to_db():
-                        db = get_db()
-                        if db is not None:
-                            import datetime
-                            scan_doc = {
-                                "domain": domain,
-                                "total_requests": g['num_requests'],
-                                "failures": g['num_failures'],
-                                "error_rate": g['failure_rate'],
-                                "avg_rps": g['rps'],
-                                "p95_latency": g['p95_response'],
-                                "global_stats": g,
-                                "user_id": user_id,
-                                "created_at": datetime.datetime.utcnow()
-                            }
-                            await db.scans.insert_one(scan_doc)
-                            logger.info(f"Scan history saved to database for user {user_id}")
-                    _broadcast(save_to_db())
+                    _broadcast(_save_scan(domain, user_id, options, workers, stats))
 
     except Exception as e:
         logger.exception(f"Exception non gérée dans le thread Locust runner: {e}")
-        _broadcast(broadcast_log(f"[ERREUR] {e}"))
-        _broadcast(broadcast_log(f"[TRACEBACK] {traceback.format_exc()}"))
+        forwarder.put(f"[ERREUR] {e}")
+        forwarder.put(f"[TRACEBACK] {traceback.format_exc()}")
+        forwarder.flush()
         _broadcast(broadcast_status("error"))
     finally:
+        listener.close()
+        forwarder.close()
         logger.debug("Nettoyage: state['process'] mis à None")
         state["process"] = None
 
@@ -0,0 +1,163 @@
+"""
+Transfert non bloquant des lignes de log du thread runner vers les WebSockets.
+
+Le thread qui lit le stdout de Locust ne fait que déposer les lignes dans une
+file bornée (put ne bloque jamais). Une tâche sur la boucle asyncio vide la
+file par lots — toutes les `flush_interval` secondes, ou dès `batch_lines`
+lignes — et envoie chaque lot en une seule trame WebSocket.
+
+Si la file est pleine (boucle ou clients trop lents), les nouvelles lignes
+sont ignorées et comptées ; le lot suivant se termine par une ligne de
+synthèse indiquant combien de lignes ont été perdues.
+"""
+
+import asyncio
+import threading
+from collections import deque
+
+from core.logger import get_logger
+
+logger = get_logger("services.log_forwarder")
+
+DEFAULT_MAX_QUEUE = 5000
+DEFAULT_BATCH_LINES = 200
+DEFAULT_FLUSH_INTERVAL = 0.1  # secondes
+
+
+class LogForwarder:
+    def __init__(self, loop, send, max_queue: int = DEFAULT_MAX_QUEUE,
+                 batch_lines: int = DEFAULT_BATCH_LINES,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        """
+        send : coroutine appelée sur la boucle avec une liste de lignes
+        (api.websockets.broadcast_logs).
+        """
+        self._loop = loop
+        self._send = send
+        self.max_queue = max_queue
+        self.batch_lines = batch_lines
+        self.flush_interval = flush_interval
+
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._pending_drops = 0
+        self._wakeup_sent = False
+        self._closed = False
+        self._wakeup = None
+        self._flush_lock = None
+        self._task = None
+
+        # Compteurs (exposés par /api/status)
+        self.enqueued = 0
+        self.forwarded = 0
+        self.dropped = 0
+        self.batches = 0
+        self.max_depth = 0
+
+    # ── Côté thread runner ───────────────────────────────────────────
+
+    def start(self):
+        """Démarre la tâche de vidage sur la boucle."""
+        self._task = asyncio.run_coroutine_threadsafe(self._drain(), self._loop)
+
+    def put(self, line: str) -> bool:
+        """Dépose une ligne sans jamais bloquer ; False si elle a été ignorée."""
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                self._pending_drops += 1
+                self.dropped += 1
+                return False
+            self._queue.append(line)
+            self.enqueued += 1
+            depth = len(self._queue)
+            self.max_depth = max(self.max_depth, depth)
+            wake = depth >= self.batch_lines and not self._wakeup_sent
+            if wake:
+                self._wakeup_sent = True
+        if wake:
+            self._loop.call_soon_threadsafe(self._wake)
+        return True
+
+    def flush(self, timeout: float = 5.0):
+        """Attend que les lignes déjà déposées soient envoyées (ex. avant un changement de statut)."""
+        try:
+            asyncio.run_coroutine_threadsafe(self._flush(), self._loop).result(timeout=timeout)
+        except Exception as e:
+            logger.error(f"Vidage des logs incomplet: {type(e).__name__}: {e}")
+
+    def close(self, timeout: float = 5.0):
+        """Envoie les lignes restantes puis arrête la tâche de vidage."""
+        self._closed = True
+        if self._task is None:
+            return
+        self._loop.call_soon_threadsafe(self._wake)
+        try:
+            self._task.result(timeout=timeout)
+        except Exception as e:
+            logger.error(f"Arrêt du transfert des logs: {type(e).__name__}: {e}")
+
+    # Variantes pour un appelant déjà sur la boucle (services/async_runner) :
+    # flush() et close() y bloqueraient la boucle qu'ils attendent.
+
+    async def drain(self):
+        await self._flush()
+
+    async def aclose(self):
+        self._closed = True
+        self._wake()
+        if self._task is not None:
+            await asyncio.wrap_future(self._task)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            depth = len(self._queue)
+        return {
+            "queue_depth": depth,
+            "max_queue_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "forwarded": self.forwarded,
+            "dropped": self.dropped,
+            "batches": self.batches,
+        }
+
+    # ── Côté boucle asyncio ──────────────────────────────────────────
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _drain(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._flush()
+            if self._closed and not self._queue:
+                return
+
+    async def _flush(self):
+        # Un seul vidage à la fois : les lots partent dans l'ordre des lignes
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            await self._flush_locked()
+
+    async def _flush_locked(self):
+        while True:
+            with self._lock:
+                batch = [self._queue.popleft() for _ in range(min(self.batch_lines, len(self._queue)))]
+                drops, self._pending_drops = self._pending_drops, 0
+                self._wakeup_sent = False
+            if drops:
+                batch.append(f"[LOGS] {drops} ligne(s) ignorée(s) : clients WebSocket trop lents")
+            if not batch:
+                return
+            try:
+                await self._send(batch)
+                self.forwarded += len(batch) - (1 if drops else 0)
+                self.batches += 1
+            except Exception as e:
+                logger.error(f"Envoi d'un lot de logs impossible: {type(e).__name__}: {e}")
@@ -1,8 +1,14 @@
 import csv
-from typing import Optional
+import json
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional
 
 from core.config import CSV_DIR
 from core.logger import get_logger
+from services.histogram import RESULT_SUFFIX as HISTOGRAMS_SUFFIX, LatencyHistograms
+from services.stage_stats import RESULT_SUFFIX as STAGES_SUFFIX, compute_stage_stats, detect_saturation
+from services.scalability import fit_stages
 
 logger = get_logger("services.parser")
 
@@ -22,16 +28,105 @@ def _safe_float(val, default=0.0) -> float:
     except (ValueError, TypeError):
         return default
 
-def parse_csv_stats() -> Optional[dict]:
-    """Parse les fichiers CSV générés par Locust et retourne les stats structurées."""
+# Clé du point d'historique -> (colonne CSV, conversion, typecode du tableau)
+HISTORY_COLUMNS = {
+    "timestamp": ("Timestamp", _safe_int, "q"),
+    "users": ("User Count", _safe_int, "q"),
+    "rps": ("Requests/s", _safe_float, "d"),
+    "failures_s": ("Failures/s", _safe_float, "d"),
+    "median": ("50%", _safe_float, "d"),
+    "p95": ("95%", _safe_float, "d"),
+    "p99": ("99%", _safe_float, "d"),
+    "requests": ("Total Request Count", _safe_int, "q"),
+    "failures": ("Total Failure Count", _safe_int, "q"),
+}
+
+class HistoryColumns:
+    """
+    Historique "Aggregated" stocké en colonnes (array typés) : 8 octets par
+    valeur au lieu d'un dict et de ses objets float/int par point. C'est la
+    forme gardée dans result["history"] ; les points en dicts ne sont
+    construits qu'à la demande (indexation, réponse JSON via stats_for_json).
+    """
+
+    def __init__(self):
+        self.columns: Dict[str, array] = {
+            key: array(typecode) for key, (_, _, typecode) in HISTORY_COLUMNS.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.columns["timestamp"])
+
+    def append_row(self, row: List[str], fields: list):
+        """fields : [(clé, index de colonne, conversion)] résolus depuis l'en-tête."""
+        for key, idx, convert in fields:
+            self.columns[key].append(convert(row[idx]) if idx < len(row) else convert(None))
+
+    def __getitem__(self, index):
+        """Point (ou liste de points pour une tranche) au format de records()."""
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return {key: column[index] for key, column in self.columns.items()}
+
+    def records(self) -> List[dict]:
+        """Points au format de result["history"] (une liste de dicts pour l'API)."""
+        keys = list(self.columns)
+        return [dict(zip(keys, values)) for values in zip(*self.columns.values())]
+
+def stats_for_json(stats: Optional[dict]) -> Optional[dict]:
+    """Stats prêtes pour une réponse JSON : l'historique colonnaire devient une liste de points."""
+    if stats and isinstance(stats.get("history"), HistoryColumns):
+        return {**stats, "history": stats["history"].records()}
+    return stats
+
+def resolve_history_fields(header: List[str]) -> Optional[tuple]:
+    """(index de "Name", [(clé, index, conversion)]) ; None si l'en-tête n'a pas de "Name"."""
+    if "Name" not in header:
+        return None
+    positions = {column: i for i, column in enumerate(header)}
+    fields = [
+        # Colonne absente : index hors ligne -> valeur par défaut
+        (key, positions.get(column, len(header)), convert)
+        for key, (column, convert, _) in HISTORY_COLUMNS.items()
+    ]
+    return positions["Name"], fields
+
+def load_history(history_file: Path) -> HistoryColumns:
+    """
+    Charge les lignes "Aggregated" de rapport_stats_history.csv.
+    Les lignes par endpoint (la quasi-totalité du fichier) sont écartées par
+    une simple recherche de sous-chaîne, sans passer par le module csv.
+    """
+    history = HistoryColumns()
+    with open(history_file, newline="", encoding="utf-8") as f:
+        header = next(csv.reader([f.readline()]), [])
+        resolved = resolve_history_fields(header)
+        if resolved is None:
+            logger.warning(f"En-tête inattendu dans {history_file.name}: {header[:5]}")
+            return history
+        name_idx, fields = resolved
+        for row in csv.reader(line for line in f if "Aggregated" in line):
+            if len(row) > name_idx and row[name_idx] == "Aggregated":
+                history.append_row(row, fields)
+    return history
+
+def parse_csv_stats(csv_dir: Optional[Path] = None) -> Optional[dict]:
+    """
+    Parse les fichiers CSV générés par Locust et retourne les stats structurées.
+    csv_dir : dossier des rapport_* (CSV_DIR par défaut, dossier du job sinon).
+    """
     logger.debug("Début du parsing des fichiers CSV...")
-    stats_file = CSV_DIR / "rapport_stats.csv"
-    history_file = CSV_DIR / "rapport_stats_history.csv"
+    csv_dir = csv_dir or CSV_DIR
+    stats_file = csv_dir / "rapport_stats.csv"
+    history_file = csv_dir / "rapport_stats_history.csv"
+    capacity_file = csv_dir / "rapport_capacity.json"
+    histograms_file = csv_dir / f"rapport{HISTOGRAMS_SUFFIX}"
+    stages_file = csv_dir / f"rapport{STAGES_SUFFIX}"
 
     result = {
         "global": {},
         "endpoints": [],
-        "history": [],
+        "history": HistoryColumns(),
     }
 
     # Stats globales et par endpoint
@@ -79,27 +174,43 @@ def parse_csv_stats() -> Optional[dict]:
     if history_file.exists():
         logger.info(f"Fichier trouvé: {history_file.name}, début de l'extraction de l'historique temporel.")
         try:
-            with open(history_file, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                count = 0
-                for row in reader:
-                    if row.get("Name") == "Aggregated":
-                        result["history"].append({
-                            "timestamp": _safe_int(row.get("Timestamp")),
-                            "users": _safe_int(row.get("User Count")),
-                            "rps": _safe_float(row.get("Requests/s")),
-                            "failures_s": _safe_float(row.get("Failures/s")),
-                            "median": _safe_float(row.get("50%")),
-                            "p95": _safe_float(row.get("95%")),
-                            "p99": _safe_float(row.get("99%")),
-                        })
-                        count += 1
-            logger.info(f"Extraction terminée: {count} points d'historique trouvés.")
+            history = load_history(history_file)
+            result["history"] = history
+            logger.info(f"Extraction terminée: {len(history)} points d'historique trouvés.")
         except Exception as e:
             logger.error(f"Erreur lors de la lecture de {history_file.name}: {e}")
     else:
         logger.warning(f"Fichier CSV d'historique manquant: {history_file.name}")
 
+    # Résultat de la recherche de capacité (forme de charge "capacity")
+    if capacity_file.exists():
+        try:
+            result["capacity"] = json.loads(capacity_file.read_text(encoding="utf-8"))
+            logger.info(f"Capacité max soutenable: {result['capacity'].get('capacity_users')} utilisateurs")
+        except (OSError, ValueError) as e:
+            logger.error(f"Erreur lors de la lecture de {capacity_file.name}: {e}")
+
+    # Histogrammes de latence par (palier, endpoint), encodés (services/histogram)
+    if histograms_file.exists():
+        try:
+            result["histograms"] = json.loads(histograms_file.read_text(encoding="utf-8"))
+            logger.info(f"{len(result['histograms'])} histogrammes de latence chargés")
+        except (OSError, ValueError) as e:
+            logger.error(f"Erreur lors de la lecture de {histograms_file.name}: {e}")
+
+    # Découpage de l'historique selon les bornes des paliers exécutés
+    if stages_file.exists() and result["history"]:
+        try:
+            boundaries = json.loads(stages_file.read_text(encoding="utf-8"))
+            histograms = LatencyHistograms.from_entries(result.get("histograms") or [])
+            result["stages"] = compute_stage_stats(result["history"], boundaries, histograms)
+            result["saturation"] = detect_saturation(result["stages"])
+            result["scalability"] = fit_stages(result["stages"])
+            logger.info(f"Stats par palier: {len(result['stages'])} palier(s), "
+                        f"saturation: {result['saturation']['users'] if result['saturation'] else 'aucune'}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Erreur lors de la lecture de {stages_file.name}: {e}")
+
     if result["global"]:
         logger.debug("Parsing CSV réussi (données globales présentes).")
         return result
@@ -0,0 +1,186 @@
+"""
+Génération des rapports PDF hors de la boucle asyncio.
+
+La mise en page ReportLab est du calcul pur : exécutée dans le handler, elle
+bloquait la boucle (WebSockets et autres requêtes compris) pendant tout le
+rendu. Ici :
+- le rendu tourne dans un ProcessPoolExecutor borné, en processus « spawn »
+  (pas de fork d'un processus qui porte la boucle et les threads Motor) ;
+- au plus `max_concurrent` rendus soumis au pool à la fois (sémaphore),
+  les demandes suivantes attendent leur tour ;
+- les PDF rendus sont gardés en mémoire (LRU bornée en nombre et en octets)
+  par (scan, version) : retélécharger un scan historique ne relance pas le
+  rendu, et deux demandes simultanées du même rapport partagent un seul
+  rendu. Un scan enregistré ne change plus : sa version est tirée du document
+  (scan_version) ; celle du scan en cours est l'empreinte de son contenu,
+  calculée hors de la boucle ;
+- métriques : rendus, succès / échecs du cache, attente et durée des rendus.
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from core.config import settings
+from core.logger import get_logger
+from services.parser import HistoryColumns
+from services.reporter import build_pdf
+
+logger = get_logger("services.pdf_renderer")
+
+
+def render_pdf(stats: dict, domain: str) -> bytes:
+    """Exécuté dans un processus du pool : stats -> octets du PDF."""
+    buffer = io.BytesIO()
+    build_pdf(buffer, stats, domain)
+    return buffer.getvalue()
+
+
+def _json_default(value):
+    # Historique colonnaire : les colonnes brutes suffisent à l'empreinte
+    if isinstance(value, HistoryColumns):
+        return {key: column.tolist() for key, column in value.columns.items()}
+    return str(value)
+
+
+def scan_version(scan: dict) -> str:
+    """Version d'un scan enregistré : date de création et taille du bloc de résultats."""
+    return f"{scan.get('created_at')}:{(scan.get('results') or {}).get('size')}"
+
+
+def content_hash(stats: dict, domain: str) -> str:
+    """Empreinte des données du rapport : elle change dès que le contenu change."""
+    raw = json.dumps({"domain": domain, "stats": stats}, sort_keys=True, default=_json_default,
+                     separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PdfRenderer:
+    def __init__(self, workers: int = 2, max_concurrent: int = 4, cache_entries: int = 32,
+                 cache_bytes: int = 64 * 1024 * 1024, executor: Optional[Executor] = None):
+        self.workers = workers
+        self.max_concurrent = max_concurrent
+        self.cache_entries = cache_entries
+        self.cache_bytes = cache_bytes
+        self._executor = executor
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._cache_size = 0
+        self._pending = {}
+        self._counters = dict.fromkeys(
+            ("renders", "failures", "cache_hits", "cache_misses", "shared", "in_flight", "waiting"), 0
+        )
+        self._render_total = 0.0
+        self._render_max = 0.0
+        self._render_last = None
+        self._wait_total = 0.0
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def cached(self, scan_key: str, version: str) -> Optional[bytes]:
+        """PDF déjà rendu pour (scan_key, version), sans avoir à charger les stats ; None sinon."""
+        pdf = self._cache.get((scan_key, version))
+        if pdf is not None:
+            self._cache.move_to_end((scan_key, version))
+            self._counters["cache_hits"] += 1
+        return pdf
+
+    async def render(self, scan_key: str, stats: dict, domain: str, version: Optional[str] = None) -> bytes:
+        """
+        PDF du rapport de `scan_key` ("current" pour le scan en cours).
+        version : scan_version() d'un scan enregistré ; sans elle, l'empreinte
+        du contenu (sérialisation complète des stats) est calculée dans un thread.
+        """
+        if version is None:
+            version = await asyncio.to_thread(content_hash, stats, domain)
+        pdf = self.cached(scan_key, version)
+        if pdf is not None:
+            return pdf
+        key = (scan_key, version)
+
+        task = self._pending.get(key)
+        if task is None:
+            self._counters["cache_misses"] += 1
+            task = asyncio.ensure_future(self._render(key, stats, domain))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        else:
+            self._counters["shared"] += 1
+        # Un client qui abandonne n'annule pas le rendu partagé
+        return await asyncio.shield(task)
+
+    async def _render(self, key: tuple, stats: dict, domain: str) -> bytes:
+        queued = time.perf_counter()
+        self._counters["waiting"] += 1
+        async with self._semaphore:
+            self._counters["waiting"] -= 1
+            self._counters["in_flight"] += 1
+            start = time.perf_counter()
+            self._wait_total += start - queued
+            try:
+                loop = asyncio.get_running_loop()
+                pdf = await loop.run_in_executor(self._pool(), render_pdf, stats, domain)
+            except BrokenProcessPool:
+                # Processus de rendu mort (ex. OOM) : le pool est inutilisable, on le recrée au prochain rendu
+                logger.error("Pool de rendu PDF cassé — recréation au prochain rendu")
+                self._executor = None
+                self._counters["failures"] += 1
+                raise
+            except Exception:
+                self._counters["failures"] += 1
+                raise
+            finally:
+                self._counters["in_flight"] -= 1
+
+        duration = time.perf_counter() - start
+        self._counters["renders"] += 1
+        self._render_total += duration
+        self._render_max = max(self._render_max, duration)
+        self._render_last = duration
+        logger.info(f"PDF {key[0]} rendu en {duration:.2f}s ({len(pdf)} octets)")
+
+        if len(pdf) <= self.cache_bytes:
+            self._cache[key] = pdf
+            self._cache_size += len(pdf)
+            while len(self._cache) > self.cache_entries or self._cache_size > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_size -= len(evicted)
+        return pdf
+
+    def metrics(self) -> dict:
+        renders = self._counters["renders"]
+        started = renders + self._counters["failures"]
+        lookups = self._counters["cache_hits"] + self._counters["cache_misses"]
+        return {
+            **self._counters,
+            "hit_ratio": round(self._counters["cache_hits"] / lookups, 4) if lookups else 0.0,
+            "cached": len(self._cache),
+            "cached_bytes": self._cache_size,
+            "render_seconds": {
+                "last": round(self._render_last, 3) if renders else None,
+                "avg": round(self._render_total / renders, 3) if renders else None,
+                "max": round(self._render_max, 3) if renders else None,
+            },
+            "avg_wait_seconds": round(self._wait_total / started, 3) if started else None,
+            "workers": self.workers,
+            "max_concurrent": self.max_concurrent,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+pdf_renderer = PdfRenderer(settings.pdf_render_workers, settings.pdf_max_concurrent_renders,
+                           settings.pdf_cache_entries, settings.pdf_cache_bytes)
@@ -6,13 +6,12 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
 
-from core.state import state
 from core.logger import get_logger
 
 logger = get_logger("services.reporter")
 
-def build_pdf(buffer: io.BytesIO, stats: dict):
-    """Construit le PDF avec reportlab."""
+def build_pdf(buffer: io.BytesIO, stats: dict, domain: str = "N/A"):
+    """Construit le PDF avec reportlab (sans état global : exécutable dans un autre processus)."""
     logger.debug("Initialisation du document PDF avec Reportlab (format A4)")
     doc = SimpleDocTemplate(
         buffer, pagesize=A4,
@@ -25,7 +24,6 @@ def build_pdf(buffer: io.BytesIO, stats: dict):
     body_style = styles["Normal"]
 
     g = stats["global"]
-    domain = state.get("domain", "N/A")
     now = datetime.now().strftime("%d/%m/%Y à %H:%M")
 
     elements = []
@@ -103,5 +101,80 @@ def build_pdf(buffer: io.BytesIO, stats: dict):
     else:
         logger.debug("Aucun endpoint spécifique à ajouter au rapport PDF")
 
+    # Détail par palier et point de saturation (services/stage_stats)
+    stages = stats.get("stages") or []
+    if stages:
+        logger.debug(f"Ajout du tableau par palier ({len(stages)} paliers)")
+        elements.append(Spacer(1, 0.5*cm))
+        elements.append(Paragraph("Détail par palier", h2_style))
+        stage_data = [["Palier", "Utilisateurs", "RPS", "Erreurs", "Médiane (ms)", "P95 (ms)", "P99 (ms)"]]
+        for stage in stages:
+            stage_data.append([
+                str(stage["index"] + 1),
+                str(stage["users"]),
+                f"{stage['rps']:.1f}",
+                f"{stage['failure_rate']:.2f}%",
+                f"{stage['median']:.0f}",
+                f"{stage['p95']:.0f}",
+                f"{stage['p99']:.0f}",
+            ])
+        stage_table = Table(stage_data, colWidths=[1.8*cm, 2.6*cm, 2*cm, 2.2*cm, 2.8*cm, 2.3*cm, 2.3*cm])
+        stage_table.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.black),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("FONTSIZE", (0, 0), (-1, -1), 8),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#F5F5F5")]),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#CCCCCC")),
+            ("LEFTPADDING", (0, 0), (-1, -1), 4),
+            ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+            ("TOPPADDING", (0, 0), (-1, -1), 4),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+        ]))
+        elements.append(stage_table)
+        saturation = stats.get("saturation")
+        if saturation:
+            elements.append(Spacer(1, 0.2*cm))
+            elements.append(Paragraph(
+                f"Saturation détectée à <b>{saturation['users']} utilisateurs</b> : le débit ne suit plus "
+                f"la charge au-delà de {saturation['last_scaling_users']} utilisateurs "
+                f"(efficacité {saturation['efficiency']:.2f}, P95 {saturation['p95']:.0f} ms).",
+                body_style,
+            ))
+
+    # Modèle de scalabilité (services/scalability)
+    usl = stats.get("scalability")
+    if usl:
+        logger.debug("Ajout du modèle de scalabilité (USL)")
+        elements.append(Spacer(1, 0.5*cm))
+        elements.append(Paragraph("Modèle de scalabilité (USL)", h2_style))
+        usl_data = [
+            ["Paramètre", "Valeur"],
+            ["Débit à 1 utilisateur (λ)", f"{usl['lambda']:.2f} req/s"],
+            ["Contention (σ)", f"{usl['sigma']:.4f}"],
+            ["Cohérence (κ)", f"{usl['kappa']:.6f}"],
+            ["Qualité de l'ajustement (R²)", f"{usl['r2']:.3f}"],
+        ]
+        if usl.get("peak_users") is not None:
+            usl_data.append(["Débit max prévu", f"{usl['peak_rps']:.1f} req/s à {usl['peak_users']:.0f} utilisateurs"])
+        elif usl.get("asymptotic_rps") is not None:
+            usl_data.append(["Débit max prévu (asymptote)", f"{usl['asymptotic_rps']:.1f} req/s"])
+        for users, rps in (usl.get("forecast") or {}).items():
+            usl_data.append([f"Débit prévu à {users} utilisateurs", f"{rps:.1f} req/s"])
+        usl_table = Table(usl_data, colWidths=[9*cm, 7*cm])
+        usl_table.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.black),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("FONTSIZE", (0, 0), (-1, -1), 10),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#F5F5F5")]),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#CCCCCC")),
+            ("LEFTPADDING", (0, 0), (-1, -1), 8),
+            ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+            ("TOPPADDING", (0, 0), (-1, -1), 6),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+        ]))
+        elements.append(usl_table)
+
     logger.info("Finalisation du `build` du PDF")
     doc.build(elements)
@@ -0,0 +1,173 @@
+"""
+Stockage compact des résultats complets d'un scan dans Mongo.
+
+Le document `scans` ne garde en clair que le résumé (global, paliers,
+saturation, modèle USL) ; l'historique, les endpoints et les histogrammes
+sont rangés dans un bloc binaire `results` :
+
+- historique : une colonne par champ, entiers encodés en deltas (zigzag +
+  varint), flottants ramenés au millième ;
+- endpoints : bloc colonnaire (noms et méthodes en listes, mesures en
+  colonnes numériques) ;
+- le tout sérialisé en msgpack puis compressé (zlib).
+
+Au-delà de INLINE_LIMIT, le bloc part dans GridFS (bucket GRIDFS_BUCKET) et
+le document n'en garde que l'identifiant : il reste loin des 16 Mo.
+Le décodage n'a lieu qu'à la demande (détails, PDF, percentiles) : les
+listes de scans excluent `results` par projection.
+"""
+
+import asyncio
+import zlib
+from typing import List, Optional
+
+import msgpack
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+from core.logger import get_logger
+from services.histogram import _read_varints, _write_varint
+from services.parser import HISTORY_COLUMNS, HistoryColumns
+
+logger = get_logger("services.result_store")
+
+CODEC = "columnar-v1"
+# Taille max du bloc gardé dans le document ; au-delà : GridFS
+INLINE_LIMIT = 1024 * 1024
+GRIDFS_BUCKET = "scan_results"
+# Les flottants sont stockés en entiers au millième près
+FLOAT_SCALE = 1000
+
+# Colonnes numériques des endpoints : clé -> typecode (comme HISTORY_COLUMNS)
+ENDPOINT_COLUMNS = {
+    "requests": "q",
+    "failures": "q",
+    "median": "d",
+    "p95": "d",
+    "max": "d",
+    "rps": "d",
+}
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def encode_column(values: List[float], typecode: str) -> bytes:
+    """Colonne numérique -> deltas successifs en varints zigzag."""
+    out = bytearray()
+    previous = 0
+    for value in values:
+        number = round(value * FLOAT_SCALE) if typecode == "d" else int(value)
+        _write_varint(out, _zigzag(number - previous))
+        previous = number
+    return bytes(out)
+
+
+def decode_column(data: bytes, typecode: str) -> list:
+    values = []
+    current = 0
+    for delta in _read_varints(data):
+        current += _unzigzag(delta)
+        values.append(current / FLOAT_SCALE if typecode == "d" else current)
+    return values
+
+
+def _encode_records(records: List[dict], columns: dict) -> dict:
+    return {
+        key: encode_column([record.get(key) or 0 for record in records], typecode)
+        for key, typecode in columns.items()
+    }
+
+
+def _encode_history(history, columns: dict) -> dict:
+    """Historique colonnaire (HistoryColumns) encodé directement, sans passer par des dicts."""
+    if isinstance(history, HistoryColumns):
+        return {key: encode_column(history.columns[key], typecode) for key, typecode in columns.items()}
+    return _encode_records(history, columns)
+
+
+def _decode_records(encoded: dict, columns: dict, count: int) -> List[dict]:
+    decoded = {
+        key: decode_column(encoded[key], typecode)
+        for key, typecode in columns.items() if key in encoded
+    }
+    return [{key: values[i] for key, values in decoded.items()} for i in range(count)]
+
+
+def pack_results(stats: dict) -> bytes:
+    """Historique, endpoints et histogrammes d'un scan -> bloc binaire compressé."""
+    history = stats.get("history") or []
+    endpoints = stats.get("endpoints") or []
+    history_types = {key: typecode for key, (_, _, typecode) in HISTORY_COLUMNS.items()}
+    payload = {
+        "history": {"n": len(history), "columns": _encode_history(history, history_types)},
+        "endpoints": {
+            "n": len(endpoints),
+            "name": [endpoint.get("name", "") for endpoint in endpoints],
+            "method": [endpoint.get("method", "") for endpoint in endpoints],
+            "columns": _encode_records(endpoints, ENDPOINT_COLUMNS),
+        },
+        "histograms": stats.get("histograms") or [],
+    }
+    return zlib.compress(msgpack.packb(payload, use_bin_type=True), 9)
+
+
+def unpack_results(blob: bytes) -> dict:
+    payload = msgpack.unpackb(zlib.decompress(blob), raw=False)
+    history_types = {key: typecode for key, (_, _, typecode) in HISTORY_COLUMNS.items()}
+    history = payload["history"]
+    endpoints = payload["endpoints"]
+    rows = _decode_records(endpoints["columns"], ENDPOINT_COLUMNS, endpoints["n"])
+    for row, name, method in zip(rows, endpoints["name"], endpoints["method"]):
+        row["name"] = name
+        row["method"] = method
+    return {
+        "history": _decode_records(history["columns"], history_types, history["n"]),
+        "endpoints": rows,
+        "histograms": payload["histograms"],
+    }
+
+
+# ── Persistance ──────────────────────────────────────────────────────
+
+async def store_results(db, stats: dict) -> dict:
+    """Champ `results` du document scan : bloc en ligne, ou référence GridFS s'il est trop gros."""
+    return await store_packed(db, pack_results(stats))
+
+
+async def store_packed(db, blob: bytes) -> dict:
+    """Comme store_results, pour un bloc déjà produit par pack_results (ex. hors de la boucle)."""
+    field = {"codec": CODEC, "size": len(blob)}
+    if len(blob) <= INLINE_LIMIT:
+        field["data"] = blob
+    else:
+        bucket = AsyncIOMotorGridFSBucket(db, bucket_name=GRIDFS_BUCKET)
+        field["gridfs_id"] = await bucket.upload_from_stream("scan_results", blob)
+        logger.info(f"Résultats du scan stockés dans GridFS ({len(blob)} octets)")
+    return field
+
+
+async def load_results(db, scan: dict) -> Optional[dict]:
+    """Résultats complets décodés d'un document scan ; None s'il n'en a pas (anciens scans)."""
+    field = scan.get("results")
+    if not field or field.get("codec") != CODEC:
+        return None
+    blob = field.get("data")
+    if blob is None:
+        bucket = AsyncIOMotorGridFSBucket(db, bucket_name=GRIDFS_BUCKET)
+        stream = await bucket.open_download_stream(field["gridfs_id"])
+        blob = await stream.read()
+    # Décompression et décodage colonnaire : calcul pur, hors de la boucle
+    return await asyncio.to_thread(unpack_results, bytes(blob))
+
+
+async def delete_results(db, scan: dict):
+    """Supprime le bloc GridFS éventuel d'un scan."""
+    field = scan.get("results") or {}
+    if field.get("gridfs_id") is not None:
+        bucket = AsyncIOMotorGridFSBucket(db, bucket_name=GRIDFS_BUCKET)
+        await bucket.delete(field["gridfs_id"])
@@ -0,0 +1,153 @@
+"""
+Modèle de scalabilité : ajustement de la loi universelle de scalabilité
+(USL, N. Gunther) sur les mesures par palier d'un scan.
+
+    X(N) = λN / (1 + σ(N - 1) + κN(N - 1))
+
+λ : débit d'un utilisateur seul, σ : contention (part sérialisée),
+κ : cohérence (coût croisé entre utilisateurs). Avec κ > 0 le débit passe
+par un maximum en N* = sqrt((1 - σ) / κ) puis décroît : on peut estimer le
+débit à 2000 utilisateurs à partir d'un run à 500, sans lancer le test.
+
+L'ajustement se fait par moindres carrés sur la forme linéarisée
+N / X = a + b(N - 1) + cN(N - 1) (a = 1/λ, b = σ/λ, c = κ/λ), sous les
+contraintes σ, κ >= 0 ; la qualité (R²) est mesurée sur le débit lui-même.
+"""
+
+import math
+from typing import Iterable, List, Optional, Tuple
+
+# Paliers distincts (en nombre d'utilisateurs) nécessaires à l'ajustement
+MIN_POINTS = 3
+# Prévisions par défaut : multiples de la charge max testée
+FORECAST_FACTORS = (2, 4)
+# Un coefficient dont l'effet reste sous ce seuil à la charge max testée est
+# du bruit numérique (il ne peut pas être identifié par les mesures) : ramené à 0
+NEGLIGIBLE_EFFECT = 1e-6
+
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> Optional[List[float]]:
+    """Élimination de Gauss avec pivot partiel ; None si le système est singulier."""
+    n = len(vector)
+    rows = [row[:] + [value] for row, value in zip(matrix, vector)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-12:
+            return None
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(col + 1, n):
+            factor = rows[r][col] / rows[col][col]
+            for c in range(col, n + 1):
+                rows[r][c] -= factor * rows[col][c]
+    solution = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        solution[r] = (rows[r][n] - sum(rows[r][c] * solution[c] for c in range(r + 1, n))) / rows[r][r]
+    return solution
+
+
+def _least_squares(features: List[List[float]], targets: List[float]) -> Optional[List[float]]:
+    size = len(features[0])
+    normal = [[sum(f[i] * f[j] for f in features) for j in range(size)] for i in range(size)]
+    rhs = [sum(f[i] * y for f, y in zip(features, targets)) for i in range(size)]
+    return _solve(normal, rhs)
+
+
+class UslModel:
+    def __init__(self, lam: float, sigma: float, kappa: float):
+        self.lam = lam
+        self.sigma = sigma
+        self.kappa = kappa
+        self.r2 = None
+        self.points = 0
+
+    def throughput(self, users: float) -> float:
+        if users <= 0:
+            return 0.0
+        return self.lam * users / (1 + self.sigma * (users - 1) + self.kappa * users * (users - 1))
+
+    def peak(self) -> Tuple[Optional[float], Optional[float]]:
+        """(N*, X(N*)) ; (None, None) sans maximum (κ nul ou σ >= 1)."""
+        if self.kappa <= 0 or self.sigma >= 1:
+            return None, None
+        users = math.sqrt((1 - self.sigma) / self.kappa)
+        return users, self.throughput(users)
+
+    def to_dict(self, forecast_users: Iterable[int] = ()) -> dict:
+        peak_users, peak_rps = self.peak()
+        return {
+            "model": "usl",
+            "lambda": round(self.lam, 4),
+            "sigma": round(self.sigma, 6),
+            "kappa": round(self.kappa, 8),
+            "r2": round(self.r2, 4) if self.r2 is not None else None,
+            "points": self.points,
+            "peak_users": round(peak_users, 1) if peak_users is not None else None,
+            "peak_rps": round(peak_rps, 2) if peak_rps is not None else None,
+            # Sans κ, le débit tend vers λ/σ sans jamais redescendre
+            "asymptotic_rps": round(self.lam / self.sigma, 2) if self.kappa <= 0 and self.sigma > 0 else None,
+            "forecast": {str(n): round(self.throughput(n), 2) for n in forecast_users},
+        }
+
+
+def _r2(model: UslModel, points: List[Tuple[float, float]]) -> float:
+    mean = sum(x for _, x in points) / len(points)
+    total = sum((x - mean) ** 2 for _, x in points)
+    residual = sum((x - model.throughput(n)) ** 2 for n, x in points)
+    return 1 - residual / total if total > 0 else 0.0
+
+
+def fit_usl(points: Iterable[Tuple[float, float]]) -> Optional[UslModel]:
+    """
+    points : (utilisateurs, débit). Les points de même charge sont moyennés.
+    None s'il y a moins de MIN_POINTS charges distinctes ou aucun ajustement
+    physiquement valide (λ > 0, σ >= 0, κ >= 0).
+    """
+    by_users = {}
+    for users, rps in points:
+        if users > 0 and rps > 0:
+            by_users.setdefault(float(users), []).append(float(rps))
+    data = sorted((n, sum(values) / len(values)) for n, values in by_users.items())
+    if len(data) < MIN_POINTS:
+        return None
+
+    targets = [n / x for n, x in data]
+    # Modèle complet, puis modèles contraints (κ = 0 ; σ = 0) si un
+    # coefficient sort négatif : on garde le meilleur ajustement valide
+    candidates = []
+    for columns in ((0, 1, 2), (0, 1), (0, 2)):
+        features = [[(1.0, n - 1, n * (n - 1))[c] for c in columns] for n, _ in data]
+        solution = _least_squares(features, targets)
+        if solution is None:
+            continue
+        coefs = dict(zip(columns, solution))
+        a, b, c = coefs.get(0, 0.0), coefs.get(1, 0.0), coefs.get(2, 0.0)
+        if a <= 0 or b < 0 or c < 0:
+            continue
+        model = UslModel(1 / a, b / a, c / a)
+        max_users = data[-1][0]
+        if model.sigma * max_users < NEGLIGIBLE_EFFECT:
+            model.sigma = 0.0
+        if model.kappa * max_users ** 2 < NEGLIGIBLE_EFFECT:
+            model.kappa = 0.0
+        model.r2 = _r2(model, data)
+        model.points = len(data)
+        candidates.append(model)
+    if not candidates:
+        return None
+    return max(candidates, key=lambda model: model.r2)
+
+
+def fit_stages(stages: List[dict], forecast_users: Optional[Iterable[int]] = None) -> Optional[dict]:
+    """
+    Ajustement sur les stats par palier (services/stage_stats) ; None si
+    impossible. Sans forecast_users, prévision à FORECAST_FACTORS x la
+    charge max testée.
+    """
+    stages = stages or []
+    model = fit_usl((stage["users"], stage["rps"]) for stage in stages)
+    if model is None:
+        return None
+    if forecast_users is None:
+        tested = max(stage["users"] for stage in stages)
+        forecast_users = [tested * factor for factor in FORECAST_FACTORS]
+    return model.to_dict(forecast_users)
@@ -1,63 +1,199 @@
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
 from core.database import get_db
 from bson import ObjectId
+from bson.errors import InvalidId
 
-async def get_user_global_stats(user_id: str):
+# Champs jamais renvoyés par la liste des scans : exclus côté serveur
+# (results = bloc compressé de services/result_store)
+SCAN_LIST_PROJECTION = {"global_stats": 0, "results": 0}
+
+def encode_cursor(scan: dict) -> str:
+    """Curseur opaque : (created_at, _id) du dernier scan d'une page."""
+    raw = f"{scan['created_at'].isoformat()}|{scan['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Lève ValueError si le curseur est mal formé."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, scan_id = raw.split("|")
+        return datetime.fromisoformat(created_at), ObjectId(scan_id)
+    except (ValueError, InvalidId, UnicodeDecodeError) as e:
+        raise ValueError(f"Curseur invalide : {cursor}") from e
+
+async def list_user_scans(user_id: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    Une page des scans de l'utilisateur, du plus récent au plus ancien, et le
+    curseur de la page suivante (None sur la dernière). Pagination par curseur
+    sur (created_at, _id) : chaque page coûte O(limit) via l'index
+    user_created, quelle que soit sa profondeur.
+    """
     db = get_db()
-    
-    # Provide sensible defaults if no scans exist
-    default_stats = {
-        "total_scans": 0,
-        "unique_domains": 0,
-        "total_requests": 0,
-        "avg_error_rate": 0.0,
-        "avg_rps": 0.0,
-        "avg_p95_latency": 0.0
+    query = {"user_id": user_id}
+    if cursor:
+        created_at, scan_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": scan_id}},
+        ]
+    found = db.scans.find(query, SCAN_LIST_PROJECTION).sort([("created_at", -1), ("_id", -1)]).limit(limit + 1)
+    scans = await found.to_list(length=limit + 1)
+
+    next_cursor = encode_cursor(scans[limit - 1]) if len(scans) > limit else None
+    scans = scans[:limit]
+    for scan in scans:
+        scan["id"] = str(scan["_id"])
+        del scan["_id"]
+    return scans, next_cursor
+
+# Résumé matérialisé du tableau de bord, un document par utilisateur (_id = user_id).
+# Il garde des sommes et compteurs courants plus un compteur de scans par domaine,
+# mis à jour par $inc à chaque scan enregistré ou supprimé : /api/scans/summary
+# est une lecture ponctuelle.
+SUMMARY_COLLECTION = "user_summaries"
+
+# Marqueur des scans comptés par $inc à leur enregistrement ; les scans sans
+# marqueur (antérieurs aux résumés) sont ajoutés une fois, à la création du résumé
+SUMMARY_MARKER = "in_summary"
+
+# Champs du scan nécessaires à la mise à jour du résumé (projection des suppressions)
+SUMMARY_SCAN_FIELDS = {"user_id": 1, "domain": 1, "total_requests": 1,
+                       "error_rate": 1, "avg_rps": 1, "p95_latency": 1, SUMMARY_MARKER: 1}
+
+DEFAULT_SUMMARY = {
+    "total_scans": 0,
+    "unique_domains": 0,
+    "total_requests": 0,
+    "avg_error_rate": 0.0,
+    "avg_rps": 0.0,
+    "avg_p95_latency": 0.0
+}
+
+def domain_key(domain: str) -> str:
+    """Les domaines contiennent des points, que Mongo lit comme des chemins dans les noms de champs."""
+    return (domain or "").replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+def _summary_increments(scan: dict, sign: int = 1) -> dict:
+    return {
+        "total_scans": sign,
+        "total_requests": sign * (scan.get("total_requests") or 0),
+        "error_rate_sum": sign * (scan.get("error_rate") or 0),
+        "rps_sum": sign * (scan.get("avg_rps") or 0),
+        "p95_sum": sign * (scan.get("p95_latency") or 0),
+        f"domains.{domain_key(scan.get('domain'))}": sign,
     }
-    
+
+def _total_increments(scans) -> dict:
+    totals = {}
+    for scan in scans:
+        for field, value in _summary_increments(scan).items():
+            totals[field] = totals.get(field, 0) + value
+    return totals
+
+def summary_from_scans(user_id: str, scans) -> dict:
+    """Document de résumé reconstruit entièrement à partir des scans d'un utilisateur."""
+    doc = {"_id": user_id, "total_scans": 0, "total_requests": 0, "error_rate_sum": 0,
+           "rps_sum": 0, "p95_sum": 0, "domains": {}}
+    for field, value in _total_increments(scans).items():
+        if field.startswith("domains."):
+            doc["domains"][field[len("domains."):]] = value
+        else:
+            doc[field] = value
+    return doc
+
+def format_summary(doc: Optional[dict]) -> dict:
+    """Document de résumé -> réponse de /api/scans/summary."""
+    if not doc or doc.get("total_scans", 0) <= 0:
+        return dict(DEFAULT_SUMMARY)
+    count = doc["total_scans"]
+    return {
+        "total_scans": count,
+        "unique_domains": sum(1 for n in (doc.get("domains") or {}).values() if n > 0),
+        "total_requests": doc.get("total_requests", 0),
+        "avg_error_rate": round(doc.get("error_rate_sum", 0) / count, 2),
+        "avg_rps": round(doc.get("rps_sum", 0) / count, 1),
+        "avg_p95_latency": round(doc.get("p95_sum", 0) / count, 1)
+    }
+
+async def rebuild_user_summary(db, user_id: str) -> dict:
+    """
+    Recalcule le résumé d'un utilisateur depuis la collection scans
+    (réparation hors ligne, cf. scripts/rebuild_summaries.py).
+    """
+    scans = await db.scans.find({"user_id": user_id}, SUMMARY_SCAN_FIELDS).to_list(length=None)
+    doc = summary_from_scans(user_id, scans)
+    doc["updated_at"] = datetime.utcnow()
+    await db[SUMMARY_COLLECTION].replace_one({"_id": user_id}, doc, upsert=True)
+    return doc
+
+async def _add_unmarked_scans(db, user_id: str, scan: Optional[dict] = None, sign: int = 1):
+    """
+    Ajoute par $inc, au résumé qui vient d'être créé, les scans antérieurs aux
+    résumés. `scan` : scan que l'appelant vient d'ajouter (sign=1) ou de
+    retirer (sign=-1) de ce résumé.
+    """
+    query = {"user_id": user_id, SUMMARY_MARKER: {"$exists": False}}
+    extra = []
+    if scan is not None:
+        # Déjà compté par le $inc de l'appelant
+        query["_id"] = {"$ne": scan.get("_id")}
+        if sign < 0 and not scan.get(SUMMARY_MARKER):
+            # Scan ancien supprimé avant la création du résumé : il n'y a jamais
+            # été compté, son retrait est compensé
+            extra.append(scan)
+    scans = await db.scans.find(query, SUMMARY_SCAN_FIELDS).to_list(length=None)
+    increments = _total_increments(scans + extra)
+    if increments:
+        await db[SUMMARY_COLLECTION].update_one({"_id": user_id}, {"$inc": increments})
+
+async def update_user_summary(db, scan: dict, sign: int = 1):
+    """
+    Ajoute (sign=1) ou retire (sign=-1) un scan du résumé de son propriétaire
+    par un $inc atomique, en upsert. Seul l'appel qui a créé le résumé y
+    ajoute ensuite les scans antérieurs aux résumés : deux scans enregistrés
+    en même temps ne sont jamais comptés deux fois.
+    """
+    user_id = scan["user_id"]
+    summaries = db[SUMMARY_COLLECTION]
+    result = await summaries.update_one(
+        {"_id": user_id},
+        {"$inc": _summary_increments(scan, sign), "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    if result.upserted_id is not None:
+        await _add_unmarked_scans(db, user_id, scan, sign)
+    if sign < 0:
+        # Dernier scan d'un domaine supprimé : on retire son compteur pour borner la map
+        key = f"domains.{domain_key(scan.get('domain'))}"
+        await summaries.update_one({"_id": user_id, key: {"$lte": 0}}, {"$unset": {key: ""}})
+
+async def get_user_global_stats(user_id: str):
+    db = get_db()
     if db is None:
-        return default_stats
-        
-    pipeline = [
-        {"$match": {"user_id": user_id}},
-        {
-            "$group": {
-                "_id": None,
-                "total_scans": {"$sum": 1},
-                "unique_domains_set": {"$addToSet": "$domain"},
-                "total_requests": {"$sum": "$total_requests"},
-                "avg_error_rate": {"$avg": "$error_rate"},
-                "avg_rps": {"$avg": "$avg_rps"},
-                "avg_p95_latency": {"$avg": "$p95_latency"}
-            }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "total_scans": 1,
-                "unique_domains": {"$size": "$unique_domains_set"},
-                "total_requests": 1,
-                "avg_error_rate": {"$round": ["$avg_error_rate", 2]},
-                "avg_rps": {"$round": ["$avg_rps", 1]},
-                "avg_p95_latency": {"$round": ["$avg_p95_latency", 1]}
-            }
-        }
-    ]
-    
-    cursor = db.scans.aggregate(pipeline)
-    result = await cursor.to_list(length=1)
-    
-    if result and len(result) > 0:
-        return result[0]
-        
-    return default_stats
+        return dict(DEFAULT_SUMMARY)
+
+    summaries = db[SUMMARY_COLLECTION]
+    doc = await summaries.find_one({"_id": user_id})
+    if doc is None:
+        # Premier accès : création atomique, puis ajout des scans existants par le seul créateur
+        result = await summaries.update_one(
+            {"_id": user_id}, {"$setOnInsert": {"updated_at": datetime.utcnow()}}, upsert=True
+        )
+        if result.upserted_id is not None:
+            await _add_unmarked_scans(db, user_id)
+        doc = await summaries.find_one({"_id": user_id})
+    return format_summary(doc)
 
-async def get_scan_details(scan_id: str, user_id: str):
+async def get_scan_details(scan_id: str, user_id: str, projection: Optional[dict] = None):
     db = get_db()
     if db is None:
         return None
         
     try:
-        scan = await db.scans.find_one({"_id": ObjectId(scan_id), "user_id": user_id})
+        scan = await db.scans.find_one({"_id": ObjectId(scan_id), "user_id": user_id}, projection)
         if scan:
             scan["id"] = str(scan["_id"])
             del scan["_id"]
@@ -0,0 +1,169 @@
+"""
+Découverte d'URLs via robots.txt et sitemap.xml.
+
+- robots.txt : règles Disallow/Allow (urllib.robotparser) et directives Sitemap ;
+- sitemaps   : index de sitemaps et sitemaps gzippés, analysés en flux
+               (XMLPullParser alimenté par morceaux, éléments libérés au fur
+               et à mesure) ; la lecture s'arrête dès que max_urls est atteint.
+"""
+
+import logging
+import zlib
+from typing import Iterable, Iterator, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+from services.link_extractor import CHUNK_SIZE, is_ignored_path
+
+# Jeton comparé aux lignes "User-agent:" de robots.txt
+ROBOTS_AGENT = "LoadTester"
+
+ROBOTS_MAX_BYTES = 512 * 1024
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024  # limite du protocole (non compressé)
+MAX_SITEMAPS = 20
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def fetch_robots(session, base_url: str, timeout: float) -> Tuple[Optional[RobotFileParser], list]:
+    """
+    Retourne (règles, sitemaps déclarés). Les règles valent None quand le site
+    ne publie pas de robots.txt exploitable : tout est alors autorisé.
+    """
+    robots_url = urljoin(base_url + "/", "/robots.txt")
+    try:
+        with session.get(robots_url, timeout=timeout, stream=True) as response:
+            if response.status_code != 200:
+                return None, []
+            body = b""
+            for chunk in response.iter_content(CHUNK_SIZE):
+                body += chunk
+                if len(body) >= ROBOTS_MAX_BYTES:
+                    break
+    except Exception as e:
+        logging.warning(f"  robots.txt illisible ({robots_url}) : {e}")
+        return None, []
+
+    rules = RobotFileParser(robots_url)
+    rules.parse(body[:ROBOTS_MAX_BYTES].decode("utf-8", errors="replace").splitlines())
+    return rules, list(rules.site_maps() or [])
+
+
+def is_allowed(rules: Optional[RobotFileParser], url: str) -> bool:
+    return rules is None or rules.can_fetch(ROBOTS_AGENT, url)
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _sitemap_bytes(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Octets XML d'un sitemap, décompressés à la volée s'il est gzippé. Chaque
+    morceau décompressé fait au plus CHUNK_SIZE octets : un petit fichier
+    très compressé (bombe de décompression) ne peut pas gonfler en mémoire
+    avant le contrôle de SITEMAP_MAX_BYTES.
+    """
+    decompressor = None
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if first:
+            first = False
+            if chunk.startswith(GZIP_MAGIC):
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if decompressor is None:
+            yield chunk
+            continue
+        while chunk:
+            data = decompressor.decompress(chunk, CHUNK_SIZE)
+            if data:
+                yield data
+            elif decompressor.unconsumed_tail == chunk:
+                break
+            chunk = decompressor.unconsumed_tail
+
+
+def iter_sitemap_entries(chunks: Iterable[bytes]) -> Iterator[Tuple[str, str]]:
+    """
+    Émet des couples (type, loc) au fil de la lecture d'un sitemap :
+    type vaut "sitemap" dans un index de sitemaps, "url" sinon.
+    Les morceaux gzippés (.xml.gz) sont décompressés à la volée.
+    """
+    parser = XMLPullParser(events=("start", "end"))
+    total = 0
+    root = None
+    stack = []
+
+    for data in _sitemap_bytes(chunks):
+        total += len(data)
+        if total > SITEMAP_MAX_BYTES:
+            break
+
+        parser.feed(data)
+        for event, elem in parser.read_events():
+            name = _local_name(elem.tag)
+            if event == "start":
+                if root is None:
+                    root = elem
+                stack.append(name)
+                continue
+
+            stack.pop()
+            if name == "loc" and stack and elem.text:
+                parent = stack[-1]
+                if parent in ("url", "sitemap"):
+                    yield parent, elem.text.strip()
+            elif name in ("url", "sitemap") and root is not None:
+                # Les entrées traitées sont détachées : mémoire bornée
+                root.clear()
+
+
+def discover_sitemap_urls(session, base_url: str, domain: str, rules, sitemaps: list,
+                          max_urls: int, timeout: float) -> Tuple[list, int]:
+    """
+    Parcourt les sitemaps (index compris) et retourne (chemins, nb_sitemaps_lus).
+    Sans directive Sitemap dans robots.txt, /sitemap.xml est essayé.
+    """
+    queue = list(sitemaps) or [urljoin(base_url + "/", "/sitemap.xml")]
+    seen_sitemaps = set()
+    paths = []
+    seen_paths = set()
+    read = 0
+
+    while queue and len(paths) < max_urls and read < MAX_SITEMAPS:
+        sitemap_url = queue.pop(0)
+        if sitemap_url in seen_sitemaps:
+            continue
+        seen_sitemaps.add(sitemap_url)
+
+        try:
+            with session.get(sitemap_url, timeout=timeout, stream=True) as response:
+                if response.status_code != 200:
+                    continue
+                read += 1
+                for kind, loc in iter_sitemap_entries(response.iter_content(CHUNK_SIZE)):
+                    if kind == "sitemap":
+                        if loc not in seen_sitemaps:
+                            queue.append(loc)
+                        continue
+
+                    parsed = urlparse(loc)
+                    if parsed.netloc != domain or is_ignored_path(parsed.path):
+                        continue
+                    if not is_allowed(rules, loc):
+                        continue
+                    path = parsed.path or "/"
+                    if path not in seen_paths:
+                        seen_paths.add(path)
+                        paths.append(path)
+                        if len(paths) >= max_urls:
+                            break
+        except ParseError as e:
+            logging.warning(f"  Sitemap invalide ({sitemap_url}) : {e}")
+        except Exception as e:
+            logging.warning(f"  Sitemap illisible ({sitemap_url}) : {e}")
+
+    return paths, read
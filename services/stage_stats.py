@@ -0,0 +1,117 @@
+"""
+Statistiques par palier et détection du point de saturation.
+
+main.py enregistre l'heure de début de chaque palier de la forme de charge
+(<csv_prefix>_stages.json) ; l'historique seconde par seconde de Locust est
+découpé selon ces bornes pour obtenir, palier par palier, le débit, le taux
+d'erreur et les latences. Les percentiles viennent des histogrammes HDR du
+palier (services/histogram) quand ils existent, sinon de la moyenne des
+fenêtres glissantes de l'historique.
+
+Le point de saturation (« genou ») est le premier palier où la charge
+augmente sans que le débit suive, pendant que la latence grimpe.
+"""
+
+from bisect import bisect_left
+from typing import List, Optional
+
+# Bornes des paliers écrites à côté des CSV Locust : <csv_prefix>_stages.json
+RESULT_SUFFIX = "_stages.json"
+
+# Part minimale de la charge ajoutée qui doit se retrouver en débit
+MIN_SCALING_EFFICIENCY = 0.5
+# Hausse du p95 (ratio) au-delà de laquelle la latence est considérée en hausse
+MIN_LATENCY_GROWTH = 1.5
+
+
+def _mean(values: list) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def compute_stage_stats(history: List[dict], boundaries: List[dict], histograms=None) -> List[dict]:
+    """
+    history : points triés par timestamp (HistoryColumns de parse_csv_stats
+              ou liste de dicts) ;
+    boundaries : [{"index", "users", "label", "start", "end"}] (timestamps) ;
+    histograms : LatencyHistograms du run, facultatif.
+    Les paliers sans aucun point d'historique sont omis.
+    """
+    columns = getattr(history, "columns", None)
+    timestamps = columns["timestamp"] if columns is not None else [point["timestamp"] for point in history]
+    hdr_stages = set(histograms.stages()) if histograms is not None else set()
+    stages = []
+    for bound in boundaries:
+        first = bisect_left(timestamps, bound["start"])
+        last = bisect_left(timestamps, bound["end"])
+        points = history[first:last]
+        if not points:
+            continue
+        base = history[first - 1] if first > 0 else None
+
+        end = points[-1]
+        requests = end.get("requests", 0) - (base.get("requests", 0) if base else 0)
+        failures = end.get("failures", 0) - (base.get("failures", 0) if base else 0)
+        duration = end["timestamp"] - (base["timestamp"] if base else points[0]["timestamp"] - 1)
+        if requests > 0 and duration > 0:
+            rps = requests / duration
+        else:
+            # Historique sans colonnes cumulées : moyenne des débits instantanés
+            rps = _mean([point["rps"] for point in points])
+
+        stage = {
+            "index": bound["index"],
+            "label": bound.get("label"),
+            "users": bound["users"],
+            "start": bound["start"],
+            "end": bound["end"],
+            "points": len(points),
+            "requests": requests,
+            "failures": failures,
+            "rps": round(rps, 2),
+            "failure_rate": round(failures / requests * 100, 2) if requests > 0 else 0.0,
+        }
+        if bound["index"] in hdr_stages:
+            merged = histograms.select([bound["index"]])
+            stage.update({
+                "median": round(merged.percentile(50), 2),
+                "p95": round(merged.percentile(95), 2),
+                "p99": round(merged.percentile(99), 2),
+                "latency_source": "histogram",
+            })
+        else:
+            stage.update({
+                "median": round(_mean([point["median"] for point in points]), 2),
+                "p95": round(_mean([point["p95"] for point in points]), 2),
+                "p99": round(_mean([point["p99"] for point in points]), 2),
+                "latency_source": "history",
+            })
+        stages.append(stage)
+    return stages
+
+
+def detect_saturation(stages: List[dict], min_efficiency: float = MIN_SCALING_EFFICIENCY,
+                      min_latency_growth: float = MIN_LATENCY_GROWTH) -> Optional[dict]:
+    """
+    Premier palier dont la charge augmente alors que le débit ne suit pas
+    (efficacité = hausse relative du débit / hausse relative des utilisateurs
+    < min_efficiency) et que le p95 est multiplié par au moins
+    min_latency_growth. None si le débit suit la charge sur tout le test.
+    """
+    for previous, current in zip(stages, stages[1:]):
+        if current["users"] <= previous["users"] or previous["rps"] <= 0:
+            continue
+        load_growth = current["users"] / previous["users"] - 1
+        efficiency = (current["rps"] / previous["rps"] - 1) / load_growth
+        latency_growth = current["p95"] / previous["p95"] if previous["p95"] > 0 else float("inf")
+        if efficiency < min_efficiency and latency_growth >= min_latency_growth:
+            return {
+                "stage": current["index"],
+                "label": current["label"],
+                "users": current["users"],
+                "last_scaling_users": previous["users"],
+                "efficiency": round(efficiency, 3),
+                "latency_growth": round(latency_growth, 2) if previous["p95"] > 0 else None,
+                "rps": current["rps"],
+                "p95": current["p95"],
+            }
+    return None
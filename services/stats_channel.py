@@ -0,0 +1,157 @@
+"""
+Canal d'événements structurés entre le subprocess Locust (main.py) et
+services/locust_runner.
+
+Le runner ouvre un socket TCP local (EventListener) et passe son port à
+main.py via --events-port ; main.py s'y connecte (EventPublisher) et publie
+des événements (progression du crawl, changements de palier, stats agrégées
+chaque seconde...). Chaque événement est une trame : longueur sur 4 octets
+(big-endian) puis un dictionnaire msgpack contenant au moins "type".
+
+Le canal remplace la détection d'états par recherche de sous-chaînes dans
+le stdout : reformuler un print ne peut plus faire manquer une transition.
+Le stdout ne sert plus que de repli minimal quand le canal n'est pas
+connecté ou a été fermé : le passage en "running" est alors déduit de la
+ligne de fin de crawl de main.py ou de la fin de montée en charge de Locust
+(services/locust_runner._stdout_transition), sans URLs ni stats live.
+"""
+
+import socket
+import struct
+import threading
+import time
+
+import msgpack
+
+HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 1024 * 1024
+
+
+def encode_frame(event: dict) -> bytes:
+    payload = msgpack.packb(event, use_bin_type=True)
+    if len(payload) > MAX_FRAME_BYTES:
+        raise ValueError(f"Trame trop grande : {len(payload)} octets")
+    return HEADER.pack(len(payload)) + payload
+
+
+class FrameDecoder:
+    """Reconstitue les événements à partir d'octets reçus par morceaux."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list:
+        self._buffer += data
+        events = []
+        while len(self._buffer) >= HEADER.size:
+            (size,) = HEADER.unpack_from(self._buffer)
+            if size > MAX_FRAME_BYTES:
+                raise ValueError(f"Trame trop grande : {size} octets")
+            end = HEADER.size + size
+            if len(self._buffer) < end:
+                break
+            events.append(msgpack.unpackb(bytes(self._buffer[HEADER.size:end]), raw=False))
+            del self._buffer[:end]
+        return events
+
+
+class EventPublisher:
+    """
+    Côté main.py. Les erreurs d'envoi désactivent le canal sans interrompre
+    le test de charge (le runner retombe alors sur le repli stdout décrit
+    plus haut).
+    """
+
+    def __init__(self, sock):
+        self._sock = sock
+        self._lock = threading.Lock()
+
+    @classmethod
+    def connect(cls, port: int, host: str = "127.0.0.1", timeout: float = 5.0) -> "EventPublisher":
+        sock = socket.create_connection((host, port), timeout=timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return cls(sock)
+
+    @property
+    def closed(self) -> bool:
+        return self._sock is None
+
+    def publish(self, event_type: str, **data) -> bool:
+        if self._sock is None:
+            return False
+        frame = encode_frame({"type": event_type, "ts": time.time(), **data})
+        with self._lock:
+            try:
+                self._sock.sendall(frame)
+                return True
+            except OSError:
+                self._close_locked()
+                return False
+
+    def close(self):
+        with self._lock:
+            self._close_locked()
+
+    def _close_locked(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+
+async def read_events(reader):
+    """Événements lus depuis un asyncio.StreamReader (runner asyncio)."""
+    decoder = FrameDecoder()
+    while True:
+        data = await reader.read(65536)
+        if not data:
+            return
+        for event in decoder.feed(data):
+            yield event
+
+
+class EventListener:
+    """Côté runner : accepte la connexion de main.py et itère sur ses événements."""
+
+    def __init__(self, host: str = "127.0.0.1"):
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind((host, 0))
+        self._server.listen(1)
+        self._server.settimeout(1.0)
+        self.port = self._server.getsockname()[1]
+
+    def events(self, alive=lambda: True, on_connect=None):
+        """
+        Attend la connexion tant que alive() est vrai (puis appelle
+        on_connect), et produit les événements jusqu'à la fermeture du socket
+        par main.py.
+        """
+        conn = None
+        while conn is None:
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                if not alive():
+                    return
+            except OSError:
+                return
+        if on_connect is not None:
+            on_connect()
+        decoder = FrameDecoder()
+        with conn:
+            while True:
+                try:
+                    data = conn.recv(65536)
+                except OSError:
+                    return
+                if not data:
+                    return
+                yield from decoder.feed(data)
+
+    def close(self):
+        try:
+            self._server.close()
+        except OSError:
+            pass
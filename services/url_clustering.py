@@ -0,0 +1,106 @@
+"""
+Canonicalisation des URLs découvertes et regroupement en gabarits de routes.
+
+Chaque URL testée crée une entrée de statistiques Locust à son nom ; sur un
+site avec /produit/123, /produit/124... la cardinalité explose. Les requêtes
+sont donc nommées par gabarit (/produit/{id}) :
+- canonicalisation : slashs doublés et finaux, casse, paramètres de suivi
+  (utm_*, gclid...) supprimés, paramètres restants triés ;
+- segments numériques, UUID, hashs et dates remplacés par un paramètre ;
+- segments "slug" (mots-séparés-par-des-tirets) regroupés quand au moins
+  slug_threshold valeurs distinctes partagent le même préfixe.
+"""
+
+import re
+from collections import defaultdict
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+TRACKING_PARAMS = frozenset({"gclid", "fbclid", "msclkid", "dclid", "yclid", "mc_cid", "mc_eid", "_ga"})
+
+_ID_RE = re.compile(r"^\d+$")
+_UUID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+_HASH_RE = re.compile(r"^(?=.*\d)[0-9a-f]{16,}$")
+_DATE_RE = re.compile(r"^\d{4}-\d{2}(-\d{2})?$")
+_SLUG_RE = re.compile(r"^[a-z0-9]+(?:[-_][a-z0-9]+)+$")
+
+DEFAULT_SLUG_THRESHOLD = 5
+
+
+def _is_tracking(key: str) -> bool:
+    key = key.lower()
+    return key.startswith("utm_") or key in TRACKING_PARAMS
+
+
+def canonicalize(url: str) -> str:
+    """Forme canonique (chemin + requête) d'une URL ou d'un chemin."""
+    parts = urlsplit(url)
+    path = re.sub(r"/{2,}", "/", parts.path or "/").lower()
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+
+    params = sorted(
+        (k.lower(), v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(k)
+    )
+    return path + ("?" + urlencode(params) if params else "")
+
+
+def segment_placeholder(segment: str):
+    """Paramètre de route pour un segment variable, ou None si le segment est fixe."""
+    if _ID_RE.match(segment):
+        return "{id}"
+    if _UUID_RE.match(segment):
+        return "{uuid}"
+    if _DATE_RE.match(segment):
+        return "{date}"
+    if _HASH_RE.match(segment):
+        return "{hash}"
+    return None
+
+
+def _split(canonical: str):
+    path, _, query = canonical.partition("?")
+    segments = [s for s in path.split("/") if s]
+    keys = sorted({k for k, _ in parse_qsl(query, keep_blank_values=True)})
+    return segments, keys
+
+
+def _join(segments, keys) -> str:
+    template = "/" + "/".join(segments)
+    if keys:
+        template += "?" + "&".join(f"{k}={{{k}}}" for k in keys)
+    return template
+
+
+def cluster_routes(urls, slug_threshold: int = DEFAULT_SLUG_THRESHOLD) -> dict:
+    """Associe chaque URL à son gabarit de route."""
+    split = {}
+    for url in urls:
+        segments, keys = _split(canonicalize(url))
+        split[url] = ([segment_placeholder(s) or s for s in segments], keys)
+
+    # Regroupement des slugs, position par position : un segment devient {slug}
+    # quand assez de valeurs distinctes partagent le même préfixe de gabarit.
+    max_len = max((len(segs) for segs, _ in split.values()), default=0)
+    for i in range(max_len):
+        siblings = defaultdict(set)
+        for segs, _ in split.values():
+            if len(segs) > i and _SLUG_RE.match(segs[i]):
+                siblings[(tuple(segs[:i]), len(segs))].add(segs[i])
+        for segs, _ in split.values():
+            if len(segs) > i and len(siblings.get((tuple(segs[:i]), len(segs)), ())) >= slug_threshold:
+                segs[i] = "{slug}"
+
+    return {url: _join(segs, keys) for url, (segs, keys) in split.items()}
+
+
+def dedupe_urls(urls) -> list:
+    """Supprime les URLs équivalentes une fois canonicalisées (la première est gardée)."""
+    seen = set()
+    unique = []
+    for url in urls:
+        key = canonicalize(url)
+        if key not in seen:
+            seen.add(key)
+            unique.append(url)
+    return unique
@@ -3,6 +3,7 @@ from fastapi.testclient import TestClient
 
 from app import app
 from core.state import state
+from core.log_ring import LogRing
 from core.security import create_access_token
 
 @pytest.fixture
@@ -20,10 +21,13 @@ def reset_state():
     """Réinitialise l'état global avant chaque test pour éviter les effets de bord."""
     state["status"] = "idle"
     state["domain"] = ""
-    state["logs"] = []
+    state["logs"] = LogRing()
     state["process"] = None
     state["stats"] = None
     state["discovered_urls"] = []
+    state["live"] = None
+    state["log_forwarder"] = None
+    state["scan_task"] = None
     
     # Nettoyage manuel du pytest mocker si besoin
     yield
@@ -44,3 +44,17 @@ def test_websocket_connection(client, test_token):
         data = websocket.receive_json()
         assert data["type"] == "status"
         assert data["data"] == state["status"]  # Devrait être 'idle' par défaut
+
+def test_websocket_resume_since(client, test_token):
+    """?since= ne rejoue que les lignes manquantes, par lots."""
+    state["logs"].extend([f"ligne {i}" for i in range(1, 1201)])
+    with client.websocket_connect(f"/ws/logs?token={test_token}&since=100") as websocket:
+        assert websocket.receive_json()["type"] == "status"
+        replayed = []
+        while len(replayed) < 1100:
+            data = websocket.receive_json()
+            assert data["type"] == "logs"
+            replayed += data["data"]
+        assert replayed[0] == "ligne 101"
+        assert replayed[-1] == "ligne 1200"
+        assert data["seq"] == 1200
@@ -0,0 +1,210 @@
+import asyncio
+from unittest.mock import patch
+
+from core.state import state
+from services import locust_runner
+from services.async_runner import run_locust_async
+from services.locust_runner import EventChannelStatus, _stdout_transition
+from services.stats_channel import encode_frame
+
+class FakeStream:
+    def __init__(self, lines, exited=None):
+        self._lines = [l.encode() for l in lines]
+        self._exited = exited
+        self.final_lines = []
+
+    async def readline(self):
+        if self._lines:
+            return self._lines.pop(0)
+        if self._exited is not None:
+            await self._exited.wait()   # processus qui tourne jusqu'à l'arrêt
+            if self.final_lines:
+                return self.final_lines.pop(0)
+        return b""
+
+class FakeProcess:
+    """Substitut d'asyncio.subprocess.Process."""
+    def __init__(self, lines, block=False, exit_code=0):
+        self.pid = 4242
+        self.returncode = None
+        self.terminated = False
+        self._exited = asyncio.Event()
+        self.stdout = FakeStream(lines, self._exited if block else None)
+        if not block:
+            self._exit(exit_code)
+
+    def _exit(self, code):
+        self.returncode = code
+        self._exited.set()
+
+    async def wait(self):
+        await self._exited.wait()
+        return self.returncode
+
+    def terminate(self):
+        self.terminated = True
+        self._exit(-15)
+
+    def kill(self):
+        self._exit(-9)
+
+STATS = {"global": {"num_requests": 10, "num_failures": 0, "failure_rate": 0, "rps": 1, "p95_response": 100}}
+
+def test_async_runner_success():
+    """Même transitions et mêmes logs clés que le runner thread."""
+    async def scenario():
+        proc = FakeProcess(["Starting Locust\n", "Hello Locust test line\n"])
+        with patch("asyncio.create_subprocess_exec", return_value=proc) as exec_mock, \
+             patch("services.async_runner._collect_stats", return_value=STATS):
+            await run_locust_async("https://test.com")
+        return exec_mock.call_args
+
+    args, kwargs = asyncio.run(scenario())
+    assert "--host=https://test.com" in args
+    assert any(a.startswith("--events-port=") for a in args)
+    assert state["status"] == "done"
+    assert state["process"] is None
+    logs = " ".join(state["logs"])
+    assert "[DÉMARRAGE]" in logs
+    assert "Hello Locust test line" in logs
+    assert "[TERMINÉ]" in logs
+
+def test_async_runner_reports_error_without_stats():
+    async def scenario():
+        proc = FakeProcess([], exit_code=1)
+        with patch("asyncio.create_subprocess_exec", return_value=proc), \
+             patch("services.async_runner._collect_stats", return_value=None):
+            await run_locust_async("https://test.com")
+
+    asyncio.run(scenario())
+    assert state["status"] == "error"
+
+def test_async_runner_cancel_stops_locust():
+    """L'annulation (/api/stop) termine le subprocess et repasse en "idle"."""
+    async def scenario():
+        proc = FakeProcess(["Starting Locust\n"], block=True)
+        with patch("asyncio.create_subprocess_exec", return_value=proc):
+            task = asyncio.create_task(run_locust_async("https://test.com"))
+            await asyncio.sleep(0.1)
+            assert state["status"] == "crawling"
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        return proc
+
+    proc = asyncio.run(scenario())
+    assert proc.terminated
+    assert state["status"] == "idle"
+    assert any("[ARRÊT]" in l for l in state["logs"])
+
+def test_async_runner_timeout_terminates():
+    async def scenario():
+        proc = FakeProcess([], block=True)
+        with patch("asyncio.create_subprocess_exec", return_value=proc), \
+             patch("services.async_runner._max_duration", return_value=0.1), \
+             patch("services.async_runner._collect_stats", return_value=STATS):
+            await run_locust_async("https://test.com")
+        return proc
+
+    proc = asyncio.run(scenario())
+    assert proc.terminated
+    assert state["status"] == "done"
+    assert any("[WATCHDOG]" in l for l in state["logs"])
+
+def _connecting_exec(proc, events, close=False):
+    """create_subprocess_exec de substitution : "main.py" se connecte au canal et publie `events`."""
+    async def exec_(*cmd, **kwargs):
+        port = int(next(arg for arg in cmd if arg.startswith("--events-port=")).split("=")[1])
+        _, writer = await asyncio.open_connection("127.0.0.1", port)
+        for event in events:
+            writer.write(encode_frame(event))
+        await writer.drain()
+        if close:
+            writer.close()
+        await asyncio.sleep(0.05)
+        return proc
+    return exec_
+
+def test_stdout_markers_ignore_pre_crawl_shape_lines():
+    """Les lignes de forme de charge précèdent le crawl : elles ne terminent pas le crawl."""
+    async def scenario():
+        previous = state["status"]
+        state["status"] = "crawling"
+        channel = EventChannelStatus()
+        try:
+            shape = _stdout_transition("Shape test updating to 10 users at 2.00 spawn rate", channel)
+            ramping = _stdout_transition("Ramping to 10 users at a rate of 2.00 per second", channel)
+            crawled = _stdout_transition("  3 URL(s) utilisees pour le test de charge.", channel)
+            for coro in crawled:
+                await coro
+            return shape, ramping, len(crawled)
+        finally:
+            state["status"] = previous
+
+    assert asyncio.run(scenario()) == ([], [], 1)
+
+def test_stdout_fallback_ignored_while_channel_is_open():
+    """Canal connecté : seul crawl_done fait passer en "running", pas le stdout."""
+    async def scenario():
+        proc = FakeProcess(["  3 URL(s) utilisees pour le test de charge.\n", "All users spawned\n"], block=True)
+        events = [{"type": "crawl_progress", "pages": 1, "urls": 1}]
+        with patch("asyncio.create_subprocess_exec", new=_connecting_exec(proc, events)):
+            task = asyncio.create_task(run_locust_async("https://test.com"))
+            await asyncio.sleep(0.2)
+            status = state["status"]
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        return status
+
+    assert asyncio.run(scenario()) == "crawling"
+
+def test_normal_end_does_not_warn_about_channel():
+    """Le socket fermé après test_stop, processus pas encore terminé : fin normale, sans avertissement."""
+    async def scenario():
+        proc = FakeProcess(["Starting Locust\n"], block=True)
+        asyncio.get_running_loop().call_later(0.2, proc._exit, 0)
+        events = [{"type": "crawl_done", "urls": ["/"]}, {"type": "test_stop", "num_requests": 1}]
+        with patch("asyncio.create_subprocess_exec", new=_connecting_exec(proc, events, close=True)), \
+             patch("services.async_runner._collect_stats", return_value=STATS), \
+             patch.object(locust_runner.logger, "warning") as warning:
+            await run_locust_async("https://test.com")
+        return warning
+
+    warning = asyncio.run(scenario())
+    assert state["status"] == "done"
+    assert not any("Canal" in str(call) for call in warning.call_args_list)
+
+def test_stdout_fallback_without_event_channel():
+    """Sans canal d'événements, la fin du crawl vue dans le stdout fait passer en "running"."""
+    async def scenario():
+        proc = FakeProcess(["Starting Locust\n", "  3 URL(s) utilisees pour le test de charge.\n"], block=True)
+        with patch("asyncio.create_subprocess_exec", return_value=proc):
+            task = asyncio.create_task(run_locust_async("https://test.com"))
+            await asyncio.sleep(0.1)
+            status = state["status"]
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        return status
+
+    assert asyncio.run(scenario()) == "running"
+
+def test_watchdog_keeps_draining_stdout():
+    """Au timeout, les lignes écrites par Locust pendant son arrêt sont encore relayées."""
+    async def scenario():
+        proc = FakeProcess([], block=True)
+        proc.stdout.final_lines = [b"Shutting down (exit code 0)\n"]
+        with patch("asyncio.create_subprocess_exec", return_value=proc), \
+             patch("services.async_runner._max_duration", return_value=0.1), \
+             patch("services.async_runner._collect_stats", return_value=STATS):
+            await run_locust_async("https://test.com")
+
+    asyncio.run(scenario())
+    assert any("Shutting down" in l for l in state["logs"])
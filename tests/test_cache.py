@@ -0,0 +1,144 @@
+import asyncio
+
+from starlette.requests import Request
+
+from core.cache import ResponseCache, etag_matches
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_hit_miss_and_stable_etag():
+    cache = ResponseCache()
+    assert cache.get(("summary", "u1")) is None
+    entry = cache.put(("summary", "u1"), {"total_scans": 2})
+    assert cache.get(("summary", "u1")) is entry
+    # Même contenu -> même ETag (fort : empreinte du corps)
+    assert cache.put(("summary", "u2"), {"total_scans": 2}).etag == entry.etag
+    assert cache.put(("summary", "u3"), {"total_scans": 3}).etag != entry.etag
+    metrics = cache.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = ResponseCache(max_entries=2)
+    cache.put(("a", "u1"), 1)
+    cache.put(("b", "u1"), 2)
+    cache.get(("a", "u1"))
+    cache.put(("c", "u1"), 3)
+    # "b" est le moins récemment utilisé
+    assert cache.get(("b", "u1")) is None
+    assert cache.get(("a", "u1")) is not None and cache.get(("c", "u1")) is not None
+
+    cache = ResponseCache(max_bytes=20)
+    cache.put(("a", "u1"), "x" * 10)
+    cache.put(("b", "u1"), "y" * 10)
+    assert len(cache) == 1 and cache.metrics()["evictions"] == 1
+    # Une réponse plus grosse que le cache entier n'est pas gardée
+    cache.put(("c", "u1"), "z" * 100)
+    assert cache.get(("c", "u1")) is None and cache.get(("b", "u1")) is not None
+
+
+def test_ttl_expiration():
+    clock = FakeClock()
+    cache = ResponseCache(ttl=10, clock=clock)
+    cache.put(("stats", None), {"rps": 1})
+    clock.now = 9.9
+    assert cache.get(("stats", None)) is not None
+    clock.now = 10
+    assert cache.get(("stats", None)) is None
+    assert cache.metrics()["expirations"] == 1 and len(cache) == 0
+
+
+def test_invalidation_by_user_and_namespace():
+    cache = ResponseCache()
+    cache.put(("scans", "u1", 100, None), [])
+    cache.put(("details", "u1", "abc"), {})
+    cache.put(("scans", "u2", 100, None), [])
+    cache.put(("stats", None), {})
+    cache.put(("stats", None, "current"), {})
+
+    assert cache.invalidate(user_id="u1") == 2
+    assert cache.get(("scans", "u2", 100, None)) is not None
+    assert cache.invalidate(namespace="stats") == 2
+    assert len(cache) == 1 and cache.metrics()["invalidations"] == 4
+
+
+def test_serve_loads_once_and_answers_304():
+    cache = ResponseCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return {"total_scans": 1, "domaine": "é"}
+
+    first = asyncio.run(cache.serve(_request(), ("summary", "u1"), loader))
+    assert first.status_code == 200 and first.body.decode() == '{"total_scans":1,"domaine":"é"}'
+    etag = first.headers["etag"]
+
+    second = asyncio.run(cache.serve(_request(f'"other", {etag}'), ("summary", "u1"), loader))
+    assert second.status_code == 304 and second.body == b"" and second.headers["etag"] == etag
+    assert calls == [1] and cache.metrics()["not_modified"] == 1
+
+
+def test_invalidation_during_load_is_not_cached():
+    """Une réponse chargée avant une invalidation et finie après n'est pas gardée."""
+    cache = ResponseCache()
+    values = iter([{"total_scans": 1}, {"total_scans": 2}])
+
+    async def loader():
+        content = next(values)
+        # Scan enregistré pendant la lecture Mongo
+        cache.invalidate(user_id="u1")
+        return content
+
+    async def fresh():
+        return {"total_scans": 2}
+
+    stale = asyncio.run(cache.serve(_request(), ("summary", "u1"), loader))
+    assert stale.body == b'{"total_scans":1}'
+    assert cache.get(("summary", "u1")) is None and cache.metrics()["stale"] == 1
+    # Les autres utilisateurs et les chargements suivants sont mis en cache normalement
+    assert asyncio.run(cache.serve(_request(), ("summary", "u1"), fresh)).body == b'{"total_scans":2}'
+    assert cache.get(("summary", "u1")) is not None
+
+    generation = cache.generation(("stats", None))
+    cache.invalidate(namespace="stats")
+    cache.put(("stats", None), {}, generation=generation)
+    assert cache.get(("stats", None)) is None
+
+
+def test_serve_with_headers():
+    cache = ResponseCache()
+
+    async def loader():
+        return [{"id": "a"}], {"X-Next-Cursor": "abc"}
+
+    first = asyncio.run(cache.serve(_request(), ("scans", "u1", 10, None), loader, with_headers=True))
+    assert first.body == b'[{"id":"a"}]' and first.headers["x-next-cursor"] == "abc"
+    assert cache.get(("scans", "u1", 10, None)).headers == {"X-Next-Cursor": "abc"}
+
+
+def test_cached_headers_are_replayed():
+    cache = ResponseCache()
+    entry = cache.put(("scans", "u1", 10, None), [{"id": "a"}], {"X-Next-Cursor": "abc"})
+    response = cache.respond(_request(), entry)
+    assert response.headers["x-next-cursor"] == "abc"
+    assert response.headers["cache-control"] == "private, no-cache"
+
+
+def test_etag_matches():
+    assert etag_matches('"a"', '"a"')
+    assert etag_matches('*', '"a"')
+    assert not etag_matches(None, '"a"')
+    assert not etag_matches('W/"a"', '"a"')
@@ -0,0 +1,57 @@
+from services.capacity import CapacitySearch, percentile_from_counts, stage_metrics
+
+def _run(search, capacity):
+    """Simule un site qui tient jusqu'à `capacity` utilisateurs."""
+    users = search.current
+    while users is not None:
+        ok = users <= capacity
+        metrics = {"requests": 100, "failures": 0 if ok else 10,
+                   "error_rate": 0.0 if ok else 10.0, "p95": 200.0}
+        users = search.observe(users, metrics)
+    return search.result()
+
+def test_percentile_from_counts():
+    counts = {10: 90, 200: 5, 900: 5}
+    assert percentile_from_counts(counts, 0.5) == 10
+    assert percentile_from_counts(counts, 0.95) == 200
+    assert percentile_from_counts(counts, 0.99) == 900
+    assert percentile_from_counts({}, 0.95) == 0.0
+
+def test_stage_metrics_only_counts_new_requests():
+    """Seules les requêtes du palier (différence des instantanés) sont mesurées."""
+    before = (100, 0, {10: 100})
+    after = (200, 10, {10: 150, 3000: 50})
+    metrics = stage_metrics(before, after)
+    assert metrics["requests"] == 100
+    assert metrics["error_rate"] == 10.0
+    assert metrics["p95"] == 3000
+
+def test_exponential_then_binary_search():
+    """Montée x2 jusqu'au premier échec, puis dichotomie à `precision` près."""
+    search = CapacitySearch(start_users=10, max_users=10_000, precision=5)
+    result = _run(search, capacity=137)
+    assert [s["users"] for s in result["stages"][:6]] == [10, 20, 40, 80, 160, 120]
+    assert 132 <= result["capacity_users"] <= 137
+    assert result["first_failing_users"] - result["capacity_users"] <= 5
+    assert not result["reached_max_users"]
+
+def test_stops_at_max_users():
+    result = _run(CapacitySearch(start_users=10, max_users=50), capacity=1000)
+    assert [s["users"] for s in result["stages"]] == [10, 20, 40, 50]
+    assert result["capacity_users"] == 50
+    assert result["reached_max_users"]
+
+def test_first_stage_failing_searches_below_start():
+    result = _run(CapacitySearch(start_users=40, max_users=1000, precision=1), capacity=7)
+    assert result["capacity_users"] == 7
+    assert result["first_failing_users"] == 8
+
+def test_latency_threshold_and_empty_stage_fail():
+    search = CapacitySearch(start_users=10, max_users=100, max_p95_ms=500)
+    assert not search.passes({"requests": 100, "error_rate": 0.0, "p95": 800.0})
+    assert not search.passes({"requests": 0, "error_rate": 0.0, "p95": 0.0})
+
+def test_max_stages_bounds_the_search():
+    result = _run(CapacitySearch(start_users=1, max_users=50_000, max_stages=4), capacity=10_000)
+    assert len(result["stages"]) == 4
+    assert result["capacity_users"] == 8
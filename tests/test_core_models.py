@@ -3,6 +3,7 @@ from pydantic import ValidationError
 
 from models.schemas import ScanRequest
 from core.state import state
+from core.log_ring import LogRing
 
 def test_scan_request_valid():
     """Vérifie qu'un domaine valide passe la validation."""
@@ -19,7 +20,31 @@ def test_initial_state():
     """Vérifie que le state a la configuration par défaut attendue."""
     assert state["status"] == "idle"
     assert state["domain"] == ""
-    assert isinstance(state["logs"], list)
+    assert isinstance(state["logs"], LogRing)
     assert len(state["logs"]) == 0
     assert state["process"] is None
     assert state["stats"] is None
+
+def test_scan_request_load_shape():
+    """La forme de charge est validée selon son type."""
+    req = ScanRequest(domain="isteah.org", load_shape={"type": "ramp", "users": 50, "duration": 60})
+    assert req.load_shape.type == "ramp"
+    assert ScanRequest(domain="isteah.org").load_shape is None
+
+def test_scan_request_invalid_load_shape():
+    """Type inconnu, champ requis manquant ou durée nulle sont rejetés."""
+    with pytest.raises(ValidationError):
+        ScanRequest(domain="isteah.org", load_shape={"type": "chaos"})
+    with pytest.raises(ValidationError):
+        ScanRequest(domain="isteah.org", load_shape={"type": "spike", "base_users": 5})
+    with pytest.raises(ValidationError):
+        ScanRequest(domain="isteah.org", load_shape={"type": "custom", "stages": [{"users": 5, "duration": 0}]})
+
+def test_scan_request_capacity_shape():
+    """La recherche de capacité a des valeurs par défaut et des bornes cohérentes."""
+    req = ScanRequest(domain="isteah.org", load_shape={"type": "capacity", "max_p95_ms": 500})
+    assert req.load_shape.start_users == 10
+    with pytest.raises(ValidationError):
+        ScanRequest(domain="isteah.org", load_shape={"type": "capacity", "start_users": 100, "max_users": 50})
+    with pytest.raises(ValidationError):
+        ScanRequest(domain="isteah.org", load_shape={"type": "capacity", "stage_duration": 10, "settle_duration": 10})
@@ -0,0 +1,57 @@
+import os
+import time
+
+from services.crawl_cache import CrawlCache
+
+PAGES = {
+    "https://site.test/": {"path": "/", "etag": '"abc"', "last_modified": None, "links": ["https://site.test/a"]},
+}
+
+def test_put_get_roundtrip(tmp_path):
+    """Une entrée enregistrée est relue telle quelle et considérée fraîche."""
+    cache = CrawlCache(tmp_path, ttl=60)
+    key = CrawlCache.make_key("https://site.test", max_depth=2, max_urls=30)
+    cache.put(key, ["/", "/a"], PAGES, domain="https://site.test")
+
+    entry = cache.get(key)
+    assert entry["urls"] == ["/", "/a"]
+    assert entry["pages"]["https://site.test/"]["etag"] == '"abc"'
+    assert cache.is_fresh(entry)
+
+def test_key_depends_on_params():
+    """Des paramètres de crawl différents ne partagent pas la même entrée."""
+    k1 = CrawlCache.make_key("https://site.test", max_depth=2, max_urls=30)
+    k2 = CrawlCache.make_key("https://site.test", max_depth=3, max_urls=30)
+    assert k1 != k2
+    assert k1 == CrawlCache.make_key("https://SITE.test/", max_depth=2, max_urls=30)
+
+def test_stale_entry_is_kept_for_revalidation(tmp_path):
+    """Au-delà du TTL l'entrée n'est plus fraîche mais reste disponible."""
+    cache = CrawlCache(tmp_path, ttl=0)
+    cache.put("k", ["/"], PAGES)
+    entry = cache.get("k")
+    assert entry is not None
+    assert not cache.is_fresh(entry)
+
+def test_lru_eviction(tmp_path):
+    """Au-delà de max_entries, les entrées les moins récemment lues sont supprimées."""
+    cache = CrawlCache(tmp_path, max_entries=2)
+    now = time.time()
+    for i, key in enumerate(("old", "mid")):
+        cache.put(key, ["/"], PAGES)
+        os.utime(tmp_path / f"{key}.json", (now - 100 + i, now - 100 + i))
+
+    cache.put("new", ["/"], PAGES)
+    assert cache.get("old") is None
+    assert cache.get("mid") is not None
+    assert cache.get("new") is not None
+
+def test_max_age_eviction(tmp_path):
+    """Une entrée plus vieille que max_age est supprimée à la lecture."""
+    cache = CrawlCache(tmp_path, max_age=10)
+    cache.put("k", ["/"], PAGES)
+    path = tmp_path / "k.json"
+    old = time.time() - 3600
+    os.utime(path, (old, old))
+    cache.prune()
+    assert not path.exists()
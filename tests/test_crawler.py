@@ -0,0 +1,120 @@
+"""
+Tests de main.py : crawl concurrent de BlackBoxCrawler contre un petit site
+local, et imports du locustfile.
+
+main.py doit être importé après le monkey-patch gevent de Locust (comme avec
+`locust -f`), ce qui casserait le reste de la suite : chaque test tourne dans
+un subprocess, les crawls renvoient leur résultat en JSON.
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SCRIPT = r'''
+import locust  # noqa: F401  (monkey-patch gevent avant main, comme `locust -f`)
+import json, sys, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import main
+
+PAGES = {"/": ["/a", "/b", "/c"], "/a": ["/a1", "/a2"], "/b": ["/b1"], "/c": [],
+         "/a1": ["/deep"], "/a2": [], "/b1": [], "/deep": []}
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        links = PAGES.get(self.path)
+        if links is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = "".join(f'<a href="{link}">x</a>' for link in links).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+options = json.loads(sys.argv[1])
+server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+scheme = options.pop("scheme")
+crawler = main.BlackBoxCrawler(f"{scheme}://127.0.0.1:{server.server_port}", use_sitemap=False,
+                               respect_robots=False, **options)
+urls = crawler.crawl()
+print("RESULT " + json.dumps({"urls": urls, "fetched": crawler.pages_fetched}))
+'''
+
+
+def _crawl(scheme="http", **options):
+    options = {"max_depth": 2, "max_urls": 30, "concurrency": 4, "scheme": scheme, **options}
+    proc = subprocess.run(
+        [sys.executable, "-c", SCRIPT, json.dumps(options)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr
+    result = next(line for line in proc.stdout.splitlines() if line.startswith("RESULT "))
+    return json.loads(result[len("RESULT "):]), proc.stdout
+
+
+def test_concurrent_crawl_follows_levels():
+    result, output = _crawl()
+    assert sorted(result["urls"]) == ["/", "/a", "/a1", "/a2", "/b", "/b1", "/c"]
+    assert result["fetched"] == 7
+    # Débit du crawl affiché dans le résumé
+    assert "7 page(s) en" in output and "pages/s" in output
+
+
+def test_ssl_failure_falls_back_to_http():
+    """Un site qui ne répond qu'en HTTP est crawlé via le repli ajouté pendant le niveau."""
+    result, _ = _crawl(scheme="https", max_depth=1)
+    assert sorted(result["urls"]) == ["/", "/a", "/b", "/c"]
+    assert result["fetched"] == 4
+
+
+def test_max_depth_is_respected():
+    result, _ = _crawl(max_depth=0)
+    assert result == {"urls": ["/"], "fetched": 1}
+    result, _ = _crawl(max_depth=1)
+    assert sorted(result["urls"]) == ["/", "/a", "/b", "/c"]
+
+
+def test_max_urls_is_respected():
+    result, _ = _crawl(max_urls=3)
+    assert len(result["urls"]) == 3
+    assert result["fetched"] <= 3
+
+
+def test_main_does_not_load_api_config():
+    """Les modules importés par main.py ne chargent pas core.config (absent du subprocess Locust)."""
+    code = "import locust, sys, main; print('core.config' in sys.modules)"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True,
+                          timeout=60, env={"PATH": ""})
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip().splitlines()[-1] == "False"
+
+
+def test_first_stage_opens_after_crawl():
+    """La borne du premier palier, demandee par tick() avant test_start, s'ouvre a la fin du crawl."""
+    code = (
+        "import locust, json, time, main\n"
+        "main._changer_palier(0, 5, 'P0')\n"
+        "avant = list(main.bornes_paliers)\n"
+        "time.sleep(0.05)\n"
+        "fin_crawl = time.time()\n"
+        "main._ouvrir_palier_en_attente()\n"
+        "main._changer_palier(1, 10, 'P1')\n"
+        "print(json.dumps({'avant': avant, 'fin_crawl': fin_crawl, 'bornes': main.bornes_paliers}))\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=60)
+    assert proc.returncode == 0, proc.stderr
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert result["avant"] == []
+    first, second = result["bornes"]
+    assert first["index"] == 0 and first["start"] >= result["fin_crawl"]
+    assert first["end"] == second["start"] and second["end"] is None
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from services.histogram import LatencyHistograms, LogHistogram
+
+def _exact_percentile(values, q):
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+def test_percentiles_within_relative_precision():
+    """Les percentiles extrêmes restent à ~0,05 % de la valeur exacte."""
+    rng = random.Random(42)
+    values = [rng.lognormvariate(4, 1.2) for _ in range(50_000)]
+    histogram = LogHistogram()
+    for value in values:
+        histogram.record(value)
+
+    assert histogram.total == len(values)
+    for q in (50, 95, 99, 99.9, 99.99):
+        exact = _exact_percentile(values, q)
+        assert histogram.percentile(q) == pytest.approx(exact, rel=1e-3, abs=1e-3)
+    assert histogram.percentile(100) == pytest.approx(max(values), abs=1e-3)
+
+def test_small_values_are_exact():
+    """Sous 2 ms, chaque microseconde a son propre seau."""
+    histogram = LogHistogram()
+    for value in (0.001, 0.5, 1.234):
+        histogram.record(value)
+    assert histogram.percentile(50) == 0.5
+    assert histogram.percentile(100) == 1.234
+
+def test_merge_equals_single_recording():
+    """Fusionner deux histogrammes équivaut à tout enregistrer dans un seul."""
+    rng = random.Random(7)
+    a, b, both = LogHistogram(), LogHistogram(), LogHistogram()
+    for i in range(10_000):
+        value = rng.expovariate(1 / 80)
+        (a if i % 3 else b).record(value)
+        both.record(value)
+
+    merged = LogHistogram.merged([a, b])
+    assert merged.counts == both.counts
+    assert (merged.total, merged.min, merged.max, merged.sum) == (both.total, both.min, both.max, both.sum)
+
+def test_encode_decode_round_trip():
+    """La sérialisation est compacte et sans perte."""
+    histogram = LogHistogram()
+    rng = random.Random(1)
+    for _ in range(20_000):
+        histogram.record(rng.uniform(5, 2000))
+
+    encoded = histogram.encode()
+    decoded = LogHistogram.decode(encoded)
+    assert decoded.counts == histogram.counts
+    assert (decoded.total, decoded.min, decoded.max, decoded.sum) == \
+        (histogram.total, histogram.min, histogram.max, histogram.sum)
+    assert len(encoded) < 20_000
+
+    empty = LogHistogram.decode(LogHistogram().encode())
+    assert empty.total == 0 and empty.percentile(99) == 0.0
+
+def test_latency_histograms_select_by_stage_and_endpoint():
+    """Sélection et fusion par palier et par endpoint."""
+    histograms = LatencyHistograms()
+    for _ in range(100):
+        histograms.record(0, "GET", "/a", 10)
+        histograms.record(1, "GET", "/a", 100)
+        histograms.record(1, "GET", "/b", 1000)
+
+    restored = LatencyHistograms.from_entries(histograms.to_entries())
+    assert restored.stages() == [0, 1]
+    assert restored.endpoints() == ["/a", "/b"]
+    assert restored.select().total == 300
+    assert restored.select([0]).percentile(99) == pytest.approx(10, rel=1e-3)
+    assert restored.select([1], "/a").percentile(50) == pytest.approx(100, rel=1e-3)
+    assert restored.select([0, 1], "/a").total == 200
+
+def test_worker_reports_are_assigned_to_stage():
+    """Master : les mesures d'un worker sont rangées dans le palier en cours."""
+    worker = LatencyHistograms()
+    worker.record(None, "GET", "/a", 20)
+    master = LatencyHistograms()
+    master.merge(LatencyHistograms.from_entries(worker.to_entries()), stage=3)
+    master.merge(LatencyHistograms.from_entries(worker.to_entries()), stage=3)
+    assert master.stages() == [3]
+    assert master.select([3]).total == 2
@@ -0,0 +1,47 @@
+from services.history_tailer import HistoryTailer
+
+HEADER = "Timestamp,User Count,Type,Name,Requests/s,Failures/s,50%,66%,75%,80%,90%,95%,98%,99%,99.9%,99.99%,100%\n"
+
+def _row(ts, name, users=10, rps=5.0, p95=120):
+    kind = "" if name == "Aggregated" else "GET"
+    return f"{ts},{users},{kind},{name},{rps},0.0,50,60,70,80,90,{p95},130,150,190,200,200\n"
+
+def test_tailer_returns_only_new_aggregated_rows(tmp_path):
+    """Seules les lignes Aggregated ajoutées depuis le dernier appel sont renvoyées."""
+    path = tmp_path / "rapport_stats_history.csv"
+    path.write_text(HEADER + _row(1, "/a") + _row(1, "Aggregated"), encoding="utf-8")
+    tailer = HistoryTailer(path)
+
+    points = tailer.poll()
+    assert points == [{"timestamp": 1, "users": 10, "rps": 5.0, "failures_s": 0.0,
+                       "median": 50.0, "p95": 120.0, "p99": 150.0, "requests": 0, "failures": 0}]
+    assert tailer.poll() == []
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(_row(2, "/a") + _row(2, "Aggregated", users=20, p95=300))
+    points = tailer.poll()
+    assert [(p["timestamp"], p["users"], p["p95"]) for p in points] == [(2, 20, 300.0)]
+
+def test_tailer_waits_for_complete_rows(tmp_path):
+    """Une ligne en cours d'écriture n'est parsée qu'une fois terminée."""
+    path = tmp_path / "rapport_stats_history.csv"
+    row = _row(1, "Aggregated")
+    path.write_text(HEADER + row[:15], encoding="utf-8")
+    tailer = HistoryTailer(path)
+    assert tailer.poll() == []
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(row[15:])
+    assert [p["timestamp"] for p in tailer.poll()] == [1]
+
+def test_tailer_missing_and_truncated_file(tmp_path):
+    """Fichier absent : rien ; fichier recréé plus court : relecture depuis le début."""
+    path = tmp_path / "rapport_stats_history.csv"
+    tailer = HistoryTailer(path)
+    assert tailer.poll() == []
+
+    path.write_text(HEADER + _row(1, "Aggregated") + _row(2, "Aggregated"), encoding="utf-8")
+    assert len(tailer.poll()) == 2
+
+    path.write_text(HEADER + _row(7, "Aggregated"), encoding="utf-8")
+    assert [p["timestamp"] for p in tailer.poll()] == [7]
@@ -0,0 +1,145 @@
+import asyncio
+
+from core.log_ring import LogRing
+from models.schemas import JobRequest
+from services.jobs import JobScheduler, new_scan_state
+
+class FakeRunner:
+    """Runner qui bloque jusqu'à ce que le test libère le job."""
+    def __init__(self):
+        self.started = []
+        self.release = {}
+
+    async def __call__(self, domain, user_id, options, scan_state, subscribers, csv_dir):
+        self.started.append(domain)
+        event = self.release.setdefault(domain, asyncio.Event())
+        scan_state["status"] = "running"
+        await event.wait()
+        scan_state["status"] = "done"
+
+    def finish(self, domain):
+        self.release.setdefault(domain, asyncio.Event()).set()
+
+def _request(domain, workers=1, priority=0):
+    return JobRequest(domain=domain, workers=workers, priority=priority)
+
+def _scheduler(tmp_path, monkeypatch, slots):
+    monkeypatch.setattr("services.jobs.JOBS_DIR", tmp_path)
+    runner = FakeRunner()
+    return JobScheduler(total_slots=slots, runner=runner), runner
+
+def test_new_scan_state_is_isolated():
+    """Chaque job a son propre tampon de logs."""
+    a, b = new_scan_state("a.com"), new_scan_state("b.com")
+    assert isinstance(a["logs"], LogRing)
+    assert a["logs"] is not b["logs"]
+    assert a["status"] == "idle" and a["domain"] == "a.com"
+
+def test_slots_limit_concurrency(tmp_path, monkeypatch):
+    """Un job n'est lancé que si ses slots sont libres ; les suivants attendent."""
+    async def scenario():
+        sched, runner = _scheduler(tmp_path, monkeypatch, slots=2)
+        first = sched.submit("u1", _request("a.com", workers=2), "https://a.com")
+        second = sched.submit("u1", _request("b.com"), "https://b.com")
+        await asyncio.sleep(0)
+        assert runner.started == ["https://a.com"]
+        assert second.state["status"] == "queued"
+        assert sched.queue_position(second) == 1
+        assert sched.metrics()["used_slots"] == 2
+
+        runner.finish("https://a.com")
+        await first.task
+        await asyncio.sleep(0)
+        assert first.state["status"] == "done"
+        assert runner.started == ["https://a.com", "https://b.com"]
+        assert (tmp_path / first.id).is_dir()
+
+        runner.finish("https://b.com")
+        await second.task
+        assert sched.metrics()["used_slots"] == 0
+    asyncio.run(scenario())
+
+def test_priority_order(tmp_path, monkeypatch):
+    """Les jobs en attente sont servis par priorité décroissante puis par ordre d'arrivée."""
+    async def scenario():
+        sched, runner = _scheduler(tmp_path, monkeypatch, slots=1)
+        first = sched.submit("u1", _request("a.com"), "a")
+        low = sched.submit("u1", _request("b.com"), "b", priority=0)
+        high = sched.submit("u2", _request("c.com"), "c", priority=5)
+        assert sched.queue_position(high) == 1
+        assert sched.queue_position(low) == 2
+        for job in (first, high, low):
+            await asyncio.sleep(0)
+            runner.finish(job.domain)
+            await job.task
+        assert runner.started == ["a", "c", "b"]
+    asyncio.run(scenario())
+
+def test_cancel_queued_and_running(tmp_path, monkeypatch):
+    """Annuler un job en file le retire ; annuler un job en cours arrête son runner."""
+    async def scenario():
+        sched, runner = _scheduler(tmp_path, monkeypatch, slots=1)
+        running = sched.submit("u1", _request("a.com"), "a")
+        queued = sched.submit("u1", _request("b.com"), "b")
+        await asyncio.sleep(0)
+
+        assert await sched.cancel(queued)
+        assert queued.state["status"] == "cancelled"
+        assert sched.metrics()["queued"] == 0
+
+        assert await sched.cancel(running)
+        await running.task
+        assert running.state["status"] == "cancelled"
+        assert not await sched.cancel(running)
+        assert runner.started == ["a"]
+        assert sched.metrics()["used_slots"] == 0
+    asyncio.run(scenario())
+
+def test_cancel_head_of_queue_starts_next(tmp_path, monkeypatch):
+    """Annuler le job en tête de file libère le passage au suivant s'il tient dans les slots libres."""
+    async def scenario():
+        sched, runner = _scheduler(tmp_path, monkeypatch, slots=2)
+        running = sched.submit("u1", _request("a.com"), "a")
+        head = sched.submit("u1", _request("b.com", workers=2), "b", priority=5)
+        small = sched.submit("u2", _request("c.com"), "c")
+        await asyncio.sleep(0)
+        assert runner.started == ["a"] and sched.queue_position(small) == 2
+
+        assert await sched.cancel(head)
+        await asyncio.sleep(0)
+        assert runner.started == ["a", "c"]
+        assert small.state["status"] == "running" and sched.metrics()["used_slots"] == 2
+        for job in (running, small):
+            runner.finish(job.domain)
+            await job.task
+    asyncio.run(scenario())
+
+def test_cancel_before_task_starts(tmp_path, monkeypatch):
+    """Un job annulé avant la première étape de sa tâche libère ses slots et se termine."""
+    async def scenario():
+        sched, runner = _scheduler(tmp_path, monkeypatch, slots=1)
+        job = sched.submit("u1", _request("a.com"), "a")
+        queued = sched.submit("u1", _request("b.com"), "b")
+        assert await sched.cancel(job)
+        await asyncio.gather(job.task, return_exceptions=True)
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert job.state["status"] == "cancelled" and job.finished_at is not None
+        assert runner.started == ["b"]
+        assert sched.metrics()["used_slots"] == 1
+        runner.finish("b")
+        await queued.task
+        assert sched.metrics()["used_slots"] == 0
+    asyncio.run(scenario())
+
+def test_jobs_for_filters_by_user(tmp_path, monkeypatch):
+    """Un utilisateur ne voit que ses propres jobs."""
+    async def scenario():
+        sched, runner = _scheduler(tmp_path, monkeypatch, slots=4)
+        mine = sched.submit("u1", _request("a.com"), "a")
+        sched.submit("u2", _request("b.com"), "b")
+        assert sched.jobs_for("u1") == [mine]
+        for job in list(sched._jobs.values()):
+            await sched.cancel(job)
+            await asyncio.gather(job.task, return_exceptions=True)
+    asyncio.run(scenario())
@@ -0,0 +1,58 @@
+import random
+from collections import Counter
+
+import pytest
+
+from services.journeys import AliasTable, JourneyModel, build_link_graph
+
+def test_alias_table_matches_weights():
+    """Les fréquences tirées suivent les poids."""
+    rng = random.Random(42)
+    table = AliasTable([1, 2, 7])
+    counts = Counter(table.sample(rng) for _ in range(50_000))
+    assert counts[2] / 50_000 == pytest.approx(0.7, abs=0.02)
+    assert counts[0] / 50_000 == pytest.approx(0.1, abs=0.02)
+
+def test_alias_table_rejects_empty():
+    with pytest.raises(ValueError):
+        AliasTable([])
+
+def test_build_link_graph():
+    pages = {
+        "https://s.test/": {"path": "/", "links": ["https://s.test/a", "https://s.test/b?x=1"]},
+        "https://s.test/a": {"path": "/a", "links": []},
+    }
+    assert build_link_graph(pages) == {"/": ["/a", "/b"], "/a": []}
+
+def test_journey_follows_links_and_entry_weights():
+    """Les transitions ne suivent que les liens ; les pages très liées sont des entrées probables."""
+    graph = {
+        "/": ["/produits", "/contact"],
+        "/produits": ["/produits/1", "/"],
+        "/contact": ["/"],
+        "/produits/1": ["/produits"],
+    }
+    nodes = ["/", "/produits", "/contact", "/produits/1"]
+    model = JourneyModel.from_graph(graph, nodes, exit_probability=0.0)
+    rng = random.Random(1)
+
+    for _ in range(200):
+        assert model.step("/contact", rng) == "/"
+        assert model.step("/produits", rng) in ("/produits/1", "/")
+
+    entries = Counter(model.start(rng) for _ in range(20_000))
+    # "/" et "/produits" ont 2 liens entrants, "/contact" et "/produits/1" un seul
+    assert entries["/"] > entries["/contact"]
+
+def test_dead_end_and_unknown_pages_restart_session():
+    model = JourneyModel.from_graph({"/": ["/a"]}, ["/", "/a"], exit_probability=0.0)
+    rng = random.Random(3)
+    assert model.step(None, rng) in ("/", "/a")
+    assert model.step("/a", rng) in ("/", "/a")       # impasse -> page d'entrée
+    assert model.step("/inconnue", rng) in ("/", "/a")
+    assert model.step("/", rng) == "/a"
+
+def test_graph_paths_are_matched_canonically():
+    """Un lien vers /A/ rejoint le noeud /a découvert par le crawl."""
+    model = JourneyModel.from_graph({"/": ["/A/"]}, ["/", "/a"], exit_probability=0.0)
+    assert model.step("/", random.Random(0)) == "/a"
@@ -0,0 +1,63 @@
+from services.link_extractor import extract_links, iter_links, is_ignored_path
+
+PAGE_URL = "https://site.test/blog/"
+DOMAIN = "site.test"
+
+HTML = b"""<html><body>
+<a href="/about">A propos</a>
+<a href="article-1#comments">Article</a>
+<a href="/about">Doublon</a>
+<a href="https://other.test/x">Externe</a>
+<a href="mailto:contact@site.test">Mail</a>
+<a href="#top">Ancre</a>
+<a href="/logo.PNG">Image</a>
+<a name="sans-href">Rien</a>
+<a href="/caf&eacute;">Entite</a>
+</body></html>"""
+
+def _chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def test_extract_internal_links():
+    """Seuls les liens internes HTML sont gardés, absolus, sans fragment ni doublon."""
+    links = extract_links([HTML], PAGE_URL, DOMAIN)
+    assert links == [
+        "https://site.test/about",
+        "https://site.test/blog/article-1",
+        "https://site.test/café",
+    ]
+
+def test_chunk_boundaries_do_not_matter():
+    """Découper le document au milieu des balises donne le même résultat."""
+    expected = extract_links([HTML], PAGE_URL, DOMAIN)
+    for size in (1, 7, 64):
+        assert extract_links(_chunks(HTML, size), PAGE_URL, DOMAIN) == expected
+
+def test_links_are_emitted_incrementally():
+    """Un lien est émis dès que son morceau est lu, avant la fin du document."""
+    consumed = []
+
+    def source():
+        for chunk in _chunks(HTML, 32):
+            consumed.append(chunk)
+            yield chunk
+
+    first = next(iter_links(source(), PAGE_URL, DOMAIN))
+    assert first == "https://site.test/about"
+    assert len(consumed) < len(_chunks(HTML, 32))
+
+def test_max_bytes_cap():
+    """La lecture s'arrête après max_bytes octets."""
+    body = b"<a href='/a'>a</a>" + b" " * 1000 + b"<a href='/b'>b</a>"
+    assert extract_links(_chunks(body, 100), PAGE_URL, DOMAIN, max_bytes=500) == ["https://site.test/a"]
+
+def test_multibyte_split_across_chunks():
+    """Un caractère UTF-8 coupé entre deux morceaux est décodé correctement."""
+    body = "<a href='/été'>x</a>".encode("utf-8")
+    assert extract_links(_chunks(body, 11), PAGE_URL, DOMAIN) == ["https://site.test/été"]
+
+def test_is_ignored_path():
+    assert is_ignored_path("/static/app.JS")
+    assert is_ignored_path("/doc.pdf")
+    assert not is_ignored_path("/page.html")
+    assert not is_ignored_path("/produits/")
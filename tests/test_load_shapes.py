@@ -0,0 +1,38 @@
+import pytest
+
+from models.schemas import ScanRequest
+from services.load_shapes import build_stages, dumps_stages, loads_stages, total_duration
+
+def _stages(shape: dict):
+    req = ScanRequest(domain="isteah.org", load_shape=shape)
+    return build_stages(req.load_shape.model_dump())
+
+def test_step_defaults_match_historical_paliers():
+    """La forme step par défaut reproduit les 5 paliers de 30s de main.py."""
+    stages = _stages({"type": "step"})
+    assert [s.users for s in stages] == [1, 20, 50, 100, 500]
+    assert total_duration(stages) == 150
+
+def test_ramp_is_linear():
+    """Une rampe de 0 à 100 utilisateurs sur 50s spawn à 2 utilisateurs/s."""
+    stages = _stages({"type": "ramp", "users": 100, "duration": 50, "hold_duration": 20})
+    assert stages[0].users == 100 and stages[0].spawn_rate == pytest.approx(2.0)
+    assert total_duration(stages) == 70
+
+def test_spike_and_soak():
+    spike = _stages({"type": "spike", "base_users": 10, "spike_users": 300})
+    assert [s.users for s in spike] == [10, 300, 10]
+    assert spike[1].spawn_rate == 150
+
+    soak = _stages({"type": "soak", "users": 40, "ramp_duration": 20, "duration": 3600})
+    assert [s.duration for s in soak] == [20, 3600]
+
+def test_custom_stages_roundtrip():
+    """Les paliers passent au subprocess en JSON sans perte."""
+    stages = _stages({"type": "custom", "stages": [
+        {"users": 5, "duration": 10, "label": "Fumée"},
+        {"users": 50, "duration": 20, "spawn_rate": 25},
+    ]})
+    assert stages[0].label == "Fumée"
+    assert stages[1].spawn_rate == 25
+    assert loads_stages(dumps_stages(stages)) == stages
@@ -1,9 +1,10 @@
 import asyncio
 import threading
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 
-from services.locust_runner import run_locust_thread
+from models.schemas import ScanRequest
+from services.locust_runner import _save_scan, run_locust_thread
 from core.state import state
 
 @pytest.fixture
@@ -29,7 +30,7 @@ def mock_subprocess_popen():
 def test_run_locust_thread_success(mock_subprocess_popen):
     """Vérifie que run_locust_thread met à jour l'état et lance le subprocess."""
     state["status"] = "idle"
-    state["logs"] = []
+    state["logs"].clear()
 
     with patch("services.locust_runner.parse_csv_stats", return_value={
         "global": {"num_requests": 10, "failure_rate": 0, "rps": 1, "p95_response": 100}
@@ -60,3 +61,31 @@ def test_run_locust_thread_success(mock_subprocess_popen):
         assert "[DÉMARRAGE]" in logs_str
         assert "Hello Locust test line" in logs_str
         assert "[TERMINÉ]" in logs_str
+
+def test_save_scan_compresses_off_the_loop():
+    """La compression des résultats (zlib niveau 9) tourne hors du thread de la boucle."""
+    threads = []
+
+    def fake_pack(stats):
+        threads.append(threading.current_thread())
+        return b"blob"
+
+    class FakeScans:
+        def __init__(self):
+            self.docs = []
+
+        async def insert_one(self, doc):
+            self.docs.append(doc)
+
+    db = MagicMock()
+    db.scans = FakeScans()
+    stats = {"global": {"num_requests": 10, "num_failures": 0, "failure_rate": 0.0, "rps": 1.0,
+                        "p95_response": 100.0}}
+    with patch("services.locust_runner.get_db", return_value=db), \
+         patch("services.locust_runner.pack_results", fake_pack), \
+         patch("services.locust_runner.update_user_summary", new=AsyncMock()):
+        asyncio.run(_save_scan("https://a.test", "u1", ScanRequest(domain="a.test"), 1, stats))
+
+    assert threads and threads[0] is not threading.main_thread()
+    assert db.scans.docs[0]["results"]["data"] == b"blob"
+    assert db.scans.docs[0]["avg_rps"] == 1.0
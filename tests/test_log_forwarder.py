@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.log_forwarder import LogForwarder
+
+@pytest.fixture
+def loop():
+    """Boucle asyncio dans un thread, comme celle d'uvicorn en production."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+def test_lines_are_sent_in_order_and_batched(loop):
+    batches = []
+    async def send(lines):
+        batches.append(lines)
+
+    forwarder = LogForwarder(loop, send, batch_lines=50, flush_interval=0.05)
+    forwarder.start()
+    for i in range(120):
+        assert forwarder.put(f"ligne {i}")
+    forwarder.close()
+
+    assert [l for b in batches for l in b] == [f"ligne {i}" for i in range(120)]
+    assert all(len(b) <= 50 for b in batches)
+    assert len(batches) < 120
+    assert forwarder.metrics()["forwarded"] == 120
+
+def test_put_never_blocks_and_drops_when_full(loop):
+    """Clients bloqués : les lignes au-delà de la file sont ignorées puis résumées."""
+    release = threading.Event()
+    batches = []
+    async def send(lines):
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        batches.append(lines)
+
+    forwarder = LogForwarder(loop, send, max_queue=10, batch_lines=5, flush_interval=0.01)
+    forwarder.start()
+    results = [forwarder.put(f"l{i}") for i in range(100)]
+    assert not all(results)
+    metrics = forwarder.metrics()
+    assert metrics["dropped"] > 0
+    assert metrics["queue_depth"] <= 10
+
+    release.set()
+    forwarder.close()
+    sent = [l for b in batches for l in b]
+    assert any("ligne(s) ignorée(s)" in l for l in sent)
+    assert forwarder.metrics()["forwarded"] + forwarder.metrics()["dropped"] == 100
+
+def test_flush_waits_for_pending_lines(loop):
+    sent = []
+    async def send(lines):
+        sent.extend(lines)
+
+    forwarder = LogForwarder(loop, send, flush_interval=10)
+    forwarder.start()
+    forwarder.put("[TERMINÉ]")
+    forwarder.flush()
+    assert sent == ["[TERMINÉ]"]
+    forwarder.close()
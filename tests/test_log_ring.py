@@ -0,0 +1,35 @@
+import pytest
+
+from core.log_ring import LogRing
+
+def test_sequence_numbers_and_since():
+    ring = LogRing(capacity=10)
+    assert ring.last_seq == 0
+    assert ring.extend(["a", "b", "c"]) == 3
+    assert ring.append("d") == 4
+    assert ring.since(2) == [(3, "c"), (4, "d")]
+    assert ring.since(0, limit=2) == [(1, "a"), (2, "b")]
+    assert ring.since(4) == []
+
+def test_capacity_is_bounded():
+    """Les plus anciennes lignes sont évincées ; la numérotation continue."""
+    ring = LogRing(capacity=3)
+    ring.extend(f"l{i}" for i in range(1, 11))
+    assert len(ring) == 3
+    assert list(ring) == ["l8", "l9", "l10"]
+    assert ring.first_seq == 8
+    assert ring.since(0) == [(8, "l8"), (9, "l9"), (10, "l10")]
+    assert ring.missed(5)
+    assert not ring.missed(7)
+
+def test_clear_keeps_numbering():
+    ring = LogRing()
+    ring.extend(["a", "b"])
+    ring.clear()
+    assert len(ring) == 0
+    assert ring.append("c") == 3
+    assert ring.since(2) == [(3, "c")]
+
+def test_invalid_capacity():
+    with pytest.raises(ValueError):
+        LogRing(capacity=0)
@@ -59,3 +59,35 @@ def test_parse_csv_stats_missing_files():
     with patch("services.parser.CSV_DIR", Path("/path/does/not/exist/123987")):
         result = parse_csv_stats()
         assert result is None
+
+MOCK_HISTORY = """Timestamp,User Count,Type,Name,Requests/s,Failures/s,50%,66%,75%,80%,90%,95%,98%,99%,99.9%,99.99%,100%
+1700000000,5,GET,/api/users,1.0,0.0,40,50,60,70,80,90,95,99,100,100,100
+1700000000,5,,Aggregated,2.5,0.0,45,55,65,75,85,110,130,150,190,200,200
+1700000001,10,GET,"/api/search?q=a,b",1.0,0.0,N/A,N/A,N/A,N/A,N/A,N/A,N/A,N/A,N/A,N/A,N/A
+1700000001,10,,Aggregated,4.0,0.5,N/A,55,65,75,85,120,130,160,190,200,200
+"""
+
+def test_parse_csv_stats_history(mock_csv_dir):
+    """Seules les lignes Aggregated alimentent l'historique, N/A valant 0."""
+    (mock_csv_dir / "rapport_stats_history.csv").write_text(MOCK_HISTORY, encoding="utf-8")
+    result = parse_csv_stats(mock_csv_dir)
+
+    assert len(result["history"]) == 2
+    assert result["history"][-1]["users"] == 10
+    assert result["history"].records() == [
+        {"timestamp": 1700000000, "users": 5, "rps": 2.5, "failures_s": 0.0,
+         "median": 45.0, "p95": 110.0, "p99": 150.0, "requests": 0, "failures": 0},
+        {"timestamp": 1700000001, "users": 10, "rps": 4.0, "failures_s": 0.5,
+         "median": 0.0, "p95": 120.0, "p99": 160.0, "requests": 0, "failures": 0},
+    ]
+
+def test_load_history_columns(mock_csv_dir):
+    """L'historique est chargé en colonnes typées."""
+    from services.parser import load_history
+    path = mock_csv_dir / "rapport_stats_history.csv"
+    path.write_text(MOCK_HISTORY, encoding="utf-8")
+
+    history = load_history(path)
+    assert len(history) == 2
+    assert history.columns["users"].typecode == "q"
+    assert list(history.columns["p95"]) == [110.0, 120.0]
@@ -0,0 +1,196 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from services import pdf_renderer as module
+from services.pdf_renderer import PdfRenderer, content_hash, render_pdf, scan_version
+
+STATS = {
+    "global": {"num_requests": 1500, "num_failures": 15, "failure_rate": 1.0, "rps": 25.5,
+               "median_response": 45.0, "p95_response": 110.0, "max_response": 450.0},
+    "endpoints": [{"name": "/api/test", "method": "GET", "requests": 1500, "failures": 15,
+                   "median": 45.0, "p95": 110.0, "max": 450.0, "rps": 25.5}],
+    "history": [],
+}
+
+
+class CountingRender:
+    """render_pdf lent et compté, exécuté dans un pool de threads."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, stats, domain):
+        with self._lock:
+            self.calls += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+        return f"%PDF {domain} {stats['global']['rps']}".encode()
+
+
+def _renderer(fake, **kwargs):
+    return PdfRenderer(executor=ThreadPoolExecutor(8), **kwargs), patch.object(module, "render_pdf", fake)
+
+
+def test_render_pdf_returns_a_pdf():
+    pdf = render_pdf(STATS, "example.com")
+    assert pdf.startswith(b"%PDF")
+
+
+def test_content_hash_follows_content():
+    other = {**STATS, "global": {**STATS["global"], "rps": 30.0}}
+    assert content_hash(STATS, "a.test") == content_hash(dict(STATS), "a.test")
+    assert content_hash(STATS, "a.test") != content_hash(other, "a.test")
+    assert content_hash(STATS, "a.test") != content_hash(STATS, "b.test")
+
+
+def test_repeat_download_is_served_from_cache():
+    fake = CountingRender()
+    renderer, patched = _renderer(fake)
+
+    async def scenario():
+        first = await renderer.render("scan1", STATS, "a.test")
+        second = await renderer.render("scan1", STATS, "a.test")
+        changed = await renderer.render("scan1", {**STATS, "global": {**STATS["global"], "rps": 1.0}}, "a.test")
+        return first, second, changed
+
+    with patched:
+        first, second, changed = asyncio.run(scenario())
+    assert first == second and changed != first
+    assert fake.calls == 2
+    metrics = renderer.metrics()
+    assert (metrics["cache_hits"], metrics["cache_misses"], metrics["renders"]) == (1, 2, 2)
+    assert metrics["render_seconds"]["max"] >= fake.delay
+
+
+def test_concurrent_requests_share_one_render():
+    fake = CountingRender()
+    renderer, patched = _renderer(fake)
+
+    async def scenario():
+        return await asyncio.gather(*(renderer.render("scan1", STATS, "a.test") for _ in range(5)))
+
+    with patched:
+        pdfs = asyncio.run(scenario())
+    assert len(set(pdfs)) == 1 and fake.calls == 1
+    assert renderer.metrics()["shared"] == 4
+
+
+def test_concurrent_renders_are_bounded():
+    fake = CountingRender()
+    renderer, patched = _renderer(fake, max_concurrent=2)
+
+    async def scenario():
+        return await asyncio.gather(*(renderer.render(f"scan{i}", STATS, "a.test") for i in range(6)))
+
+    with patched:
+        asyncio.run(scenario())
+    assert fake.calls == 6 and fake.max_running == 2
+    assert renderer.metrics()["in_flight"] == 0 and renderer.metrics()["waiting"] == 0
+
+
+def test_lru_keeps_the_most_recent_pdfs():
+    fake = CountingRender(delay=0)
+    renderer, patched = _renderer(fake, cache_entries=2)
+
+    async def scenario():
+        for scan in ("a", "b", "a", "c", "a", "b"):
+            await renderer.render(scan, STATS, "a.test")
+
+    with patched:
+        asyncio.run(scenario())
+    # "b" a été évincé par "c" puis rendu de nouveau
+    assert fake.calls == 4 and renderer.metrics()["cached"] == 2
+
+
+def test_lru_is_bounded_in_bytes():
+    fake = CountingRender(delay=0)
+    size = len(fake(STATS, "a.test"))
+    renderer, patched = _renderer(fake, cache_bytes=2 * size + 1)
+
+    async def scenario():
+        for scan in ("a", "b", "c"):
+            await renderer.render(scan, STATS, "a.test")
+
+    with patched:
+        asyncio.run(scenario())
+    metrics = renderer.metrics()
+    assert metrics["cached"] == 2 and metrics["cached_bytes"] == 2 * size
+
+
+def test_stored_scan_is_keyed_by_version():
+    """Un scan enregistré est retrouvé par sa version, sans empreinte du contenu."""
+    fake = CountingRender(delay=0)
+    renderer, patched = _renderer(fake)
+    scan = {"created_at": "2026-01-01T00:00:00", "results": {"codec": "columnar-v1", "size": 1234}}
+
+    async def scenario():
+        for _ in range(2):
+            await renderer.render("scan1", STATS, "a.test", scan_version(scan))
+
+    with patched, patch.object(module, "content_hash", side_effect=AssertionError):
+        asyncio.run(scenario())
+    assert fake.calls == 1 and renderer.metrics()["cache_hits"] == 1
+
+
+def test_cached_stored_scan_skips_results_loading():
+    """Un PDF déjà rendu est servi sans charger ni décoder le bloc de résultats du scan."""
+    from api import routes
+
+    fake = CountingRender(delay=0)
+    renderer, patched = _renderer(fake)
+    scan = {"id": "s1", "domain": "a.test", "created_at": "2026-01-01T00:00:00",
+            "global_stats": STATS["global"], "results": {"codec": "columnar-v1", "size": 10}}
+    projections = []
+
+    async def get_scan_details(scan_id, user_id, projection=None):
+        projections.append(projection)
+        return dict(scan)
+
+    load_results = AsyncMock(return_value={"endpoints": STATS["endpoints"], "history": []})
+
+    async def scenario():
+        return [await routes.generate_pdf(scan_id="s1", current_user=SimpleNamespace(id="u1")) for _ in range(2)]
+
+    with patched, patch.object(routes, "pdf_renderer", renderer), \
+         patch.object(routes, "get_scan_details", get_scan_details), \
+         patch.object(routes, "load_results", load_results), patch.object(routes, "get_db"):
+        responses = asyncio.run(scenario())
+    assert all(response.media_type == "application/pdf" for response in responses)
+    assert fake.calls == 1 and load_results.await_count == 1
+    # Lecture sans le bloc, puis lecture complète au seul premier rendu
+    assert projections == [{"results.data": 0}, None, {"results.data": 0}]
+
+
+def test_failed_render_is_not_cached():
+    renderer = PdfRenderer(executor=ThreadPoolExecutor(1))
+
+    def broken(stats, domain):
+        raise RuntimeError("boom")
+
+    with patch.object(module, "render_pdf", broken):
+        with pytest.raises(RuntimeError):
+            asyncio.run(renderer.render("scan1", STATS, "a.test"))
+    assert renderer.metrics()["failures"] == 1 and renderer.metrics()["cached"] == 0
+
+
+def test_process_pool_render():
+    """Rendu réel dans un processus du pool (spawn)."""
+    renderer = PdfRenderer(workers=1)
+    try:
+        pdf = asyncio.run(renderer.render("scan1", STATS, "a.test"))
+    finally:
+        renderer.close()
+    assert pdf.startswith(b"%PDF")
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import random
+from unittest.mock import patch
+
+from services.histogram import LatencyHistograms
+from services.parser import HistoryColumns
+from services.result_store import (
+    decode_column, encode_column, load_results, pack_results, store_results, unpack_results,
+)
+
+def _stats(points=3600, endpoints=50):
+    rng = random.Random(3)
+    history, total = [], 0
+    for i in range(points):
+        total += 40 + i % 7
+        history.append({"timestamp": 1_700_000_000 + i, "users": 10 + i // 60,
+                        "rps": round(rng.uniform(30, 50), 2), "failures_s": 0.0,
+                        "median": float(rng.randint(40, 60)), "p95": float(rng.randint(100, 300)),
+                        "p99": float(rng.randint(300, 900)), "requests": total, "failures": i // 100})
+    rows = [{"name": f"/api/resource/{i}/{{id}}", "method": "GET", "requests": 1000 + i, "failures": i % 3,
+             "median": 45.0, "p95": 120.5, "max": 900.25, "rps": 12.34} for i in range(endpoints)]
+    histograms = LatencyHistograms()
+    for _ in range(1000):
+        histograms.record(0, "GET", "/", rng.uniform(10, 500))
+    return {"history": history, "endpoints": rows, "histograms": histograms.to_entries()}
+
+def test_column_round_trip_with_negative_deltas():
+    values = [5, 3, 3, 1000, -20, 0]
+    assert decode_column(encode_column(values, "q"), "q") == values
+    floats = [1.5, 0.25, 12.345, 0.0]
+    assert decode_column(encode_column(floats, "d"), "d") == floats
+
+def test_pack_round_trip():
+    """Historique, endpoints et histogrammes sont restitués à l'identique."""
+    stats = _stats(points=300, endpoints=5)
+    restored = unpack_results(pack_results(stats))
+    assert restored["history"] == stats["history"]
+    assert restored["endpoints"] == stats["endpoints"]
+    assert restored["histograms"] == stats["histograms"]
+
+def test_pack_columnar_history():
+    """L'historique colonnaire de parse_csv_stats est encodé comme sa forme en dicts."""
+    stats = _stats(points=300, endpoints=5)
+    columns = HistoryColumns()
+    for key, column in columns.columns.items():
+        column.extend(point[key] for point in stats["history"])
+    assert pack_results({**stats, "history": columns}) == pack_results(stats)
+    assert unpack_results(pack_results({**stats, "history": columns}))["history"] == stats["history"]
+
+def test_packed_size_is_fraction_of_json():
+    """1 h d'historique + 50 endpoints : bien plus petit que le JSON naïf."""
+    stats = _stats()
+    naive = len(json.dumps({"history": stats["history"], "endpoints": stats["endpoints"],
+                            "histograms": stats["histograms"]}).encode())
+    packed = len(pack_results(stats))
+    assert packed * 4 < naive
+
+def test_large_results_spill_to_gridfs():
+    """Au-delà de INLINE_LIMIT, le bloc est écrit dans GridFS et relu à la demande."""
+    files = {}
+
+    class FakeBucket:
+        def __init__(self, db, bucket_name):
+            self.bucket_name = bucket_name
+
+        async def upload_from_stream(self, filename, data):
+            files["id-1"] = data
+            return "id-1"
+
+        async def open_download_stream(self, file_id):
+            data = files[file_id]
+
+            class Stream:
+                async def read(self):
+                    return data
+            return Stream()
+
+    async def scenario():
+        stats = _stats(points=200, endpoints=3)
+        with patch("services.result_store.AsyncIOMotorGridFSBucket", FakeBucket), \
+             patch("services.result_store.INLINE_LIMIT", 10):
+            field = await store_results(None, stats)
+            assert "data" not in field and field["gridfs_id"] == "id-1"
+            restored = await load_results(None, {"results": field})
+        assert restored["history"] == stats["history"]
+
+        inline = await store_results(None, stats)
+        assert "data" in inline
+        assert await load_results(None, {"global_stats": {}}) is None
+
+    asyncio.run(scenario())
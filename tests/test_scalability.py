@@ -0,0 +1,68 @@
+import io
+
+import pytest
+
+from services.reporter import build_pdf
+from services.scalability import UslModel, fit_stages, fit_usl
+
+def test_fit_recovers_usl_parameters():
+    """Sur des mesures exactes, λ, σ, κ et le pic sont retrouvés."""
+    truth = UslModel(10, 0.02, 0.0001)
+    model = fit_usl([(n, truth.throughput(n)) for n in (1, 20, 50, 100, 500)])
+
+    assert model.lam == pytest.approx(10, rel=1e-6)
+    assert model.sigma == pytest.approx(0.02, rel=1e-6)
+    assert model.kappa == pytest.approx(0.0001, rel=1e-6)
+    assert model.r2 == pytest.approx(1.0)
+    peak_users, peak_rps = model.peak()
+    assert peak_users == pytest.approx(99, abs=0.5)
+    assert model.throughput(2000) < peak_rps
+
+def test_fit_without_coherence_has_no_peak():
+    """Contention seule : pas de maximum, débit asymptotique λ/σ."""
+    result = fit_usl([(n, 10 * n / (1 + 0.05 * (n - 1))) for n in (1, 20, 50, 100)]).to_dict([2000])
+    assert result["kappa"] == 0
+    assert result["peak_users"] is None
+    assert result["asymptotic_rps"] == pytest.approx(200, rel=1e-3)
+    assert result["forecast"]["2000"] == pytest.approx(198.1, abs=0.1)
+
+def test_fit_with_noise_keeps_valid_coefficients():
+    """Mesures bruitées : coefficients positifs et R² élevé."""
+    truth = UslModel(5, 0.03, 0.00005)
+    noise = [1.03, 0.97, 1.02, 0.99, 1.01]
+    points = [(n, truth.throughput(n) * k) for n, k in zip((1, 50, 100, 200, 400), noise)]
+    model = fit_usl(points)
+    assert model.sigma >= 0 and model.kappa >= 0
+    assert model.r2 > 0.95
+
+def test_fit_needs_three_loads():
+    assert fit_usl([(1, 10), (20, 150)]) is None
+    assert fit_usl([(1, 10), (1, 11), (20, 150)]) is None
+
+def test_fit_stages_default_forecast():
+    """Sans charge demandée, prévision à 2x et 4x la charge max testée."""
+    truth = UslModel(2, 0.01, 0.00002)
+    stages = [{"users": n, "rps": truth.throughput(n)} for n in (1, 20, 50, 100, 500)]
+    result = fit_stages(stages)
+    assert set(result["forecast"]) == {"1000", "2000"}
+    assert fit_stages([]) is None
+
+def test_pdf_includes_stages_and_model():
+    """Le PDF se construit avec les paliers, la saturation et le modèle USL."""
+    truth = UslModel(2, 0.01, 0.00002)
+    stages = [
+        {"index": i, "users": n, "rps": truth.throughput(n), "failure_rate": 0.0,
+         "median": 40.0, "p95": 90.0, "p99": 120.0}
+        for i, n in enumerate((1, 20, 50, 100, 500))
+    ]
+    stats = {
+        "global": {"num_requests": 10, "num_failures": 0, "failure_rate": 0.0, "rps": 1.0,
+                   "median_response": 40.0, "p95_response": 90.0, "max_response": 200.0},
+        "endpoints": [],
+        "stages": stages,
+        "saturation": {"users": 500, "last_scaling_users": 100, "efficiency": 0.2, "p95": 900.0},
+        "scalability": fit_stages(stages),
+    }
+    buffer = io.BytesIO()
+    build_pdf(buffer, stats)
+    assert buffer.getvalue().startswith(b"%PDF-")
@@ -0,0 +1,285 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from bson import ObjectId
+
+from core.database import INDEXES
+from services.scan_service import (
+    SUMMARY_COLLECTION, SUMMARY_MARKER, decode_cursor, domain_key, encode_cursor, format_summary, get_user_global_stats,
+    list_user_scans, summary_from_scans, update_user_summary,
+)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.docs.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length):
+        await asyncio.sleep(0)   # point de bascule entre requêtes concurrentes
+        return self.docs[:length]
+
+
+class FakeScans:
+    """Collection réduite aux filtres utilisés par list_user_scans et les résumés."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.projections = []
+
+    @staticmethod
+    def _matches(doc, query):
+        for field, condition in query.items():
+            if field == "$or":
+                if not any(FakeScans._matches(doc, branch) for branch in condition):
+                    return False
+            elif isinstance(condition, dict):
+                if "$lt" in condition and not doc[field] < condition["$lt"]:
+                    return False
+                if "$ne" in condition and doc[field] == condition["$ne"]:
+                    return False
+                if "$exists" in condition and (field in doc) != condition["$exists"]:
+                    return False
+            elif doc[field] != condition:
+                return False
+        return True
+
+    def find(self, query, projection):
+        self.projections.append(projection)
+        if any(projection.values()):
+            # Projection d'inclusion : _id et les champs demandés
+            keep = lambda k: k == "_id" or projection.get(k)
+        else:
+            keep = lambda k: projection.get(k, 1)
+        docs = [
+            {k: v for k, v in doc.items() if keep(k)}
+            for doc in self.docs if self._matches(doc, query)
+        ]
+        return FakeCursor(docs)
+
+
+class FakeDb:
+    def __init__(self, docs):
+        self.scans = FakeScans(docs)
+
+
+def _scans(count, user_id="u1"):
+    start = datetime(2026, 1, 1)
+    # Deux scans par seconde : les égalités de created_at sont départagées par _id
+    return [
+        {"_id": ObjectId(), "user_id": user_id, "created_at": start + timedelta(seconds=i // 2),
+         "domain": f"site{i}.test", "global_stats": {"big": True}, "results": {"data": b"x"}}
+        for i in range(count)
+    ]
+
+
+def _all_pages(db, limit):
+    pages, cursor = [], None
+    with patch("services.scan_service.get_db", return_value=db):
+        while True:
+            scans, cursor = asyncio.run(list_user_scans("u1", limit, cursor))
+            pages.append(scans)
+            if cursor is None:
+                return pages
+
+
+def test_cursor_round_trip():
+    scan = {"_id": ObjectId(), "created_at": datetime(2026, 3, 4, 5, 6, 7, 891000)}
+    assert decode_cursor(encode_cursor(scan)) == (scan["created_at"], scan["_id"])
+
+
+@pytest.mark.parametrize("cursor", ["", "pas-un-curseur", "MjAyNi0wMS0wMXxub3Bl"])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_keyset_pages_cover_every_scan_once():
+    """Les pages successives restituent tous les scans, du plus récent au plus ancien, sans doublon."""
+    docs = _scans(25) + _scans(4, user_id="u2")
+    db = FakeDb(docs)
+    pages = _all_pages(db, limit=10)
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    ids = [scan["id"] for page in pages for scan in page]
+    expected = sorted((d for d in docs if d["user_id"] == "u1"),
+                      key=lambda d: (d["created_at"], d["_id"]), reverse=True)
+    assert ids == [str(d["_id"]) for d in expected]
+
+
+def test_list_excludes_heavy_fields_server_side():
+    db = FakeDb(_scans(3))
+    with patch("services.scan_service.get_db", return_value=db):
+        scans, cursor = asyncio.run(list_user_scans("u1", 3))
+    assert cursor is None
+    assert db.scans.projections == [{"global_stats": 0, "results": 0}]
+    assert all("global_stats" not in scan and "results" not in scan and "_id" not in scan for scan in scans)
+
+
+def test_scan_index_matches_list_sort():
+    """L'index des scans couvre le filtre user_id puis le tri (created_at, _id) décroissant."""
+    keys = INDEXES["scans"][0].document["key"]
+    assert list(keys.items()) == [("user_id", 1), ("created_at", -1), ("_id", -1)]
+
+
+# ── Résumé matérialisé ───────────────────────────────────────────────
+
+class FakeUpdateResult:
+    def __init__(self, matched_count, upserted_id=None):
+        self.matched_count = matched_count
+        self.upserted_id = upserted_id
+
+
+class FakeSummaries:
+    """update_one (upsert compris) / replace_one / find_one sur des dicts, chemins pointés compris."""
+
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+
+    @staticmethod
+    def _get(doc, path):
+        for part in path.split("."):
+            if not isinstance(doc, dict) or part not in doc:
+                return None
+            doc = doc[part]
+        return doc
+
+    async def find_one(self, query):
+        self.reads += 1
+        await asyncio.sleep(0)
+        return self.docs.get(query["_id"])
+
+    async def replace_one(self, query, doc, upsert=False):
+        await asyncio.sleep(0)
+        self.docs[query["_id"]] = doc
+
+    async def update_one(self, query, update, upsert=False):
+        await asyncio.sleep(0)
+        doc = self.docs.get(query["_id"])
+        conditions = {k: v for k, v in query.items() if k != "_id"}
+        upserted_id = None
+        if doc is None and upsert:
+            doc = self.docs[query["_id"]] = {"_id": query["_id"], **update.get("$setOnInsert", {})}
+            upserted_id = query["_id"]
+        if doc is None or any(not self._get(doc, k) <= v["$lte"] for k, v in conditions.items()):
+            return FakeUpdateResult(0)
+        for path, value in update.get("$inc", {}).items():
+            *parents, leaf = path.split(".")
+            target = doc
+            for part in parents:
+                target = target.setdefault(part, {})
+            target[leaf] = target.get(leaf, 0) + value
+        for path in update.get("$unset", {}):
+            *parents, leaf = path.split(".")
+            self._get(doc, ".".join(parents)).pop(leaf, None)
+        doc.update(update.get("$set", {}))
+        return FakeUpdateResult(1, upserted_id)
+
+
+class FakeSummaryDb(FakeDb):
+    def __init__(self, docs):
+        super().__init__(docs)
+        self.summaries = FakeSummaries()
+
+    def __getitem__(self, name):
+        assert name == SUMMARY_COLLECTION
+        return self.summaries
+
+
+def _scan(domain, requests, error_rate, rps, p95, user_id="u1", marked=True):
+    scan = {"_id": ObjectId(), "user_id": user_id, "created_at": datetime(2026, 1, 1), "domain": domain,
+            "total_requests": requests, "error_rate": error_rate, "avg_rps": rps, "p95_latency": p95}
+    if marked:
+        scan[SUMMARY_MARKER] = True
+    return scan
+
+
+def _summary_counts(db, user_id="u1"):
+    return {k: v for k, v in db.summaries.docs[user_id].items() if k != "updated_at"}
+
+
+def test_domain_key_is_a_safe_field_name():
+    assert domain_key("www.example.com") == "www%2Eexample%2Ecom"
+    assert "." not in domain_key("a.b") and "$" not in domain_key("$a")
+    assert domain_key("a%2Eb") != domain_key("a.b")
+
+
+def test_format_summary_matches_former_aggregation():
+    scans = [_scan("a.test", 100, 1.0, 10.0, 200.0), _scan("a.test", 300, 2.5, 20.0, 300.0),
+             _scan("b.test", 50, 0.0, 5.0, 100.0)]
+    assert format_summary(summary_from_scans("u1", scans)) == {
+        "total_scans": 3, "unique_domains": 2, "total_requests": 450,
+        "avg_error_rate": 1.17, "avg_rps": 11.7, "avg_p95_latency": 200.0,
+    }
+    assert format_summary(None)["total_scans"] == 0
+
+
+def test_incremental_summary_equals_rebuild():
+    """Ajouts et suppressions successifs donnent le même résumé qu'une reconstruction complète."""
+    # Scan antérieur aux résumés : ajouté à la création du résumé par le premier scan enregistré
+    legacy = _scan("a.test", 100, 1.0, 10.0, 200.0, marked=False)
+    db = FakeSummaryDb([legacy])
+    second, third = _scan("b.test", 300, 3.0, 30.0, 400.0), _scan("a.test", 50, 0.0, 5.0, 100.0)
+    for scan in (second, third):
+        db.scans.docs.append(scan)
+        asyncio.run(update_user_summary(db, scan))
+    db.scans.docs.remove(second)
+    asyncio.run(update_user_summary(db, second, sign=-1))
+
+    summary = _summary_counts(db)
+    assert domain_key("b.test") not in summary["domains"]
+    assert summary == summary_from_scans("u1", db.scans.docs)
+
+
+def test_concurrent_saves_on_missing_summary():
+    """Enregistrements simultanés sans résumé existant : chaque scan est compté une fois."""
+    async def delayed(ticks, coro):
+        for _ in range(ticks):
+            await asyncio.sleep(0)
+        await coro
+
+    # Toutes les positions du second enregistrement par rapport aux étapes du premier
+    for ticks in range(8):
+        legacy = [_scan("a.test", 100, 1.0, 10.0, 200.0, marked=False),
+                  _scan("b.test", 200, 2.0, 20.0, 300.0, marked=False)]
+        first, second = _scan("c.test", 10, 0.5, 1.0, 50.0), _scan("d.test", 20, 0.5, 2.0, 60.0)
+        db = FakeSummaryDb(legacy + [first, second])
+
+        async def scenario():
+            await asyncio.gather(update_user_summary(db, first), delayed(ticks, update_user_summary(db, second)))
+
+        asyncio.run(scenario())
+        assert _summary_counts(db) == summary_from_scans("u1", db.scans.docs), ticks
+
+
+def test_deleting_legacy_scan_before_summary_exists():
+    """Un scan ancien supprimé avant la création du résumé n'est pas retiré deux fois."""
+    legacy = [_scan("a.test", 100, 1.0, 10.0, 200.0, marked=False),
+              _scan("b.test", 200, 2.0, 20.0, 300.0, marked=False)]
+    db = FakeSummaryDb(list(legacy))
+    db.scans.docs.remove(legacy[0])
+    asyncio.run(update_user_summary(db, legacy[0], sign=-1))
+    assert _summary_counts(db) == summary_from_scans("u1", db.scans.docs)
+
+
+def test_global_stats_is_a_point_read():
+    db = FakeSummaryDb([_scan("a.test", 100, 1.0, 10.0, 200.0, marked=False)])
+    with patch("services.scan_service.get_db", return_value=db):
+        first = asyncio.run(get_user_global_stats("u1"))
+        reads = db.summaries.reads
+        db.scans.docs.clear()
+        second = asyncio.run(get_user_global_stats("u1"))
+    # Le second appel lit le résumé, sans repasser par les scans
+    assert first == second and first["total_scans"] == 1
+    assert db.summaries.reads == reads + 1
@@ -0,0 +1,106 @@
+import gzip
+
+from services.sitemap import discover_sitemap_urls, fetch_robots, is_allowed, iter_sitemap_entries
+
+BASE = "https://site.test"
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://site.test/</loc></url>
+  <url><loc>https://site.test/produits/1</loc><lastmod>2024-01-01</lastmod></url>
+  <url><loc>https://site.test/admin/panel</loc></url>
+  <url><loc>https://site.test/doc.pdf</loc></url>
+  <url><loc>https://other.test/x</loc></url>
+</urlset>"""
+
+INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://site.test/sitemap-pages.xml.gz</loc></sitemap>
+</sitemapindex>"""
+
+ROBOTS = b"""User-agent: *
+Disallow: /admin/
+Sitemap: https://site.test/sitemap-index.xml
+"""
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b""):
+        self.status_code = status_code
+        self.body = body
+
+    def iter_content(self, size):
+        for i in range(0, len(self.body), 16):
+            yield self.body[i:i + 16]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, routes):
+        self.routes = routes
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        if url in self.routes:
+            return FakeResponse(200, self.routes[url])
+        return FakeResponse(404)
+
+
+def _chunks(data, size=13):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def test_iter_sitemap_entries_urlset_and_index():
+    """Les <loc> sont émis avec leur type, y compris découpés en petits morceaux."""
+    entries = list(iter_sitemap_entries(_chunks(URLSET)))
+    assert entries[0] == ("url", "https://site.test/")
+    assert len(entries) == 5
+    assert list(iter_sitemap_entries(_chunks(INDEX))) == [
+        ("sitemap", "https://site.test/sitemap-pages.xml.gz"),
+    ]
+
+def test_iter_sitemap_entries_gzip():
+    """Un sitemap gzippé est décompressé à la volée."""
+    entries = list(iter_sitemap_entries(_chunks(gzip.compress(URLSET))))
+    assert ("url", "https://site.test/produits/1") in entries
+
+def test_gzip_bomb_is_decompressed_in_bounded_pieces():
+    """Un sitemap gzippé qui gonfle au-delà de SITEMAP_MAX_BYTES est coupé, par morceaux bornés."""
+    from services import sitemap
+
+    bomb = gzip.compress(URLSET[:-len(b"</urlset>")] + b" " * (sitemap.SITEMAP_MAX_BYTES + 1024))
+    assert max(len(piece) for piece in sitemap._sitemap_bytes([bomb])) <= sitemap.CHUNK_SIZE
+    entries = list(iter_sitemap_entries([bomb]))
+    assert ("url", "https://site.test/") in entries
+
+def test_discover_follows_robots_and_index():
+    """robots.txt -> index -> sitemap gzippé, en filtrant Disallow, externes et non-HTML."""
+    session = FakeSession({
+        BASE + "/robots.txt": ROBOTS,
+        BASE + "/sitemap-index.xml": INDEX,
+        BASE + "/sitemap-pages.xml.gz": gzip.compress(URLSET),
+    })
+    rules, sitemaps = fetch_robots(session, BASE, timeout=5)
+    assert sitemaps == [BASE + "/sitemap-index.xml"]
+    assert not is_allowed(rules, BASE + "/admin/panel")
+
+    paths, read = discover_sitemap_urls(session, BASE, "site.test", rules, sitemaps, max_urls=30, timeout=5)
+    assert paths == ["/", "/produits/1"]
+    assert read == 2
+
+def test_discover_defaults_to_sitemap_xml_and_stops_at_max_urls():
+    """Sans directive Sitemap, /sitemap.xml est essayé ; la lecture s'arrête à max_urls."""
+    session = FakeSession({BASE + "/sitemap.xml": URLSET})
+    paths, _ = discover_sitemap_urls(session, BASE, "site.test", None, [], max_urls=1, timeout=5)
+    assert paths == ["/"]
+    assert session.requested == [BASE + "/sitemap.xml"]
+
+def test_missing_robots_allows_everything():
+    rules, sitemaps = fetch_robots(FakeSession({}), BASE, timeout=5)
+    assert rules is None and sitemaps == []
+    assert is_allowed(rules, BASE + "/admin/panel")
@@ -0,0 +1,81 @@
+import json
+
+from services.histogram import LatencyHistograms
+from services.parser import parse_csv_stats
+from services.stage_stats import compute_stage_stats, detect_saturation
+
+def _history(plan):
+    """plan : [(secondes, rps, p95)] -> points d'historique avec compteurs cumulés."""
+    points, ts, total = [], 1000, 0
+    for seconds, rps, p95 in plan:
+        for _ in range(seconds):
+            ts += 1
+            total += rps
+            points.append({"timestamp": ts, "users": 0, "rps": rps, "failures_s": 0.0,
+                           "median": p95 / 2, "p95": p95, "p99": p95 * 1.2,
+                           "requests": total, "failures": 0})
+    return points
+
+def _bounds(users, seconds=10):
+    start = 1001
+    bounds = []
+    for index, count in enumerate(users):
+        bounds.append({"index": index, "users": count, "label": f"P{index}",
+                       "start": start, "end": start + seconds})
+        start += seconds
+    return bounds
+
+def test_stage_stats_split_history_by_boundaries():
+    """Chaque palier a son propre débit, calculé sur ses seules requêtes."""
+    history = _history([(10, 10, 100), (10, 20, 110)])
+    stages = compute_stage_stats(history, _bounds([5, 10]))
+
+    assert [s["users"] for s in stages] == [5, 10]
+    assert [s["requests"] for s in stages] == [100, 200]
+    assert [s["rps"] for s in stages] == [10.0, 20.0]
+    assert stages[1]["p95"] == 110.0
+    assert stages[1]["latency_source"] == "history"
+
+def test_stage_stats_prefer_histograms():
+    """Les percentiles d'un palier viennent de ses histogrammes HDR s'il y en a."""
+    histograms = LatencyHistograms()
+    for value in range(1, 101):
+        histograms.record(0, "GET", "/", value)
+    stages = compute_stage_stats(_history([(10, 10, 500)]), _bounds([5]), histograms)
+
+    assert stages[0]["latency_source"] == "histogram"
+    assert abs(stages[0]["p95"] - 95) < 0.1
+
+def test_detect_saturation_finds_knee():
+    """Le genou est le palier où le débit cesse de suivre la charge et où la latence grimpe."""
+    history = _history([(10, 10, 100), (10, 20, 105), (10, 22, 400), (10, 21, 900)])
+    stages = compute_stage_stats(history, _bounds([10, 20, 40, 80]))
+    knee = detect_saturation(stages)
+
+    assert knee["users"] == 40
+    assert knee["last_scaling_users"] == 20
+    assert knee["efficiency"] < 0.5
+    assert knee["latency_growth"] >= 1.5
+
+def test_detect_saturation_none_when_scaling():
+    history = _history([(10, 10, 100), (10, 20, 100), (10, 40, 110)])
+    assert detect_saturation(compute_stage_stats(history, _bounds([10, 20, 40]))) is None
+
+def test_parse_csv_stats_includes_stages(tmp_path):
+    """parse_csv_stats découpe l'historique selon rapport_stages.json."""
+    header = "Timestamp,User Count,Type,Name,Requests/s,Failures/s,50%,95%,99%,Total Request Count,Total Failure Count\n"
+    rows = "".join(
+        f"{1001 + i},{5 if i < 10 else 10},,Aggregated,{10 if i < 10 else 20},0,50,{100 if i < 10 else 400},500,"
+        f"{10 * (i + 1) if i < 10 else 100 + 20 * (i - 9)},{0 if i < 10 else i - 9}\n"
+        for i in range(20)
+    )
+    (tmp_path / "rapport_stats_history.csv").write_text(header + rows, encoding="utf-8")
+    (tmp_path / "rapport_stats.csv").write_text(
+        "Type,Name,Request Count,Failure Count,50%,95%,Max,Average (ms),Requests/s\n"
+        ",Aggregated,300,10,50,300,900,80,15\n", encoding="utf-8")
+    (tmp_path / "rapport_stages.json").write_text(json.dumps(_bounds([5, 10])), encoding="utf-8")
+
+    result = parse_csv_stats(tmp_path)
+    assert [s["rps"] for s in result["stages"]] == [10.0, 20.0]
+    assert result["stages"][1]["failure_rate"] == 5.0
+    assert result["saturation"] is None
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from core.state import state
+from services.locust_runner import _handle_event
+from services.stats_channel import EventListener, EventPublisher, FrameDecoder, encode_frame
+
+def test_frames_survive_arbitrary_chunking():
+    """Les trames sont reconstituées quel que soit le découpage des octets reçus."""
+    events = [{"type": "stats", "rps": 12.5}, {"type": "stage", "label": "Palier 1"}]
+    data = b"".join(encode_frame(e) for e in events)
+    decoder = FrameDecoder()
+    decoded = []
+    for i in range(0, len(data), 3):
+        decoded += decoder.feed(data[i:i + 3])
+    assert decoded == events
+
+def test_oversized_frame_is_rejected():
+    with pytest.raises(ValueError):
+        FrameDecoder().feed(b"\xff\xff\xff\xff")
+
+def test_publisher_to_listener_roundtrip():
+    listener = EventListener()
+    received = []
+    reader = threading.Thread(target=lambda: received.extend(listener.events()))
+    reader.start()
+
+    publisher = EventPublisher.connect(listener.port)
+    publisher.publish("crawl_progress", pages=3, urls=2)
+    publisher.publish("crawl_done", urls=["/", "/a"])
+    publisher.close()
+    reader.join(timeout=5)
+    listener.close()
+
+    assert [e["type"] for e in received] == ["crawl_progress", "crawl_done"]
+    assert received[1]["urls"] == ["/", "/a"]
+    assert "ts" in received[0]
+    assert not publisher.publish("stats")   # canal fermé : sans effet
+
+def test_listener_gives_up_when_process_is_gone():
+    listener = EventListener()
+    assert list(listener.events(alive=lambda: False)) == []
+    listener.close()
+
+def test_handle_event_updates_state():
+    """crawl_done remplit les URLs et passe en "running" ; stats alimente state["live"]."""
+    sent = []
+    def broadcast(coro):
+        sent.append(coro.__qualname__)
+        coro.close()
+
+    _handle_event({"type": "crawl_done", "urls": ["/", "/a"]}, broadcast)
+    _handle_event({"type": "stats", "rps": 4.0}, broadcast)
+    assert state["discovered_urls"] == ["/", "/a"]
+    assert state["live"]["rps"] == 4.0
+    assert sent == ["broadcast_status", "broadcast_event", "broadcast_event"]
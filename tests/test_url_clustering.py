@@ -0,0 +1,43 @@
+from services.url_clustering import canonicalize, cluster_routes, dedupe_urls
+
+def test_canonicalize():
+    """Casse, slashs et paramètres de suivi sont normalisés ; les paramètres restants triés."""
+    assert canonicalize("/Blog//Post/") == "/blog/post"
+    assert canonicalize("/") == "/"
+    assert canonicalize("/search?utm_source=x&q=a&Page=2&gclid=1") == "/search?page=2&q=a"
+
+def test_variable_segments_become_placeholders():
+    templates = cluster_routes([
+        "/product/123",
+        "/product/124",
+        "/order/3f2b8a1e-9c4d-4e5f-8a6b-7c8d9e0f1a2b",
+        "/archive/2024-05",
+        "/static/9f86d081884c7d659a2feaa0c55ad015",
+        "/about",
+    ])
+    assert templates["/product/123"] == "/product/{id}"
+    assert templates["/product/124"] == "/product/{id}"
+    assert templates["/order/3f2b8a1e-9c4d-4e5f-8a6b-7c8d9e0f1a2b"] == "/order/{uuid}"
+    assert templates["/archive/2024-05"] == "/archive/{date}"
+    assert templates["/static/9f86d081884c7d659a2feaa0c55ad015"] == "/static/{hash}"
+    assert templates["/about"] == "/about"
+
+def test_slugs_are_clustered_above_threshold():
+    """Les slugs ne sont regroupés que s'ils sont assez nombreux sous le même préfixe."""
+    posts = [f"/blog/article-numero-{n}" for n in ("un", "deux", "trois", "quatre", "cinq")]
+    templates = cluster_routes(posts + ["/contact-us", "/blog/article-numero-un/comments"], slug_threshold=5)
+    assert {templates[p] for p in posts} == {"/blog/{slug}"}
+    assert templates["/contact-us"] == "/contact-us"
+    assert templates["/blog/article-numero-un/comments"] == "/blog/article-numero-un/comments"
+
+def test_cardinality_is_bounded():
+    """Des milliers d'URLs produits donnent un seul gabarit."""
+    urls = [f"/product/{i}?utm_campaign=c{i}" for i in range(5000)]
+    assert set(cluster_routes(urls).values()) == {"/product/{id}"}
+
+def test_query_keys_in_template():
+    templates = cluster_routes(["/search?q=chaussures&page=2"])
+    assert templates["/search?q=chaussures&page=2"] == "/search?page={page}&q={q}"
+
+def test_dedupe_urls_keeps_first():
+    assert dedupe_urls(["/About/", "/about", "/contact"]) == ["/About/", "/contact"]